@@ -1 +1,48 @@
+"""
+Model ensemble for Revolution X
+Weighted combination of per-model predictions
+"""
 
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def input_width(model) -> Optional[int]:
+    """Features per row the model expects (``n_inputs``), or None if any."""
+    return getattr(model, "n_inputs", None)
+
+
+def model_output(model, features: np.ndarray) -> np.ndarray:
+    """
+    Run a scikit-learn style model on a feature matrix.
+    Uses the positive-class column of ``predict_proba`` when available.
+    """
+    if hasattr(model, "predict_proba"):
+        proba = np.asarray(model.predict_proba(features), dtype=np.float64)
+        return proba[:, -1] if proba.ndim == 2 else proba
+    return np.asarray(model.predict(features), dtype=np.float64).reshape(len(features))
+
+
+def combine(
+    predictions: Dict[str, np.ndarray],
+    weights: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """Weighted average of per-model predictions (equal weights by default)."""
+    if not predictions:
+        raise ValueError("No predictions to combine")
+    weights = weights or {}
+    total = 0.0
+    combined = None
+    for name, values in predictions.items():
+        w = weights.get(name, 1.0)
+        combined = values * w if combined is None else combined + values * w
+        total += w
+    return combined / total if total else combined
+
+
+def agreement(predictions: Dict[str, np.ndarray], threshold: float = 0.5) -> np.ndarray:
+    """Fraction of models on the majority side of ``threshold`` for each row."""
+    votes = np.vstack([values > threshold for values in predictions.values()])
+    up = votes.mean(axis=0)
+    return np.maximum(up, 1.0 - up)
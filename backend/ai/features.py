@@ -0,0 +1,402 @@
+"""
+Feature store for Revolution X
+Memoized feature vectors shared by the AI models and the strategies
+
+Each named feature is computed at most once per
+(symbol, timeframe, bar version) and kept in a memory-capped LRU. The
+version is the newest bar's time and values (plus those of any auxiliary
+symbol), so a forming bar updated in place gets fresh features. When the
+version of a (symbol, timeframe) changes, the entries of the previous one
+are evicted at once. Feature matrices built for training can be persisted as
+memory-mapped ``.npy`` files or Parquet.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, List, Tuple, Union
+
+import numpy as np
+
+from app.config import settings
+from core.market_data import Bars, MarketDataCache, market_data_cache
+
+FeatureValue = Union[float, np.ndarray]
+BarVersion = Tuple[float, ...]
+FeatureKey = Tuple[str, str, BarVersion, str]
+
+# Rough per-entry bookkeeping cost on top of the value itself
+_ENTRY_OVERHEAD = 200
+
+
+class FeatureContext:
+    """
+    Inputs available to a feature function for one bar.
+    ``feature(name)`` reads other features through the store's memo.
+    """
+
+    def __init__(
+        self,
+        store: "FeatureStore",
+        symbol: str,
+        timeframe: str,
+        bar_time: float,
+        bars: Bars,
+        aux: Optional[Dict[str, Bars]] = None,
+        version: Optional[BarVersion] = None,
+    ):
+        self.store = store
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.bar_time = bar_time
+        self.bars = bars
+        self.aux = aux or {}
+        self.version = version or (bar_time,)
+
+    def feature(self, name: str) -> FeatureValue:
+        return self.store._compute(self, name)
+
+
+FeatureFn = Callable[[FeatureContext], FeatureValue]
+
+
+class FeatureStore:
+    """
+    Registry of named features plus an LRU of computed values.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[MarketDataCache] = None,
+        max_bytes: Optional[int] = None,
+        lookback: Optional[int] = None,
+    ):
+        self.cache = cache or market_data_cache
+        self.max_bytes = max_bytes or settings.FEATURE_CACHE_MAX_BYTES
+        self.lookback = lookback or settings.FEATURE_LOOKBACK
+        self._features: Dict[str, FeatureFn] = {}
+        self._aux_symbols: Dict[str, str] = {}  # feature -> extra symbol it reads
+        self._internal: set = set()
+        self._lru: "OrderedDict[FeatureKey, FeatureValue]" = OrderedDict()
+        self._by_series: Dict[Tuple[str, str], set] = {}
+        self._current_bar: Dict[Tuple[str, str], BarVersion] = {}
+        self.bytes_used = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register(
+        self,
+        name: str,
+        fn: FeatureFn,
+        aux_symbol: Optional[str] = None,
+        internal: bool = False,
+    ):
+        """
+        Register a feature. ``aux_symbol`` names another symbol it needs;
+        ``internal`` features are building blocks for other features and
+        are left out of the default feature vector.
+        """
+        self._features[name] = fn
+        if aux_symbol:
+            self._aux_symbols[name] = aux_symbol
+        if internal:
+            self._internal.add(name)
+        else:
+            self._internal.discard(name)
+
+    def feature(self, name: str, aux_symbol: Optional[str] = None, internal: bool = False):
+        """Decorator form of ``register``."""
+        def decorator(fn: FeatureFn) -> FeatureFn:
+            self.register(name, fn, aux_symbol, internal)
+            return fn
+        return decorator
+
+    @property
+    def names(self) -> List[str]:
+        """Features that make up the default vector, in registration order."""
+        return [n for n in self._features if n not in self._internal]
+
+    # ------------------------------------------
+    # Lookup
+    # ------------------------------------------
+
+    async def get(
+        self,
+        symbol: str,
+        timeframe: str,
+        names: Optional[List[str]] = None,
+    ) -> np.ndarray:
+        """
+        Feature vector for the newest cached bar of a (symbol, timeframe),
+        in the order of ``names`` (all registered features by default).
+        """
+        names = names or self.names
+        bars = await self.cache.last(symbol, timeframe, self.lookback)
+        if not len(bars.time):
+            raise LookupError(f"No bars cached for {symbol} {timeframe}")
+
+        aux = {}
+        for aux_symbol in {self._aux_symbols[n] for n in names if n in self._aux_symbols}:
+            aux[aux_symbol] = await self.cache.last(aux_symbol, timeframe, self.lookback)
+        return self.vector(symbol, timeframe, bars, names, aux)
+
+    def vector(
+        self,
+        symbol: str,
+        timeframe: str,
+        bars: Bars,
+        names: List[str],
+        aux: Optional[Dict[str, Bars]] = None,
+    ) -> np.ndarray:
+        """Feature vector for the last bar of ``bars``."""
+        bar_time = float(bars.time[-1])
+        version = _bar_version(bars, aux)
+        self._roll(symbol, timeframe, version)
+        ctx = FeatureContext(self, symbol, timeframe, bar_time, bars, aux, version)
+        return np.concatenate([
+            np.atleast_1d(np.asarray(self._compute(ctx, name), dtype=np.float64))
+            for name in names
+        ])
+
+    def _compute(self, ctx: FeatureContext, name: str) -> FeatureValue:
+        key = (ctx.symbol, ctx.timeframe, ctx.version, name)
+        value = self._lru.get(key)
+        if value is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = self._features[name](ctx)
+        if isinstance(value, np.ndarray):
+            value = value.copy()  # Never keep views into the bar cache
+        self._store(key, value)
+        return value
+
+    # ------------------------------------------
+    # Memory management
+    # ------------------------------------------
+
+    def _store(self, key: FeatureKey, value: FeatureValue):
+        size = _ENTRY_OVERHEAD + (value.nbytes if isinstance(value, np.ndarray) else 8)
+        self._lru[key] = value
+        self._by_series.setdefault(key[:2], set()).add(key)
+        self.bytes_used += size
+        while self.bytes_used > self.max_bytes and len(self._lru) > 1:
+            self._evict(next(iter(self._lru)))
+
+    def _evict(self, key: FeatureKey):
+        value = self._lru.pop(key, None)
+        if value is None:
+            return
+        self.bytes_used -= _ENTRY_OVERHEAD + (
+            value.nbytes if isinstance(value, np.ndarray) else 8
+        )
+        series = self._by_series.get(key[:2])
+        if series is not None:
+            series.discard(key)
+        self.evictions += 1
+
+    def _roll(self, symbol: str, timeframe: str, version: BarVersion):
+        """
+        Drop every cached feature of the previous bar version once a new
+        bar appears or the forming bar changes.
+        """
+        series = (symbol, timeframe)
+        current = self._current_bar.get(series)
+        if current is not None and (version[0] < current[0] or version == current):
+            return
+        self._current_bar[series] = version
+        for key in [k for k in self._by_series.get(series, ()) if k[2] != version]:
+            self._evict(key)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+    # ------------------------------------------
+    # Training matrices
+    # ------------------------------------------
+
+    def build_matrix(
+        self,
+        symbol: str,
+        timeframe: str,
+        bars: Bars,
+        names: Optional[List[str]] = None,
+        aux: Optional[Dict[str, Bars]] = None,
+        warmup: int = 50,
+    ) -> np.ndarray:
+        """
+        Feature rows for every bar after ``warmup`` over a historical block,
+        using the same feature functions as live evaluation. Bypasses the
+        LRU so history does not flush the live working set.
+        """
+        names = names or self.names
+        uncached = _Uncached(self)
+        rows = []
+        for end in range(warmup, len(bars.time) + 1):
+            window = Bars(*(col[max(0, end - self.lookback):end] for col in bars))
+            window_aux = {
+                s: Bars(*(col[_tail_slice(b.time, window.time[-1], self.lookback)] for col in b))
+                for s, b in (aux or {}).items()
+            }
+            ctx = FeatureContext(uncached, symbol, timeframe, float(window.time[-1]), window, window_aux)
+            rows.append(np.concatenate([
+                np.atleast_1d(np.asarray(ctx.feature(n), dtype=np.float64)) for n in names
+            ]))
+        return np.vstack(rows) if rows else np.empty((0, len(names)))
+
+
+class _Uncached:
+    """Store stand-in that memoizes only within the current bar."""
+
+    def __init__(self, store: FeatureStore):
+        self._features = store._features
+        self._bar_time: Optional[float] = None
+        self._memo: Dict[str, FeatureValue] = {}
+
+    def _compute(self, ctx: FeatureContext, name: str) -> FeatureValue:
+        if ctx.bar_time != self._bar_time:
+            self._bar_time = ctx.bar_time
+            self._memo = {}
+        if name not in self._memo:
+            self._memo[name] = self._features[name](ctx)
+        return self._memo[name]
+
+
+def _bar_version(bars: Bars, aux: Optional[Dict[str, Bars]] = None) -> BarVersion:
+    """Time and values of the newest bar (and of each auxiliary series)."""
+    version = [float(bars.time[-1]), float(bars.open[-1]), float(bars.high[-1]),
+               float(bars.low[-1]), float(bars.close[-1]), float(bars.volume[-1])]
+    for aux_symbol in sorted(aux or {}):
+        b = aux[aux_symbol]
+        if len(b.time):
+            version += [float(b.time[-1]), float(b.close[-1]), float(b.volume[-1])]
+    return tuple(version)
+
+
+def _tail_slice(times: np.ndarray, until: float, lookback: int) -> slice:
+    """Slice of the last ``lookback`` bars at or before ``until``."""
+    end = int(np.searchsorted(times, until, side="right"))
+    return slice(max(0, end - lookback), end)
+
+
+# ==========================================
+# Persistence
+# ==========================================
+
+def save_matrix(
+    path: str,
+    matrix: np.ndarray,
+    columns: List[str],
+    times: Optional[np.ndarray] = None,
+    format: str = "npy",
+):
+    """
+    Persist a feature matrix for training.
+
+    ``npy`` writes ``features.npy`` (+ ``times.npy``) and ``columns.json``
+    into the directory ``path``; ``parquet`` writes one Parquet file and
+    needs pyarrow.
+    """
+    if format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("pyarrow is required for Parquet output") from e
+        data = {name: matrix[:, i] for i, name in enumerate(columns)}
+        if times is not None:
+            data = {"time": times, **data}
+        pq.write_table(pa.table(data), path)
+        return
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "features.npy"), np.ascontiguousarray(matrix))
+    if times is not None:
+        np.save(os.path.join(path, "times.npy"), np.asarray(times))
+    with open(os.path.join(path, "columns.json"), "w") as f:
+        json.dump(columns, f)
+
+
+def load_matrix(path: str) -> Tuple[np.ndarray, List[str], Optional[np.ndarray]]:
+    """Open a saved ``npy`` feature matrix memory-mapped (read-only)."""
+    matrix = np.load(os.path.join(path, "features.npy"), mmap_mode="r")
+    with open(os.path.join(path, "columns.json")) as f:
+        columns = json.load(f)
+    times_path = os.path.join(path, "times.npy")
+    times = np.load(times_path, mmap_mode="r") if os.path.exists(times_path) else None
+    return matrix, columns, times
+
+
+# ==========================================
+# Built-in features
+# ==========================================
+
+feature_store = FeatureStore()
+
+
+@feature_store.feature("log_returns", internal=True)
+def _log_returns(ctx: FeatureContext) -> np.ndarray:
+    return np.diff(np.log(ctx.bars.close))
+
+
+@feature_store.feature("return_1")
+def _return_1(ctx: FeatureContext) -> float:
+    returns = ctx.feature("log_returns")
+    return float(returns[-1]) if len(returns) else 0.0
+
+
+@feature_store.feature("momentum_20")
+def _momentum_20(ctx: FeatureContext) -> float:
+    returns = ctx.feature("log_returns")
+    return float(returns[-20:].sum())
+
+
+@feature_store.feature("volatility_20")
+def _volatility_20(ctx: FeatureContext) -> float:
+    returns = ctx.feature("log_returns")
+    return float(returns[-20:].std()) if len(returns) >= 2 else 0.0
+
+
+@feature_store.feature("range_ratio")
+def _range_ratio(ctx: FeatureContext) -> float:
+    ranges = ctx.bars.high - ctx.bars.low
+    mean = ranges[-50:].mean()
+    return float(ranges[-1] / mean) if mean else 1.0
+
+
+@feature_store.feature("order_flow_imbalance")
+def _order_flow_imbalance(ctx: FeatureContext) -> float:
+    """Signed-volume share over the last 20 bars (bar-level proxy)."""
+    bars = ctx.bars
+    sign = np.sign(bars.close[-20:] - bars.open[-20:])
+    volume = bars.volume[-20:]
+    total = volume.sum()
+    return float((sign * volume).sum() / total) if total else 0.0
+
+
+@feature_store.feature("dxy_correlation", aux_symbol=settings.DXY_SYMBOL)
+def _dxy_correlation(ctx: FeatureContext) -> float:
+    """Correlation of log returns with DXY over the last 50 common bars."""
+    dxy = ctx.aux.get(settings.DXY_SYMBOL)
+    if dxy is None or len(dxy.time) < 3:
+        return 0.0
+    common, mi, di = np.intersect1d(ctx.bars.time, dxy.time, return_indices=True)
+    if len(common) < 3:
+        return 0.0
+    metal = np.diff(np.log(ctx.bars.close[mi[-51:]]))
+    usd = np.diff(np.log(dxy.close[di[-51:]]))
+    if metal.std() == 0 or usd.std() == 0:
+        return 0.0
+    return float(np.corrcoef(metal, usd)[0, 1])
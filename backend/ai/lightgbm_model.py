@@ -1 +1,35 @@
+"""
+LightGBM model wrapper for Revolution X
+Loaded lazily by the model registry
+"""
 
+from typing import Optional
+
+import numpy as np
+
+
+class LightGBMModel:
+    """
+    LightGBM booster saved with ``Booster.save_model``.
+    ``predict`` returns the probability of an up move for each row.
+    """
+
+    name = "lightgbm"
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        try:
+            import lightgbm
+        except ImportError as e:
+            raise ImportError("lightgbm is required for LightGBMModel") from e
+
+        self.path = path
+        self.booster = lightgbm.Booster(model_file=path)
+        self.num_threads = num_threads
+
+    @property
+    def n_inputs(self) -> int:
+        return self.booster.num_feature()
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        params = {"num_threads": self.num_threads} if self.num_threads else {}
+        return np.asarray(self.booster.predict(features, **params), dtype=np.float64)
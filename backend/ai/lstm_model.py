@@ -1 +1,44 @@
+"""
+LSTM model wrapper for Revolution X
+TorchScript model run on CPU, loaded lazily by the model registry
+"""
 
+import numpy as np
+
+
+class LSTMModel:
+    """
+    TorchScript LSTM taking (batch, sequence_length, n_features) input.
+
+    Feature rows arrive flattened, so each row must hold
+    ``sequence_length * n_features`` values, oldest step first.
+    ``predict`` returns the probability of an up move for each row.
+    """
+
+    name = "lstm"
+
+    def __init__(self, path: str, sequence_length: int, n_features: int):
+        try:
+            import torch
+        except ImportError as e:
+            raise ImportError("torch is required for LSTMModel") from e
+
+        self._torch = torch
+        self.path = path
+        self.sequence_length = sequence_length
+        self.n_features = n_features
+        self.module = torch.jit.load(path, map_location="cpu")
+        self.module.eval()
+
+    @property
+    def n_inputs(self) -> int:
+        return self.sequence_length * self.n_features
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        torch = self._torch
+        batch = np.ascontiguousarray(features, dtype=np.float32).reshape(
+            len(features), self.sequence_length, self.n_features
+        )
+        with torch.inference_mode():
+            output = self.module(torch.from_numpy(batch))
+        return output.reshape(len(features)).double().numpy()
@@ -1 +1,281 @@
+"""
+AI predictor for Revolution X
+Micro-batched in-process inference for the model ensemble
 
+Callers (the scanner, strategies) submit one feature row at a time. Rows
+arriving within a short window are stacked into one matrix per row width,
+each model runs once on the matrix of the width it expects (``n_inputs``;
+models without one take any width) in a worker thread, and the results are
+fanned back out to the waiting callers. Models load lazily on first use, stay resident, and can be
+hot-swapped without restarting the process.
+
+A model that fails to load is retried with exponential backoff, and one
+that raises on a batch is left out of that batch's ensemble; either way the
+remaining models keep serving.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from ai.ensemble import combine, input_width, model_output
+
+
+@dataclass
+class _ModelEntry:
+    loader: Callable[[], Any]
+    weight: float = 1.0
+    model: Any = None
+    version: int = 0
+    failures: int = 0  # Consecutive failed loads
+    retry_at: float = 0.0  # Monotonic time of the next load attempt
+
+
+class ModelRegistry:
+    """
+    Named models with lazy loading and atomic hot-swap.
+
+    A batch that already picked up a model keeps using it; the next batch
+    sees the replacement.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._load_lock = asyncio.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any], weight: float = 1.0):
+        """Register a model by loader; nothing is loaded until first use."""
+        self._entries[name] = _ModelEntry(loader=loader, weight=weight)
+
+    def unregister(self, name: str):
+        self._entries.pop(name, None)
+
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def weights(self) -> Dict[str, float]:
+        return {name: entry.weight for name, entry in self._entries.items()}
+
+    def swap(self, name: str, model: Any):
+        """Replace a resident model with an already-loaded one."""
+        entry = self._entries.setdefault(name, _ModelEntry(loader=lambda: model))
+        entry.model = model
+        entry.version += 1
+
+    async def reload(self, name: str, loader: Optional[Callable[[], Any]] = None):
+        """Load a new version off the event loop, then swap it in."""
+        entry = self._entries[name]
+        if loader is not None:
+            entry.loader = loader
+        model = await asyncio.get_running_loop().run_in_executor(None, entry.loader)
+        self.swap(name, model)
+
+    async def resident(self) -> Dict[str, Any]:
+        """Every registered model, loading the ones not yet resident."""
+        now = time.monotonic()
+        missing = [n for n, e in self._entries.items() if e.model is None and e.retry_at <= now]
+        if missing:
+            async with self._load_lock:
+                loop = asyncio.get_running_loop()
+                for name in missing:
+                    entry = self._entries.get(name)
+                    if entry is None or entry.model is not None:
+                        continue
+                    try:
+                        entry.model = await loop.run_in_executor(None, entry.loader)
+                        entry.version += 1
+                        entry.failures = 0
+                        print(f"✅ Model loaded: {name}")
+                    except Exception as e:
+                        entry.failures += 1
+                        backoff = min(
+                            settings.MODEL_LOAD_BACKOFF * 2 ** (entry.failures - 1),
+                            settings.MODEL_LOAD_BACKOFF_MAX,
+                        )
+                        entry.retry_at = time.monotonic() + backoff
+                        print(f"⚠️ Model {name} failed to load (retry in {backoff:.0f}s): {e}")
+        return {n: e.model for n, e in self._entries.items() if e.model is not None}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "loaded": entry.model is not None,
+                "version": entry.version,
+                "weight": entry.weight,
+                "load_failures": entry.failures,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+class InferenceServer:
+    """
+    Collects prediction requests into micro-batches and runs the ensemble
+    once per batch.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        window_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+    ):
+        self.registry = registry
+        self.window = (window_ms or settings.INFERENCE_BATCH_WINDOW_MS) / 1000
+        self.max_batch = max_batch or settings.INFERENCE_MAX_BATCH
+        # One worker: models run back to back, each using its own threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        # Metrics
+        self.batches: int = 0
+        self.rows: int = 0
+        self.model_errors: int = 0
+        self.last_batch_ms: float = 0.0
+
+    async def predict(self, features: np.ndarray) -> Dict[str, float]:
+        """
+        Predict for one feature row. Returns each model's output plus the
+        weighted ``ensemble`` value.
+        """
+        row = np.asarray(features, dtype=np.float64).reshape(-1)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.window, self._flush
+            )
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        # Rows of different widths cannot share a matrix
+        groups: Dict[int, List[Tuple[np.ndarray, asyncio.Future]]] = {}
+        for row, future in batch:
+            groups.setdefault(row.shape[0], []).append((row, future))
+
+        try:
+            models = await self.registry.resident()
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        weights = self.registry.weights()
+        loop = asyncio.get_running_loop()
+
+        for width, group in groups.items():
+            started = time.perf_counter()
+            matrix = np.vstack([row for row, _ in group])
+            takers = {n: m for n, m in models.items() if input_width(m) in (None, width)}
+            try:
+                if not models:
+                    raise RuntimeError("No models loaded")
+                if not takers:
+                    raise RuntimeError(f"No model takes {width} features")
+                outputs, errors = await loop.run_in_executor(
+                    self._executor, self._run_models, takers, weights, matrix
+                )
+            except Exception as e:
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for name, error in errors.items():
+                self.model_errors += 1
+                print(f"⚠️ Model {name} failed on a batch of {len(group)}: {error}")
+
+            names = list(outputs)
+            columns = np.column_stack([outputs[n] for n in names]).tolist()
+            for (_, future), values in zip(group, columns):
+                if not future.done():
+                    future.set_result(dict(zip(names, values)))
+
+            self.batches += 1
+            self.rows += len(group)
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def _run_models(
+        models: Dict[str, Any],
+        weights: Dict[str, float],
+        matrix: np.ndarray,
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Exception]]:
+        """Outputs of the models that succeeded, and the errors of the rest."""
+        outputs: Dict[str, np.ndarray] = {}
+        errors: Dict[str, Exception] = {}
+        for name, model in models.items():
+            try:
+                outputs[name] = model_output(model, matrix)
+            except Exception as e:
+                errors[name] = e
+        if not outputs:
+            raise RuntimeError(f"Every model failed: {errors}")
+        outputs["ensemble"] = combine(outputs, weights)
+        return outputs, errors
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "model_errors": self.model_errors,
+            "last_batch_ms": round(self.last_batch_ms, 3),
+            "pending": len(self._pending),
+            "models": self.registry.status(),
+        }
+
+    async def stop(self):
+        """Flush what is queued and release the worker thread."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+
+def register_default_models(registry: ModelRegistry, model_dir: Optional[str] = None):
+    """Register whichever model files exist in ``settings.MODEL_DIR``."""
+    model_dir = model_dir or settings.MODEL_DIR
+
+    path = os.path.join(model_dir, "xgboost.json")
+    if os.path.exists(path):
+        from ai.xgboost_model import XGBoostModel
+        registry.register("xgboost", lambda: XGBoostModel(path))
+
+    path_lgb = os.path.join(model_dir, "lightgbm.txt")
+    if os.path.exists(path_lgb):
+        from ai.lightgbm_model import LightGBMModel
+        registry.register("lightgbm", lambda: LightGBMModel(path_lgb))
+
+    path_lstm = os.path.join(model_dir, "lstm.pt")
+    if os.path.exists(path_lstm):
+        from ai.lstm_model import LSTMModel
+        registry.register("lstm", lambda: LSTMModel(
+            path_lstm, settings.LSTM_SEQUENCE_LENGTH, settings.LSTM_N_FEATURES
+        ))
+
+
+# Shared registry and server
+model_registry = ModelRegistry()
+inference_server = InferenceServer(model_registry)
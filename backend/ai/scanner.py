@@ -1 +1,227 @@
+"""
+Smart Scanner for Revolution X
+Concurrent multi-asset, multi-timeframe opportunity ranking
 
+Each scan cycle fetches recent bars for every (symbol, timeframe) from the
+shared market data cache (awaited on the event loop) and scores them in a
+process pool. A cycle has a hard deadline: whatever has not finished by then
+is skipped and reported instead of holding up the ranking. The latest
+ranking is kept pre-serialized so the API can answer without any work.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from core.market_data import MarketDataCache, market_data_cache
+
+
+def score_bars(
+    close: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    volume: np.ndarray,
+) -> Dict[str, float]:
+    """
+    Score one instrument from its recent bars (runs in a worker process).
+
+    Combines trend quality (momentum over volatility), range expansion and
+    volume surge into a 0-100 score; the sign of momentum gives direction.
+    """
+    n = len(close)
+    if n < 50:
+        return {"score": 0.0, "direction": 0, "momentum": 0.0, "volatility": 0.0}
+
+    returns = np.diff(np.log(close))
+    lookback = min(n - 1, 100)
+    momentum = float(np.log(close[-1] / close[-1 - lookback]))
+    volatility = float(returns[-lookback:].std() * np.sqrt(lookback)) or 1e-12
+    trend_quality = abs(momentum) / volatility
+
+    ranges = high - low
+    range_ratio = float(ranges[-5:].mean() / (ranges[-100:].mean() or 1e-12))
+    recent_volume = volume[-5:].mean()
+    volume_ratio = float(recent_volume / (volume[-100:].mean() or 1e-12)) if recent_volume else 1.0
+
+    score = (
+        60.0 * np.tanh(trend_quality / 2.0)
+        + 25.0 * np.tanh(max(range_ratio - 1.0, 0.0))
+        + 15.0 * np.tanh(max(volume_ratio - 1.0, 0.0))
+    )
+    return {
+        "score": round(float(score), 2),
+        "direction": int(np.sign(momentum)),
+        "momentum": momentum,
+        "volatility": volatility,
+        "range_ratio": range_ratio,
+        "volume_ratio": volume_ratio,
+    }
+
+
+@dataclass
+class ScanResult:
+    """Score for one (symbol, timeframe)."""
+    symbol: str
+    timeframe: str
+    score: float
+    direction: int
+    metrics: Dict[str, float]
+    fetch_ms: float
+    score_ms: float
+
+
+@dataclass
+class ScanCycle:
+    """Outcome and timing breakdown of one scan cycle."""
+    cycle: int
+    started_at: str
+    duration_ms: float = 0.0
+    fetch_ms: float = 0.0  # Summed across tasks
+    score_ms: float = 0.0  # Summed across tasks
+    deadline_ms: float = 0.0
+    results: List[ScanResult] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+class SmartScanner:
+    """
+    Runs scan cycles over all tradable assets and keeps the latest ranking.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[MarketDataCache] = None,
+        symbols: Optional[List[str]] = None,
+        timeframes: Optional[List[str]] = None,
+        deadline: Optional[float] = None,
+        lookback: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.cache = cache or market_data_cache
+        self.symbols = symbols or settings.TRADABLE_ASSETS
+        self.timeframes = timeframes or settings.SCANNER_TIMEFRAMES
+        self.deadline = deadline or settings.SCANNER_DEADLINE
+        self.lookback = lookback or settings.SCANNER_LOOKBACK
+        self.max_workers = max_workers or settings.SCANNER_WORKERS
+        self.latest: Optional[ScanCycle] = None
+        self.snapshot_json: bytes = json.dumps({
+            "status": "idle",
+            "assets_scanned": [],
+            "best_opportunity": None,
+        }).encode()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cycles = 0
+        self._cycle_lock = asyncio.Lock()
+
+    def start(self):
+        """Start the worker pool used for scoring."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+
+    async def stop(self):
+        """Shut the worker pool down."""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _scan_one(self, symbol: str, timeframe: str) -> ScanResult:
+        t0 = time.perf_counter()
+        bars = await self.cache.last(symbol, timeframe, self.lookback)
+        # Copy out of the ring buffer: the views change on the next bar
+        args = (bars.close.copy(), bars.high.copy(), bars.low.copy(), bars.volume.copy())
+        t1 = time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+        metrics = await loop.run_in_executor(self._pool, score_bars, *args)
+        t2 = time.perf_counter()
+
+        return ScanResult(
+            symbol=symbol,
+            timeframe=timeframe,
+            score=metrics.pop("score"),
+            direction=metrics.pop("direction"),
+            metrics=metrics,
+            fetch_ms=(t1 - t0) * 1000,
+            score_ms=(t2 - t1) * 1000,
+        )
+
+    async def run_cycle(self) -> ScanCycle:
+        """Scan every symbol/timeframe once within the cycle deadline."""
+        async with self._cycle_lock:
+            self.start()
+            self._cycles += 1
+            cycle = ScanCycle(
+                cycle=self._cycles,
+                started_at=datetime.now(timezone.utc).isoformat(),
+                deadline_ms=self.deadline * 1000,
+            )
+            started = time.perf_counter()
+
+            tasks: Dict[asyncio.Task, Tuple[str, str]] = {
+                asyncio.create_task(self._scan_one(symbol, tf)): (symbol, tf)
+                for symbol in self.symbols
+                for tf in self.timeframes
+            }
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+
+            for task in pending:
+                task.cancel()
+                cycle.skipped.append(":".join(tasks[task]))
+            if pending:
+                # Let the cancellations finish so nothing outlives the cycle
+                await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                key = ":".join(tasks[task])
+                if task.exception() is not None:
+                    cycle.errors[key] = str(task.exception())
+                    continue
+                result = task.result()
+                cycle.results.append(result)
+                cycle.fetch_ms += result.fetch_ms
+                cycle.score_ms += result.score_ms
+
+            cycle.results.sort(key=lambda r: r.score, reverse=True)
+            cycle.duration_ms = (time.perf_counter() - started) * 1000
+            self._publish(cycle)
+            return cycle
+
+    def _publish(self, cycle: ScanCycle):
+        """Swap in the new ranking and its pre-serialized response."""
+        self.latest = cycle
+        ranking = [asdict(r) for r in cycle.results]
+        self.snapshot_json = json.dumps({
+            "status": "degraded" if cycle.skipped or cycle.errors else "ok",
+            "cycle": cycle.cycle,
+            "scanned_at": cycle.started_at,
+            "assets_scanned": sorted({r.symbol for r in cycle.results}),
+            "best_opportunity": ranking[0] if ranking else None,
+            "ranking": ranking,
+            "skipped": cycle.skipped,
+            "errors": cycle.errors,
+            "timing": {
+                "duration_ms": round(cycle.duration_ms, 3),
+                "fetch_ms": round(cycle.fetch_ms, 3),
+                "score_ms": round(cycle.score_ms, 3),
+                "deadline_ms": cycle.deadline_ms,
+            },
+        }).encode()
+
+    def load_snapshot(self, snapshot_json: bytes):
+        """Adopt a ranking produced by the scanner in another process."""
+        self.snapshot_json = bytes(snapshot_json)
+
+
+# Shared scanner instance
+smart_scanner = SmartScanner()
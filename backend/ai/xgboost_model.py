@@ -1 +1,36 @@
+"""
+XGBoost model wrapper for Revolution X
+Loaded lazily by the model registry
+"""
 
+from typing import Optional
+
+import numpy as np
+
+
+class XGBoostModel:
+    """
+    Gradient-boosted trees saved with ``Booster.save_model``.
+    ``predict`` returns the probability of an up move for each row.
+    """
+
+    name = "xgboost"
+
+    def __init__(self, path: str, nthread: Optional[int] = None):
+        try:
+            import xgboost
+        except ImportError as e:
+            raise ImportError("xgboost is required for XGBoostModel") from e
+
+        self.path = path
+        self.booster = xgboost.Booster()
+        self.booster.load_model(path)
+        if nthread:
+            self.booster.set_param({"nthread": nthread})
+
+    @property
+    def n_inputs(self) -> int:
+        return self.booster.num_features()
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return np.asarray(self.booster.inplace_predict(features), dtype=np.float64)
@@ -0,0 +1,202 @@
+"""
+Market data API endpoints
+Historical bars for charts and research
+
+Bars are read with asyncpg straight into NumPy chunks (no ORM objects) and
+streamed to the client chunk by chunk. Pages are keyset-paginated on
+``time`` over the (symbol, time) index: the query reads one bar past
+``limit``, and if it comes back the page's last bar is the next cursor, so
+the cursor costs no extra query. The page is read before the response
+starts because the cursor goes out in the header. ``max_points``
+downsamples a wide range with LTTB on the server.
+
+Formats:
+    json    - {"columns": [...], "bars": [[time, open, ...], ...]}
+    msgpack - a header map followed by one {column: [values]} map per chunk
+    arrow   - Arrow IPC stream, one record batch per chunk (needs pyarrow)
+    npz     - NumPy .npz archive with one array per column
+"""
+
+import io
+import json
+from datetime import datetime, timezone
+from typing import Optional, AsyncIterator, Dict, Any, List, Tuple
+
+import msgpack
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.database.connection import async_engine
+from app.database.ingestion import to_datetime
+from app.database.timescale import bars_sql
+from core.downsample import lttb_indices
+from core.market_data import FIELDS, TIME, CLOSE
+
+router = APIRouter()
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/x-msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "npz": "application/octet-stream",
+}
+
+CHUNK_ROWS = 5000
+
+
+async def _fetch_chunks(sql: str, args: list) -> AsyncIterator[np.ndarray]:
+    """Run a bars query through a server-side cursor, yielding (n, 7) arrays."""
+    async with async_engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        pg = raw.driver_connection  # asyncpg.Connection
+        async with pg.transaction():
+            cursor = await pg.cursor(sql, *args)
+            while True:
+                rows = await cursor.fetch(CHUNK_ROWS)
+                if not rows:
+                    return
+                yield np.array([tuple(r) for r in rows], dtype=np.float64)
+
+
+async def _fetch_page(sql: str, args: list, limit: int) -> Tuple[List[np.ndarray], Optional[float]]:
+    """
+    Chunks of at most ``limit`` bars, and the time of the last one if more
+    bars follow. ``sql`` takes the row limit as its last parameter.
+    """
+    chunks = [chunk async for chunk in _fetch_chunks(sql, [*args, limit + 1])]
+    if sum(len(chunk) for chunk in chunks) <= limit:
+        return chunks, None
+    # The extra bar only says there is another page
+    if len(chunks[-1]) == 1:
+        chunks.pop()
+    else:
+        chunks[-1] = chunks[-1][:-1]
+    return chunks, float(chunks[-1][-1, TIME])
+
+
+async def _iterate(chunks: List[np.ndarray]) -> AsyncIterator[np.ndarray]:
+    for chunk in chunks:
+        yield chunk
+
+
+def _json_rows(chunk: np.ndarray) -> bytes:
+    # Missing spreads are NaN; JSON has no NaN
+    return json.dumps(chunk.tolist())[1:-1].replace("NaN", "null").encode()
+
+
+async def _encode_json(header: Dict[str, Any], chunks: AsyncIterator[np.ndarray]):
+    yield json.dumps(header)[:-1].encode() + b', "bars": ['
+    first = True
+    async for chunk in chunks:
+        if not len(chunk):
+            continue
+        yield (b"" if first else b",") + _json_rows(chunk)
+        first = False
+    yield b"]}"
+
+
+async def _encode_msgpack(header: Dict[str, Any], chunks: AsyncIterator[np.ndarray]):
+    yield msgpack.packb(header)
+    async for chunk in chunks:
+        yield msgpack.packb({name: chunk[:, i].tolist() for i, name in enumerate(FIELDS)})
+
+
+async def _encode_arrow(header: Dict[str, Any], chunks: AsyncIterator[np.ndarray]):
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [pa.field(name, pa.float64()) for name in FIELDS],
+        metadata={k: json.dumps(v) for k, v in header.items()},
+    )
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    async for chunk in chunks:
+        writer.write_batch(pa.record_batch(
+            [pa.array(chunk[:, i]) for i in range(len(FIELDS))], schema=schema
+        ))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+async def _encode_npz(header: Dict[str, Any], chunks: AsyncIterator[np.ndarray]):
+    parts = [chunk async for chunk in chunks]
+    data = np.vstack(parts) if parts else np.empty((0, len(FIELDS)))
+    buffer = io.BytesIO()
+    np.savez(buffer, **{name: np.ascontiguousarray(data[:, i]) for i, name in enumerate(FIELDS)})
+    yield buffer.getvalue()
+
+
+ENCODERS = {
+    "json": _encode_json,
+    "msgpack": _encode_msgpack,
+    "arrow": _encode_arrow,
+    "npz": _encode_npz,
+}
+
+
+async def _downsampled(chunks: AsyncIterator[np.ndarray], max_points: int) -> AsyncIterator[np.ndarray]:
+    parts = [chunk async for chunk in chunks]
+    if not parts:
+        return
+    data = np.vstack(parts)
+    yield data[lttb_indices(data[:, TIME], data[:, CLOSE], max_points)]
+
+
+@router.get("/bars")
+async def get_bars(
+    symbol: str,
+    timeframe: str = Query(settings.DEFAULT_TIMEFRAME),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[float] = Query(None, description="Cursor: time of the last bar received"),
+    limit: int = Query(5000, ge=1, le=settings.MARKET_BARS_MAX_LIMIT),
+    max_points: Optional[int] = Query(None, ge=3, description="Downsample with LTTB"),
+    format: str = Query("json", pattern="^(json|msgpack|arrow|npz)$"),
+):
+    """
+    Get historical bars, oldest first. Pass the returned ``next_cursor`` as
+    ``after`` to fetch the following page.
+    """
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Arrow output is not available (pyarrow missing)")
+
+    if after is not None:
+        lower, bound = datetime.fromtimestamp(after, timezone.utc), "time > $2"
+    else:
+        lower, bound = to_datetime(start or 0), "time >= $2"
+    upper = to_datetime(end) if end else datetime.now(timezone.utc)
+    args: List[Any] = [symbol, lower, upper]
+    bound += " AND time < $3"
+
+    try:
+        sql = bars_sql(timeframe, bound, limit="$4", float8=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page, next_cursor = await _fetch_page(sql, args, limit)
+    header = {
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "columns": list(FIELDS),
+        "next_cursor": next_cursor,
+        "downsampled": max_points is not None,
+    }
+
+    chunks = _iterate(page)
+    if max_points is not None:
+        chunks = _downsampled(chunks, max_points)
+
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+    return StreamingResponse(
+        ENCODERS[format](header, chunks),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
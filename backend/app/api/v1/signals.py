@@ -4,6 +4,9 @@ Phase 1: Basic structure
 """
 
 from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ai.scanner import smart_scanner
 
 router = APIRouter()
 
@@ -19,10 +22,8 @@ async def latest_signals():
 
 @router.get("/scanner")
 async def scanner_status():
-    """Get smart scanner status."""
-    return {
-        "status": "idle",
-        "assets_scanned": [],
-        "best_opportunity": None,
-        "message": "Smart Scanner in Phase 4",
-    }
+    """Get smart scanner status (latest ranking, served from memory)."""
+    return Response(
+        content=smart_scanner.snapshot_json,
+        media_type="application/json",
+    )
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies import get_db
+from app.mt5.snapshot import account_snapshot, ACCOUNT, POSITIONS
 
 router = APIRouter()
 
@@ -24,12 +25,11 @@ async def trading_status():
 
 @router.get("/account")
 async def account_info():
-    """Get trading account info."""
-    # TODO: Implement in Phase 3
-    return {
-        "balance": 0.0,
-        "equity": 0.0,
-        "margin": 0.0,
-        "free_margin": 0.0,
-        "message": "Connect MT5 for live data",
-    }
+    """Get trading account info (served from the in-memory snapshot)."""
+    return await account_snapshot.get(ACCOUNT)
+
+
+@router.get("/positions")
+async def open_positions():
+    """Get open positions (served from the in-memory snapshot)."""
+    return await account_snapshot.get(POSITIONS)
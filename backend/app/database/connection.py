@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import declarative_base
 
 from app.config import settings
+from app.database.timescale import setup_timescale
 
 # Convert PostgreSQL URL to async version
 def get_async_database_url(url: str) -> str:
@@ -49,6 +50,9 @@ async def init_db():
         # Create all tables
         # await conn.run_sync(Base.metadata.create_all)
         pass  # Will use Alembic migrations in production
+    
+    # Hypertable, policies and continuous aggregates for market_data
+    await setup_timescale(async_engine)
 
 
 async def close_db():
@@ -0,0 +1,245 @@
+"""
+Market data ingestion for Revolution X
+Batched COPY into the market_data hypertable
+
+Bars and ticks are buffered in memory, de-duplicated on the
+(time, symbol, timeframe) key and flushed with asyncpg's binary COPY into a
+temporary staging table, followed by a single INSERT ... ON CONFLICT into
+``market_data``. A flush is triggered when the buffer reaches the batch size
+or when the flush interval elapses, whichever comes first.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.database.connection import async_engine
+
+COLUMNS = (
+    "time", "symbol", "timeframe",
+    "open", "high", "low", "close", "volume", "spread",
+)
+
+STAGE_TABLE = "market_data_stage"
+
+CREATE_STAGE_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE}
+(LIKE market_data INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+"""
+
+UPSERT_SQL = f"""
+INSERT INTO market_data ({", ".join(COLUMNS)})
+SELECT {", ".join(COLUMNS)} FROM {STAGE_TABLE}
+ON CONFLICT (time, symbol, timeframe) DO UPDATE SET
+    open = EXCLUDED.open,
+    high = EXCLUDED.high,
+    low = EXCLUDED.low,
+    close = EXCLUDED.close,
+    volume = EXCLUDED.volume,
+    spread = EXCLUDED.spread
+"""
+
+BarKey = Tuple[datetime, str, str]
+
+
+def to_datetime(value: Any) -> datetime:
+    """Normalize epoch seconds or naive datetimes to aware UTC datetimes."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(float(value), tz=timezone.utc)
+
+
+class MarketDataIngestor:
+    """
+    Buffers OHLCV rows and writes them to market_data in batches.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[AsyncEngine] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_buffer: Optional[int] = None,
+    ):
+        self.engine = engine or async_engine
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.INGEST_FLUSH_INTERVAL
+        self.max_buffer = max_buffer or settings.INGEST_MAX_BUFFER
+
+        self._buffer: Dict[BarKey, tuple] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.rows_flushed: int = 0
+        self.flushes: int = 0
+        self.failed_flushes: int = 0
+        self.dropped: int = 0
+        self.last_flush_ms: float = 0.0
+        self.max_flush_ms: float = 0.0
+        self._total_flush_ms: float = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Rows waiting to be flushed."""
+        return len(self._buffer)
+
+    def add(
+        self,
+        time: Any,
+        symbol: str,
+        timeframe: str,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: int,
+        spread: Optional[float] = None,
+    ):
+        """
+        Queue one bar. Never blocks; a later row with the same key replaces
+        the pending one, so live updates of an open bar collapse to one write.
+        """
+        ts = to_datetime(time)
+        key = (ts, symbol, timeframe)
+        self._buffer.pop(key, None)
+        self._buffer[key] = (
+            ts, symbol, timeframe,
+            open, high, low, close, int(volume), spread,
+        )
+        if len(self._buffer) > self.max_buffer:
+            # Database is falling behind: shed the oldest rows
+            del self._buffer[next(iter(self._buffer))]
+            self.dropped += 1
+        if len(self._buffer) >= self.batch_size:
+            self._flush_requested.set()
+
+    def add_tick(self, symbol: str, data: Dict[str, Any]):
+        """
+        Queue a tick as a zero-range bar on the ``TICK`` timeframe, stamped
+        with the millisecond ``time_msc`` when MT5 sends it, so ticks within
+        one second keep their own rows. Only ticks with the same timestamp
+        collapse: they would share one ``market_data`` key anyway.
+        """
+        price = data.get("last") or data["bid"]
+        spread = data["ask"] - data["bid"] if "ask" in data else None
+        stamp = data["time_msc"] / 1000 if data.get("time_msc") else data["time"]
+        self.add(
+            stamp, symbol, "TICK",
+            price, price, price, price, data.get("volume", 0), spread,
+        )
+
+    def add_event(self, event) -> bool:
+        """Queue a tick or bar ``MarketEvent`` from the MT5 stream."""
+        data = event.data
+        if event.kind == "bar":
+            self.add(
+                data["time"], event.symbol, event.timeframe,
+                data["open"], data["high"], data["low"], data["close"],
+                data.get("volume", 0), data.get("spread"),
+            )
+            return True
+        if event.kind == "tick" and settings.INGEST_TICKS:
+            self.add_tick(event.symbol, data)
+            return True
+        return False
+
+    async def consume(self, subscription):
+        """Feed every event of an MT5 subscription into the buffer."""
+        async for event in subscription:
+            self.add_event(event)
+
+    async def start(self):
+        """Start the background flush loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._buffer:
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Final market data flush failed: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            if not self._buffer:
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Market data flush failed: {e}")
+
+    async def flush(self) -> int:
+        """
+        Write the current buffer to the database.
+        Returns the number of rows written.
+        """
+        async with self._flush_lock:
+            batch, self._buffer = self._buffer, {}
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                await self._copy_upsert(list(batch.values()))
+            except Exception:
+                self.failed_flushes += 1
+                # Put the rows back without overwriting newer updates
+                for key, row in batch.items():
+                    self._buffer.setdefault(key, row)
+                raise
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            return len(batch)
+
+    async def _copy_upsert(self, records: list):
+        """COPY records into the staging table and merge into market_data."""
+        async with self.engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            pg = raw.driver_connection  # asyncpg.Connection
+            async with pg.transaction():
+                await pg.execute(CREATE_STAGE_SQL)
+                await pg.copy_records_to_table(
+                    STAGE_TABLE, records=records, columns=COLUMNS
+                )
+                await pg.execute(UPSERT_SQL)
+
+    def stats(self) -> Dict[str, Any]:
+        """Ingestion metrics for health and monitoring endpoints."""
+        return {
+            "queue_depth": self.queue_depth,
+            "rows_flushed": self.rows_flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3)
+            if self.flushes else 0.0,
+        }
@@ -0,0 +1,363 @@
+"""
+Write-behind journal for Revolution X
+Crash-safe, batched persistence of trades and audit records
+
+Callers hand records to the journal and return immediately: each record is
+appended as one JSON line to a local file, handed to the OS at once so it
+survives the process dying, and queued in memory. A background
+task writes queued records to Postgres in batches through
+``AsyncSessionLocal`` and then appends an ``{"ack": seq}`` line. On startup
+any record after the last ack is replayed, so nothing accepted before a
+crash or a database outage is lost. Writes are idempotent (trades upsert by
+id, audit rows skip existing ids), which makes a replay after a partially
+acknowledged batch safe.
+
+A batch that keeps failing for a reason other than connectivity (bad
+data, constraint violations) is retried record by record after
+``JOURNAL_MAX_ATTEMPTS`` tries; records that still fail are moved to a
+``.quarantine.jsonl`` file next to the journal and acknowledged, so one bad
+record never blocks the ones queued behind it.
+
+Line layout:
+    {"seq": 12, "kind": "trade", "data": {...}}
+    {"ack": 12}
+"""
+
+import asyncio
+import fcntl
+import itertools
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, IO
+
+from sqlalchemy import DateTime, Enum as SQLEnum, bindparam, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.config import settings
+from app.database.connection import AsyncSessionLocal
+from app.database.models import AuditLog, Trade
+
+TRADE = "trade"
+AUDIT = "audit"
+
+# Errors that say nothing about the records themselves: keep retrying
+TRANSIENT_ERRORS = (OSError, asyncio.TimeoutError, OperationalError, InterfaceError)
+
+
+def _is_transient(error: Exception) -> bool:
+    return isinstance(error, TRANSIENT_ERRORS) or getattr(error, "connection_invalidated", False)
+
+
+def _coerce(table, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn JSON values back into what the column types expect."""
+    row = {}
+    for key, value in data.items():
+        column = table.c[key]
+        if value is not None:
+            if isinstance(column.type, DateTime) and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, SQLEnum) and column.type.enum_class:
+                value = column.type.enum_class(value)
+            elif key in ("id", "user_id"):
+                value = uuid.UUID(str(value))
+        row[key] = value
+    return row
+
+
+def _open_exclusive(directory: str, stem: str) -> IO:
+    """
+    Open (creating if needed) the first ``stem-N.jsonl`` journal no other
+    process holds, so several workers never share a file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for n in itertools.count():
+        path = os.path.join(directory, f"{stem}-{n}.jsonl")
+        handle = open(path, "a+", encoding="utf-8")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return handle
+        except BlockingIOError:
+            handle.close()
+
+
+class WriteBehindJournal:
+    """
+    Append-only journal in front of the trades and audit_logs tables.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        self.directory = directory or settings.JOURNAL_DIR
+        self.batch_size = batch_size or settings.JOURNAL_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.JOURNAL_FLUSH_INTERVAL
+
+        self._file: Optional[IO] = None
+        self._queue: List[Dict[str, Any]] = []
+        self._seq = 0
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._head_failures = 0  # Non-transient failures of the batch at the head
+
+        # Metrics
+        self.records_written: int = 0
+        self.replayed: int = 0
+        self.flushes: int = 0
+        self.failed_flushes: int = 0
+        self.quarantined: int = 0
+        self.last_flush_ms: float = 0.0
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._file.name if self._file else None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def record(self, kind: str, data: Dict[str, Any]) -> int:
+        """
+        Accept a ``trade`` or ``audit`` record. Never blocks on the database;
+        returns the record's sequence number.
+        """
+        self._seq += 1
+        entry = {"seq": self._seq, "kind": kind, "data": data}
+        if self._file:
+            self._file.write(json.dumps(entry, default=str) + "\n")
+            self._file.flush()  # fsync waits for the batch
+        self._queue.append(entry)
+        if len(self._queue) >= self.batch_size:
+            self._flush_requested.set()
+        return self._seq
+
+    def trade(self, **data) -> int:
+        """
+        Journal a new trade (all required columns) or changes to an existing
+        one (``id`` plus the changed columns).
+        """
+        return self.record(TRADE, data)
+
+    def audit(
+        self,
+        action: str,
+        details: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+    ) -> int:
+        """Journal an audit log entry."""
+        return self.record(AUDIT, {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "action": action,
+            "details": json.dumps(details, default=str) if details is not None else None,
+            "ip_address": ip_address,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    async def start(self):
+        """Open this process's journal, replay unacknowledged records and start flushing."""
+        if self._task is not None:
+            return
+        self._file = _open_exclusive(self.directory, settings.PROCESS_ROLE)
+        self._replay()
+        self._task = asyncio.create_task(self._flush_loop())
+        if self.replayed:
+            print(f"✅ Journal replaying {self.replayed} records from {self.path}")
+        if self._queue:
+            self._flush_requested.set()
+
+    def _replay(self):
+        self._file.seek(0)
+        pending: Dict[int, Dict[str, Any]] = {}
+        acked = 0
+        *lines, tail = self._file.read().split("\n")
+        if tail:
+            # Torn final line from a crash: cut it off, or the next append
+            # would be glued onto it and lost on the next replay
+            self._file.truncate(sum(len(line.encode("utf-8")) + 1 for line in lines))
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print("⚠️ Journal skipping unreadable line")
+                continue
+            if "ack" in entry:
+                acked = max(acked, entry["ack"])
+            else:
+                pending[entry["seq"]] = entry
+        # Records accepted before start() are newer than anything on disk
+        early = self._queue
+        self._queue = [e for s, e in sorted(pending.items()) if s > acked]
+        self._seq = max([acked, *pending])
+        self.replayed = len(self._queue)
+
+        self._compact()
+        # Rewrite the pre-start records with their new sequence numbers
+        for entry in early:
+            self.record(entry["kind"], entry["data"])
+
+    async def stop(self):
+        """Flush what is queued and close the journal."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            while self._queue:
+                await self.flush()
+        except Exception as e:
+            print(f"⚠️ Journal flush failed, {len(self._queue)} records kept for replay: {e}")
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    async def _flush_loop(self):
+        backoff = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            if not self._queue:
+                continue
+            try:
+                while self._queue:
+                    await self.flush()
+                backoff = self.flush_interval
+            except Exception as e:
+                backoff = min(backoff * 2, 30.0)
+                print(f"⚠️ Journal flush failed, retrying in {backoff:.1f}s: {e}")
+
+    async def flush(self) -> int:
+        """
+        Write one batch to the database and acknowledge it.
+        Returns the number of records written.
+        """
+        async with self._flush_lock:
+            batch = self._queue[:self.batch_size]
+            if not batch:
+                return 0
+            started = time.perf_counter()
+
+            # Make the batch durable on disk before it counts as in flight
+            await asyncio.get_running_loop().run_in_executor(None, self._sync_file)
+            try:
+                await self._write(batch)
+            except Exception as e:
+                self.failed_flushes += 1
+                if _is_transient(e):
+                    raise
+                self._head_failures += 1
+                if self._head_failures < settings.JOURNAL_MAX_ATTEMPTS:
+                    raise
+                await self._isolate(batch)
+            self._head_failures = 0
+
+            del self._queue[:len(batch)]
+            if self._file:
+                self._file.write(json.dumps({"ack": batch[-1]["seq"]}) + "\n")
+                self._compact()
+            self.flushes += 1
+            self.records_written += len(batch)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return len(batch)
+
+    async def _isolate(self, batch: List[Dict[str, Any]]):
+        """Write a failing batch one record at a time, quarantining the bad ones."""
+        for entry in batch:
+            try:
+                await self._write([entry])
+            except Exception as e:
+                if _is_transient(e):
+                    raise
+                self._quarantine(entry, e)
+
+    def _quarantine(self, entry: Dict[str, Any], error: Exception):
+        path = os.path.splitext(self.path or os.path.join(self.directory, "journal"))[0]
+        with open(f"{path}.quarantine.jsonl", "a", encoding="utf-8") as handle:
+            handle.write(json.dumps({**entry, "error": str(error)}, default=str) + "\n")
+        self.quarantined += 1
+        print(f"⚠️ Journal quarantined record {entry['seq']}: {error}")
+
+    def _compact(self):
+        """Start a fresh file once everything on disk is acknowledged."""
+        if self._queue or not self._file:
+            return
+        self._file.flush()
+        if os.fstat(self._file.fileno()).st_size > settings.JOURNAL_COMPACT_BYTES:
+            self._file.truncate(0)
+
+    def _sync_file(self):
+        if self._file:
+            self._file.flush()
+            if settings.JOURNAL_FSYNC:
+                os.fsync(self._file.fileno())
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        # Collapse successive updates of one trade into a single row
+        trades: Dict[str, Dict[str, Any]] = {}
+        audits: List[Dict[str, Any]] = []
+        for entry in batch:
+            if entry["kind"] == TRADE:
+                trades.setdefault(str(entry["data"]["id"]), {}).update(entry["data"])
+            elif entry["kind"] == AUDIT:
+                audits.append(_coerce(AuditLog.__table__, entry["data"]))
+
+        async with AsyncSessionLocal() as session:
+            # Rows with the same columns go out as one executemany
+            groups: Dict[tuple, List[Dict[str, Any]]] = {}
+            for data in trades.values():
+                groups.setdefault(tuple(sorted(data)), []).append(
+                    _coerce(Trade.__table__, data)
+                )
+            for columns, rows in groups.items():
+                if "symbol" not in columns:
+                    # Changes to a trade written by an earlier batch. A Core
+                    # UPDATE: a missing row is a no-op, not a StaleDataError
+                    table = Trade.__table__
+                    stmt = update(table).where(table.c.id == bindparam("trade_id"))
+                    await session.execute(stmt, [
+                        {**{k: v for k, v in row.items() if k != "id"}, "trade_id": row["id"]}
+                        for row in rows
+                    ])
+                    continue
+                stmt = insert(Trade.__table__)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={c: stmt.excluded[c] for c in columns if c != "id"},
+                )
+                await session.execute(stmt, rows)
+            if audits:
+                stmt = insert(AuditLog.__table__).on_conflict_do_nothing(
+                    index_elements=["id"]
+                )
+                await session.execute(stmt, audits)
+            await session.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "queue_depth": self.queue_depth,
+            "records_written": self.records_written,
+            "replayed": self.replayed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "quarantined": self.quarantined,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+
+# Shared journal
+journal = WriteBehindJournal()
@@ -87,10 +87,12 @@ class UserSession(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     token = Column(Text, nullable=False)
+    token_hash = Column(String(64), nullable=False)  # SHA-256 hex; lookups use this
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
     user_agent = Column(Text, nullable=True)
     is_revoked = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
     
     # Relationships
@@ -98,7 +100,8 @@ class UserSession(Base):
     
     __table_args__ = (
         Index("ix_sessions_user_id", "user_id"),
-        Index("ix_sessions_token", "token"),
+        Index("ix_sessions_token_hash", "token_hash", unique=True),
+        Index("ix_sessions_updated_at", "updated_at"),  # Revocation sync
     )
 
 
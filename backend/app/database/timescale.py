@@ -0,0 +1,217 @@
+"""
+TimescaleDB setup for Revolution X
+Hypertable, compression, retention and continuous aggregates
+
+Only the finest timeframe (M1) is ingested into ``market_data``. Coarser
+bars come from a hierarchy of continuous aggregates (M1 -> M5 -> M15 -> H1
+-> H4, H1 -> D1), each with a covering (symbol, time) index so range reads
+over materialized history are index-only; real-time aggregation fills in
+the few buckets not yet materialized. The live, still-forming bar is
+produced in process by ``core.resampler.Resampler``.
+
+Setup is idempotent and runs from ``init_db``. Each statement runs on its
+own, so a step that an older TimescaleDB does not support is reported and
+skipped instead of aborting startup.
+"""
+
+import re
+from typing import Optional, Dict, List, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+BASE_TIMEFRAME = "M1"
+
+# Aggregate timeframe -> (bucket width, source timeframe)
+AGGREGATES: Dict[str, Tuple[str, str]] = {
+    "M5": ("5 minutes", "M1"),
+    "M15": ("15 minutes", "M5"),
+    "H1": ("1 hour", "M15"),
+    "H4": ("4 hours", "H1"),
+    "D1": ("1 day", "H1"),
+}
+
+# Refresh policy per aggregate: (start offset, end offset, schedule)
+REFRESH_POLICIES: Dict[str, Tuple[str, str, str]] = {
+    "M5": ("1 day", "5 minutes", "1 minute"),
+    "M15": ("2 days", "15 minutes", "5 minutes"),
+    "H1": ("7 days", "1 hour", "15 minutes"),
+    "H4": ("30 days", "4 hours", "1 hour"),
+    "D1": ("90 days", "1 day", "1 hour"),
+}
+
+OHLCV = "open, high, low, close, volume, spread"
+
+# Aggregates that exist in the connected database (filled in by setup)
+_available: Set[str] = set()
+
+
+def aggregate_view(timeframe: str) -> str:
+    return f"market_data_{timeframe.lower()}"
+
+
+def _check_timeframe(timeframe: str) -> str:
+    if not re.fullmatch(r"[A-Z]+[0-9]*", timeframe):
+        raise ValueError(f"Invalid timeframe: {timeframe!r}")
+    return timeframe
+
+
+def bars_relation(timeframe: str) -> Tuple[str, str]:
+    """
+    Relation holding the bars of a timeframe and the filter selecting them:
+    the continuous aggregate when there is one, else ``market_data``.
+    """
+    if timeframe in _available:
+        return aggregate_view(timeframe), "symbol = $1"
+    return "market_data", f"symbol = $1 AND timeframe = '{_check_timeframe(timeframe)}'"
+
+
+def bars_sql(
+    timeframe: str,
+    where: str = "",
+    order: str = "time",
+    limit: Optional[str] = None,
+    float8: bool = False,
+) -> str:
+    """
+    SELECT of (epoch, open, high, low, close, volume, spread) for one symbol
+    (``$1``) and timeframe. ``where`` and ``limit`` may use ``$2`` onwards.
+    ``float8`` casts every column so the driver skips Decimal decoding.
+    """
+    relation, condition = bars_relation(timeframe)
+    columns = f"extract(epoch FROM time), {OHLCV}"
+    if float8:
+        columns = ", ".join(f"({c})::float8" for c in columns.split(", "))
+    sql = f"SELECT {columns} FROM {relation} WHERE {condition}"
+    if where:
+        sql += f" AND {where}"
+    sql += f" ORDER BY {order}"
+    if limit:
+        sql += f" LIMIT {limit}"
+    return sql
+
+
+def _aggregate_ddl(timeframe: str) -> List[str]:
+    bucket, source = AGGREGATES[timeframe]
+    view = aggregate_view(timeframe)
+    if source == BASE_TIMEFRAME:
+        relation, condition = "market_data", f"WHERE timeframe = '{BASE_TIMEFRAME}'"
+    else:
+        relation, condition = aggregate_view(source), ""
+    start, end, schedule = REFRESH_POLICIES[timeframe]
+    return [
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT time_bucket(INTERVAL '{bucket}', time) AS time,
+               symbol,
+               first(open, time) AS open,
+               max(high) AS high,
+               min(low) AS low,
+               last(close, time) AS close,
+               sum(volume) AS volume,
+               last(spread, time) AS spread
+        FROM {relation} {condition}
+        GROUP BY 1, symbol
+        WITH NO DATA
+        """,
+        # Covering index: range reads never touch the heap
+        f"""
+        CREATE INDEX IF NOT EXISTS ix_{view}_symbol_time
+        ON {view} (symbol, time DESC) INCLUDE ({OHLCV})
+        """,
+        f"""
+        SELECT add_continuous_aggregate_policy('{view}',
+            start_offset => INTERVAL '{start}',
+            end_offset => INTERVAL '{end}',
+            schedule_interval => INTERVAL '{schedule}',
+            if_not_exists => TRUE)
+        """,
+    ]
+
+
+def setup_statements() -> List[str]:
+    """Every DDL statement of the TimescaleDB setup, in order."""
+    statements = [
+        f"""
+        SELECT create_hypertable('market_data', 'time',
+            chunk_time_interval => INTERVAL '{settings.MARKET_DATA_CHUNK_DAYS} days',
+            if_not_exists => TRUE,
+            migrate_data => TRUE)
+        """,
+        """
+        ALTER TABLE market_data SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'symbol, timeframe',
+            timescaledb.compress_orderby = 'time DESC')
+        """,
+        f"""
+        SELECT add_compression_policy('market_data',
+            INTERVAL '{settings.MARKET_DATA_COMPRESS_AFTER_DAYS} days',
+            if_not_exists => TRUE)
+        """,
+    ]
+    if settings.MARKET_DATA_RETENTION_DAYS:
+        # Raw M1 bars only; the aggregates keep the long history
+        statements.append(f"""
+        SELECT add_retention_policy('market_data',
+            INTERVAL '{settings.MARKET_DATA_RETENTION_DAYS} days',
+            if_not_exists => TRUE)
+        """)
+    for timeframe in AGGREGATES:
+        statements.extend(_aggregate_ddl(timeframe))
+    return statements
+
+
+async def setup_timescale(engine: AsyncEngine):
+    """Create the hypertable, policies and continuous aggregates if missing."""
+    async with engine.connect() as conn:
+        has_timescale = await conn.scalar(text(
+            "SELECT count(*) FROM pg_extension WHERE extname = 'timescaledb'"
+        ))
+        has_table = await conn.scalar(text("SELECT to_regclass('market_data') IS NOT NULL"))
+    if not has_timescale or not has_table:
+        print("⚠️ TimescaleDB setup skipped (extension or market_data table missing)")
+        await _load_available(engine)
+        return
+
+    # Continuous aggregates cannot be created inside a transaction block
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in setup_statements():
+            try:
+                await conn.execute(text(statement))
+            except Exception as e:
+                first_line = " ".join(statement.split())[:60]
+                print(f"⚠️ TimescaleDB step failed ({first_line}...): {e}")
+    await _load_available(engine)
+    print(f"✅ TimescaleDB ready (aggregates: {', '.join(sorted(_available)) or 'none'})")
+
+
+async def _load_available(engine: AsyncEngine):
+    async with engine.connect() as conn:
+        for timeframe in AGGREGATES:
+            exists = await conn.scalar(text(
+                f"SELECT to_regclass('{aggregate_view(timeframe)}') IS NOT NULL"
+            ))
+            if exists:
+                _available.add(timeframe)
+            else:
+                _available.discard(timeframe)
+
+
+async def refresh_aggregates(engine: AsyncEngine, window: str = "1 day"):
+    """
+    Refresh every aggregate over the last ``window``, finest first, e.g.
+    after a history backfill. The policies cover the steady state.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for timeframe in AGGREGATES:
+            if timeframe in _available:
+                await conn.execute(text(
+                    f"CALL refresh_continuous_aggregate('{aggregate_view(timeframe)}', "
+                    f"now() - INTERVAL '{window}', now())"
+                ))
@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connection import AsyncSessionLocal
 from app.config import settings
+from auth.service import auth_service, AuthError
 
 # Security scheme
 security = HTTPBearer(auto_error=False)
@@ -41,8 +42,10 @@ async def get_current_user_optional(
     if not credentials:
         return {}
     
-    # TODO: Implement JWT validation in Phase 2
-    return {"id": "anonymous", "role": "guest"}
+    try:
+        return auth_service.user(credentials.credentials)
+    except AuthError:
+        return {}
 
 
 async def get_current_user_required(
@@ -59,5 +62,12 @@ async def get_current_user_required(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # TODO: Implement JWT validation in Phase 2
-    return {"id": "user_id", "role": "trader"}
+    # Verified locally against the token cache and revocation set
+    try:
+        return auth_service.user(credentials.credentials)
+    except AuthError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -3,16 +3,37 @@ Main FastAPI application for Revolution X
 Ubuntu 24.04 optimized
 """
 
+import asyncio
 import sys
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.database.connection import init_db, close_db
+from app.database.connection import init_db, close_db, async_engine
+from app.database.ingestion import MarketDataIngestor
+from app.database.journal import journal
+from app.database.timescale import refresh_aggregates
 from app.api.v1.router import api_router
+from core.market_data import market_data_cache
+from core.resampler import Resampler
+from ai.scanner import smart_scanner
+from ai.predictor import inference_server, model_registry, register_default_models
+from app.realtime.hub import ws_hub
+from app.realtime.bus import create_event_bus
+from app.mt5.snapshot import account_snapshot, ACCOUNT, SNAPSHOT
+from core.trading_engine import TradingEngine, FILLED
+from microstructure.order_flow import microstructure_engine
+from strategies.volume_profile import volume_profiles
+from dxy_guardian.tracker import dxy_tracker
+from strategies.smc import smc_engine
+from auth.service import auth_service, setup_sessions
+from telegram.alerts import alert_dispatcher
+from telegram.commands import commands
+from services.scheduler import scheduler, IntervalTrigger, BarCloseTrigger, CronTrigger
+from guardian.monitor import runtime_monitor, LatencyMiddleware
 
 # Import connection managers
 from app.mt5.connector import MT5ConnectionManager
@@ -20,6 +41,220 @@ from app.mt5.connector import MT5ConnectionManager
 
 # Global connection managers
 mt5_manager = MT5ConnectionManager()
+market_data_ingestor = MarketDataIngestor()
+trading_engine = TradingEngine(mt5_manager, journal=journal)
+
+# Owner publishes on the bus; API workers subscribe to it
+OWNS_MARKET_DATA = settings.PROCESS_ROLE in ("all", "owner")
+SERVES_CLIENTS = settings.PROCESS_ROLE in ("all", "api")
+event_bus = create_event_bus(publisher=OWNS_MARKET_DATA)
+
+
+async def _publish_ticks(subscription):
+    """Forward MT5 ticks to the event bus."""
+    async for event in subscription:
+        await event_bus.publish(f"ticks:{event.symbol}", event.data)
+
+
+async def _publish_scan(cycle):
+    """Share the latest scanner ranking with the API workers."""
+    await event_bus.publish("scanner", smart_scanner.snapshot_json)
+
+
+async def _scan():
+    await _publish_scan(await smart_scanner.run_cycle())
+
+
+async def _reload_models():
+    """Pick up models retrained offline into ``settings.MODEL_DIR``."""
+    for name in model_registry.names():
+        try:
+            await model_registry.reload(name)
+        except Exception as e:
+            print(f"⚠️ Model {name} failed to reload: {e}")
+
+
+async def _relay_bus(subscription):
+    """
+    Fan bus events out to this worker's WebSocket clients. An event that
+    fails to apply is logged and skipped; the relay keeps running.
+    """
+    async for topic, payload in subscription:
+        try:
+            if topic == "scanner":
+                smart_scanner.load_snapshot(payload)
+            elif topic == SNAPSHOT:
+                if not OWNS_MARKET_DATA:
+                    account_snapshot.apply(topic, payload)
+            else:
+                ws_hub.publish(topic, payload)
+        except Exception as e:
+            print(f"⚠️ Bus relay skipped a {topic} event: {e}")
+
+
+def _on_snapshot_change(topic, payload):
+    """Keep the engine's equity current and share changes with the workers."""
+    if topic == ACCOUNT:
+        trading_engine.update_account(payload)
+    return event_bus.publish(topic, payload)
+
+
+def _wire_account_snapshot():
+    """Refresh the account snapshot on trade events, not only on its interval."""
+    account_snapshot.attach(mt5_manager)
+    account_snapshot.on_position_closed = trading_engine.on_position_closed
+    account_snapshot.on_positions = trading_engine.on_positions
+    account_snapshot.listeners.append(_on_snapshot_change)
+    trading_engine.listeners.append(lambda report: scheduler.run_now("account_snapshot"))
+
+
+def _alert_execution(report):
+    """Queue a Telegram alert for each executed or refused signal."""
+    signal = report.signal
+    if report.status == FILLED:
+        alert_dispatcher.submit(
+            f"{signal.symbol} {signal.direction.upper()} {report.volume} @ {signal.entry} "
+            f"SL {signal.stop_loss} (#{report.ticket})",
+            level="trade",
+            # Every fill is its own alert; the default key masks the ticket
+            key=f"fill:{report.ticket}",
+        )
+    else:
+        alert_dispatcher.submit(
+            f"{signal.symbol} {signal.direction.upper()} {report.status}: {report.reason}",
+            level="warning",
+        )
+
+
+async def _start_telegram() -> list:
+    """Start alert delivery and command polling."""
+    await alert_dispatcher.start()
+    if OWNS_MARKET_DATA:
+        trading_engine.listeners.append(_alert_execution)
+    print("✅ Telegram alerts enabled")
+    # Only one process may long-poll getUpdates for a bot
+    if not OWNS_MARKET_DATA:
+        return []
+    return [asyncio.create_task(commands.poll_forever(alert_dispatcher.bot))]
+
+
+def _start_monitor() -> list:
+    """Sample runtime latencies and look for anomalies every window."""
+    scheduler.add("guardian_analyze", runtime_monitor.analyze, IntervalTrigger(settings.MONITOR_INTERVAL))
+    scheduler.add(
+        "guardian_logs",
+        runtime_monitor.writer.flush,
+        IntervalTrigger(settings.GUARDIAN_LOG_FLUSH_INTERVAL),
+    )
+    print("✅ Runtime monitor started")
+    return [asyncio.create_task(runtime_monitor.run_lag_sampler())]
+
+
+async def _start_market_data() -> list:
+    """Connect MT5 and start the market-data pipeline (owner process only)."""
+    tasks = []
+    
+    # Initialize MT5 connection (optional in Phase 1)
+    try:
+        await mt5_manager.connect()
+        print("✅ MT5 connected")
+    except Exception as e:
+        print(f"⚠️ MT5 not available: {e}")
+    
+    # Load equity, contract specs and open positions for the trading engine
+    if mt5_manager.is_connected:
+        try:
+            await trading_engine.start()
+            print("✅ Trading engine ready")
+        except Exception as e:
+            print(f"⚠️ Trading engine not ready: {e}")
+    
+    # Account and positions served from memory, refreshed on trade events
+    _wire_account_snapshot()
+    scheduler.add("account_snapshot", account_snapshot.refresh, IntervalTrigger(settings.SNAPSHOT_INTERVAL))
+    if settings.MONITOR_ENABLED:
+        scheduler.add(
+            "mt5_ping",
+            runtime_monitor.sample_mt5,
+            IntervalTrigger(settings.MONITOR_MT5_PING_INTERVAL),
+            args=(mt5_manager,),
+        )
+    
+    # Stream bars into the market_data hypertable
+    await market_data_ingestor.start()
+    if mt5_manager.is_connected:
+        subscription = mt5_manager.subscribe(
+            timeframes=settings.INGEST_TIMEFRAMES,
+            ticks=settings.INGEST_TICKS,
+        )
+        tasks.append(asyncio.create_task(
+            market_data_ingestor.consume(subscription)
+        ))
+        print("✅ Market data ingestion started")
+        
+        # Keep the in-process bar cache current, coarse timeframes included
+        tasks.append(asyncio.create_task(market_data_cache.consume(
+            mt5_manager.subscribe(timeframes=settings.INGEST_TIMEFRAMES, ticks=False),
+            resampler=Resampler(),
+        )))
+        
+        # Publish ticks on the bus (latest tick wins if the bus falls behind)
+        tasks.append(asyncio.create_task(_publish_ticks(
+            mt5_manager.subscribe(policy="coalesce")
+        )))
+        
+        # Order book, delta and imbalance; book increments must never be
+        # coalesced, so this subscription drops oldest (gaps force a resync)
+        tasks.append(asyncio.create_task(microstructure_engine.consume(
+            mt5_manager.subscribe(books=True, policy="drop_oldest")
+        )))
+        tasks.append(asyncio.create_task(
+            microstructure_engine.publish_forever(event_bus.publish)
+        ))
+        print("✅ Order flow engine started")
+        
+        # Session and rolling volume profiles, updated per bar
+        tasks.append(asyncio.create_task(volume_profiles.consume(
+            mt5_manager.subscribe(timeframes=[settings.VOLUME_PROFILE_TIMEFRAME], ticks=False)
+        )))
+        
+        # DXY/metal correlations: backfilled once, then O(1) per bar
+        try:
+            await dxy_tracker.backfill()
+        except Exception as e:
+            print(f"⚠️ DXY backfill failed: {e}")
+        tasks.append(asyncio.create_task(dxy_tracker.consume(mt5_manager.subscribe(
+            symbols=[*settings.TRADABLE_ASSETS, settings.DXY_SYMBOL],
+            timeframes=[settings.DXY_TIMEFRAME],
+            ticks=False,
+        ))))
+        
+        # Market structure per symbol/timeframe, one closed bar at a time
+        try:
+            await smc_engine.warm_up()
+        except Exception as e:
+            print(f"⚠️ SMC warm-up failed: {e}")
+        tasks.append(asyncio.create_task(smc_engine.consume(
+            mt5_manager.subscribe(timeframes=settings.SMC_TIMEFRAMES, ticks=False)
+        )))
+    
+    # Register AI models (loaded lazily on first prediction)
+    register_default_models(model_registry)
+    
+    # Start the Smart Scanner
+    smart_scanner.start()
+    scheduler.add("scanner", _scan, IntervalTrigger(settings.SCANNER_INTERVAL))
+    print("✅ Smart Scanner started")
+    
+    # Recent aggregates just after each close; nightly model reload
+    scheduler.add(
+        "refresh_aggregates",
+        refresh_aggregates,
+        BarCloseTrigger(settings.AGGREGATE_REFRESH_TIMEFRAME, settings.SCHEDULER_BAR_CLOSE_OFFSET),
+        args=(async_engine, settings.AGGREGATE_REFRESH_WINDOW),
+    )
+    scheduler.add("reload_models", _reload_models, CronTrigger(settings.MODEL_RELOAD_CRON), jitter=60.0)
+    return tasks
 
 
 @asynccontextmanager
@@ -29,25 +264,62 @@ async def lifespan(app: FastAPI):
     Handles startup and shutdown events.
     """
     # Startup
-    print(f"🚀 Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    print(f"🚀 Starting {settings.APP_NAME} v{settings.APP_VERSION} ({settings.PROCESS_ROLE})")
     
     # Initialize database
     await init_db()
-    print("✅ Database initialized")
-    
-    # Initialize MT5 connection (optional in Phase 1)
     try:
-        await mt5_manager.connect()
-        print("✅ MT5 connected")
+        await setup_sessions()
     except Exception as e:
-        print(f"⚠️ MT5 not available: {e}")
+        print(f"⚠️ Session schema upgrade failed: {e}")
+    print("✅ Database initialized")
+    
+    # Trades and audit logs are written behind; replay what was not acked
+    await journal.start()
+    
+    await event_bus.start()
+    tasks = []
+    if SERVES_CLIENTS:
+        tasks.append(asyncio.create_task(_relay_bus(event_bus.subscribe())))
+        # Tokens are verified in-process; only revocations come from the DB
+        scheduler.add(
+            "revocation_sync",
+            auth_service.revocations.sync,
+            IntervalTrigger(settings.AUTH_REVOCATION_SYNC_INTERVAL),
+            jitter=0.5,
+        )
+        if settings.WS_REQUIRE_AUTH:
+            ws_hub.authenticate = auth_service.verify
+    if OWNS_MARKET_DATA:
+        tasks.extend(await _start_market_data())
+    if settings.TELEGRAM_ENABLED and settings.TELEGRAM_BOT_TOKEN:
+        tasks.extend(await _start_telegram())
+    if settings.MONITOR_ENABLED:
+        tasks.extend(_start_monitor())
+    scheduler.start()
     
     yield
     
     # Shutdown
     print("🛑 Shutting down...")
     
-    await mt5_manager.disconnect()
+    for task in tasks:
+        task.cancel()
+    await scheduler.stop()
+    if settings.MONITOR_ENABLED:
+        try:
+            await runtime_monitor.writer.flush()
+        except Exception as e:
+            print(f"⚠️ Guardian log flush failed: {e}")
+    if OWNS_MARKET_DATA:
+        await smart_scanner.stop()
+        await inference_server.stop()
+        await market_data_ingestor.stop()
+        await mt5_manager.disconnect()
+    if alert_dispatcher.running:
+        await alert_dispatcher.stop()
+    await event_bus.stop()
+    await journal.stop()
     await close_db()
     print("✅ Cleanup complete")
 
@@ -71,6 +343,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-endpoint latency histograms
+if settings.MONITOR_ENABLED:
+    app.add_middleware(LatencyMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -92,7 +368,22 @@ async def health_check():
     health_status = {
         "status": "healthy",
         "database": "connected",  # TODO: Check actual connection
+        "role": settings.PROCESS_ROLE,
         "mt5": "connected" if mt5_manager.is_connected else "disconnected",
+        "ingestion": market_data_ingestor.stats(),
+        "trading": trading_engine.stats(),
+        "microstructure": microstructure_engine.stats(),
+        "volume_profile": volume_profiles.stats(),
+        "dxy": dxy_tracker.stats(),
+        "smc": smc_engine.stats(),
+        "journal": journal.stats(),
+        "account_snapshot": account_snapshot.stats(),
+        "websocket": ws_hub.stats(),
+        "auth": auth_service.stats(),
+        "scheduler": scheduler.stats(),
+        "guardian": runtime_monitor.stats(),
+        "telegram": alert_dispatcher.stats(),
+        "event_bus": event_bus.stats(),
     }
     return health_status
 
@@ -116,26 +407,10 @@ async def system_info():
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time updates.
+    Clients subscribe to topics (ticks:XAUUSD, signals, positions, account).
+    Pass ``?token=<access token>`` when WS_REQUIRE_AUTH is enabled.
     """
-    await websocket.accept()
-    try:
-        while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            
-            # Echo back for now (Phase 1)
-            # TODO: Implement real-time market data in Phase 3
-            await websocket.send_json({
-                "type": "echo",
-                "message": data,
-                "status": "connected",
-            })
-            
-    except WebSocketDisconnect:
-        print("Client disconnected")
-    except Exception as e:
-        print(f"WebSocket error: {e}")
-        await websocket.close()
+    await ws_hub.handle(websocket, token=websocket.query_params.get("token"))
 
 
 if __name__ == "__main__":
@@ -2,15 +2,24 @@
 MetaTrader 5 connector for Revolution X
 ZeroMQ based communication
 Ubuntu 24.04 compatible
+
+Commands travel over a single DEALER socket. Every request carries a
+correlation ``id`` that the MT5 bridge (a ROUTER socket) echoes back, so
+many commands can be in flight at once and replies are matched to their
+awaiting futures regardless of the order they arrive in.
 """
 
 import asyncio
+import itertools
 import json
+import time
+import uuid
 import zmq
 import zmq.asyncio
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Tuple
 
 from app.config import settings
+from app.mt5.stream import MarketDataStream, Subscription, bar_topic, book_topic, tick_topic
 
 
 class MT5ConnectionManager:
@@ -24,6 +33,16 @@ class MT5ConnectionManager:
         self.socket: Optional[zmq.asyncio.Socket] = None
         self.is_connected: bool = False
         self._lock = asyncio.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._receiver_task: Optional[asyncio.Task] = None
+        self._client_id = uuid.uuid4().hex[:8]
+        self._request_ids = itertools.count(1)
+        self.stream: Optional[MarketDataStream] = None
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of commands currently awaiting a reply."""
+        return len(self._pending)
     
     async def connect(self) -> bool:
         """
@@ -33,14 +52,17 @@ class MT5ConnectionManager:
             async with self._lock:
                 if self.is_connected:
                     return True
+                if self.socket:
+                    # The previous connection failed underneath us
+                    await self._close_socket()
                 
                 self.context = zmq.asyncio.Context()
-                self.socket = self.context.socket(zmq.REQ)
-                self.socket.setsockopt(zmq.RCVTIMEO, settings.MT5_TIMEOUT * 1000)
+                self.socket = self.context.socket(zmq.DEALER)
                 self.socket.setsockopt(zmq.LINGER, 0)
                 
                 address = f"tcp://{settings.MT5_HOST}:{settings.MT5_PORT}"
                 self.socket.connect(address)
+                self._receiver_task = asyncio.create_task(self._receive_loop())
                 
                 # Test connection
                 await self._send_command({"action": "ping"})
@@ -51,40 +73,121 @@ class MT5ConnectionManager:
                 
         except Exception as e:
             print(f"❌ Failed to connect to MT5: {e}")
-            self.is_connected = False
+            await self._close_socket()
             return False
     
     async def disconnect(self):
         """Close connection."""
         async with self._lock:
-            if self.socket:
-                self.socket.close()
-                self.socket = None
-            if self.context:
-                self.context.term()
-                self.context = None
-            self.is_connected = False
+            await self._close_socket()
             print("🔌 Disconnected from MT5")
     
-    async def _send_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
+    async def _close_socket(self):
+        """Stop the receiver, fail pending requests and release the socket."""
+        if self.stream:
+            await self.stream.stop()
+            self.stream = None
+        if self._receiver_task:
+            self._receiver_task.cancel()
+            try:
+                await self._receiver_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._receiver_task = None
+        self._fail_pending(ConnectionError("MT5 connection closed"))
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+        if self.context:
+            self.context.term()
+            self.context = None
+        self.is_connected = False
+    
+    def _fail_pending(self, error: Exception):
+        """Propagate an error to every request still awaiting a reply."""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+    
+    async def _receive_loop(self):
+        """
+        Route replies from MT5 to the futures awaiting them.
+        Replies for requests that already timed out are discarded. If the
+        socket fails, the connection is marked down and every pending
+        request fails at once instead of waiting out its timeout.
+        """
+        socket = self.socket
+        error: Exception = ConnectionError("MT5 receiver stopped")
+        try:
+            while True:
+                try:
+                    frames = await socket.recv_multipart()
+                except zmq.ZMQError as e:
+                    error = ConnectionError(f"MT5 communication error: {e}")
+                    return
+                
+                try:
+                    response = json.loads(frames[-1])
+                except ValueError:
+                    response = None
+                if not isinstance(response, dict) or not isinstance(response.get("id"), str):
+                    print("⚠️ Discarding malformed MT5 reply")
+                    continue
+                
+                future = self._pending.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            if self.socket is socket:
+                self.is_connected = False
+                self._fail_pending(error)
+    
+    async def _send_command(
+        self,
+        command: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
         """
         Send command to MT5 and receive response.
+        
+        Each call waits only for its own reply, so a slow command never
+        delays the others. ``timeout`` defaults to ``settings.MT5_TIMEOUT``.
         """
         if not self.socket:
             raise ConnectionError("Not connected to MT5")
         
+        request_id = f"{self._client_id}-{next(self._request_ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        
         try:
-            # Send command
-            await self.socket.send_json(command)
+            # Send command (empty delimiter keeps the REQ-style envelope)
+            payload = json.dumps({**command, "id": request_id}).encode()
+            await self.socket.send_multipart([b"", payload])
             
             # Receive response
-            response = await self.socket.recv_json()
-            return response
+            return await asyncio.wait_for(
+                future, timeout if timeout is not None else settings.MT5_TIMEOUT
+            )
             
-        except zmq.error.Again:
-            raise TimeoutError("MT5 request timed out")
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"MT5 request '{command.get('action')}' timed out")
+        except ConnectionError:
+            raise
         except Exception as e:
             raise ConnectionError(f"MT5 communication error: {e}")
+        finally:
+            self._pending.pop(request_id, None)
+    
+    async def ping(self, timeout: Optional[float] = None) -> float:
+        """
+        Round trip to the MT5 bridge in seconds. Raises if not connected
+        or on timeout.
+        """
+        started = time.perf_counter()
+        await self._send_command({"action": "ping"}, timeout)
+        return time.perf_counter() - started
     
     async def get_account_info(self) -> Optional[Dict[str, Any]]:
         """
@@ -144,7 +247,9 @@ class MT5ConnectionManager:
             "comment": comment,
         }
         
-        response = await self._send_command(command)
+        response = await self._send_command(
+            command, timeout=settings.MT5_ORDER_TIMEOUT
+        )
         return response
     
     async def close_position(self, ticket: int) -> Optional[Dict[str, Any]]:
@@ -159,7 +264,9 @@ class MT5ConnectionManager:
             "ticket": ticket,
         }
         
-        response = await self._send_command(command)
+        response = await self._send_command(
+            command, timeout=settings.MT5_ORDER_TIMEOUT
+        )
         return response
     
     async def get_positions(self) -> list:
@@ -175,3 +282,47 @@ class MT5ConnectionManager:
         except Exception as e:
             print(f"Error getting positions: {e}")
             return []
+    
+    async def get_state(self) -> Tuple[Dict[str, Any], list]:
+        """
+        Account info and open positions in one go (both requests in flight
+        together). Unlike the getters above, errors are raised, not hidden.
+        """
+        account, positions = await asyncio.gather(
+            self._send_command({"action": "account_info"}),
+            self._send_command({"action": "get_positions"}),
+        )
+        return account.get("data"), positions.get("data", [])
+    
+    def subscribe(
+        self,
+        symbols: Optional[Iterable[str]] = None,
+        timeframes: Iterable[str] = (),
+        ticks: bool = True,
+        books: bool = False,
+        maxsize: Optional[int] = None,
+        policy: Optional[str] = None,
+    ) -> Subscription:
+        """
+        Subscribe to pushed market data.
+        
+        Returns an async iterator of ``MarketEvent`` for the ticks of each
+        symbol (defaults to ``settings.TRADABLE_ASSETS``) and the bars of
+        each requested timeframe, plus depth-of-market updates when
+        ``books`` is set. Each subscriber has its own bounded queue;
+        ``policy`` is ``"drop_oldest"`` or ``"coalesce"``.
+        """
+        if not self.context:
+            raise ConnectionError("MT5 not connected")
+        
+        if self.stream is None:
+            self.stream = MarketDataStream(self.context)
+            self.stream.start()
+        
+        symbols = list(symbols or settings.TRADABLE_ASSETS)
+        topics = [bar_topic(s, tf) for s in symbols for tf in timeframes]
+        if ticks:
+            topics += [tick_topic(s) for s in symbols]
+        if books:
+            topics += [book_topic(s) for s in symbols]
+        return self.stream.subscribe(topics, maxsize=maxsize, policy=policy)
@@ -0,0 +1,210 @@
+"""
+Fake MetaTrader 5 bridge for Revolution X
+Local ZeroMQ ROUTER server for development and testing
+
+Speaks the same envelope as the real MT5 bridge: every request is a JSON
+object carrying an ``id`` that is echoed back in the reply. Requests are
+handled concurrently, and per-action delays can be injected to reproduce a
+slow broker (e.g. a sluggish ``symbol_info`` next to a fast ``place_order``).
+
+A PUB socket can also be bound to push ticks and bars to subscribers.
+
+Run standalone with:
+    python -m app.mt5.fake_server
+"""
+
+import asyncio
+import itertools
+import json
+import zmq
+import zmq.asyncio
+from typing import Optional, Dict, Any, Callable, List
+
+from app.config import settings
+
+
+class FakeMT5Server:
+    """
+    In-process ROUTER server mimicking the MT5 bridge.
+    """
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        delays: Optional[Dict[str, float]] = None,
+        stream_address: Optional[str] = None,
+    ):
+        self.address = address or f"tcp://*:{settings.MT5_PORT}"
+        self.stream_address = stream_address or f"tcp://*:{settings.MT5_STREAM_PORT}"
+        self.delays: Dict[str, float] = dict(delays or {})
+        self.requests_handled: int = 0
+        self.context: Optional[zmq.asyncio.Context] = None
+        self.socket: Optional[zmq.asyncio.Socket] = None
+        self.pub_socket: Optional[zmq.asyncio.Socket] = None
+        self._seq: Dict[str, int] = {}
+        self._serve_task: Optional[asyncio.Task] = None
+        self._handlers_running: set = set()
+        self._tickets = itertools.count(100000)
+        self.positions: list = []
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "ping": lambda cmd: {"status": "ok"},
+            "account_info": self._account_info,
+            "symbol_info": self._symbol_info,
+            "get_positions": lambda cmd: {"status": "ok", "data": list(self.positions)},
+            "place_order": self._place_order,
+            "close_position": self._close_position,
+        }
+
+    async def start(self):
+        """Bind the ROUTER and PUB sockets and start serving."""
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.bind(self.address)
+        self.pub_socket = self.context.socket(zmq.PUB)
+        self.pub_socket.setsockopt(zmq.LINGER, 0)
+        self.pub_socket.bind(self.stream_address)
+        self._serve_task = asyncio.create_task(self._serve())
+
+    async def stop(self):
+        """Stop serving and release the sockets."""
+        for task in [self._serve_task, *self._handlers_running]:
+            if task:
+                task.cancel()
+        if self._serve_task:
+            try:
+                await self._serve_task
+            except asyncio.CancelledError:
+                pass
+            self._serve_task = None
+        for sock in (self.socket, self.pub_socket):
+            if sock:
+                sock.close()
+        self.socket = self.pub_socket = None
+        if self.context:
+            self.context.term()
+            self.context = None
+
+    async def publish(self, topic: str, data: Dict[str, Any], seq: Optional[int] = None):
+        """Push an event on the stream, numbering it per topic."""
+        if seq is None:
+            seq = self._seq.get(topic, 0) + 1
+        self._seq[topic] = seq
+        body = json.dumps({**data, "seq": seq}).encode()
+        await self.pub_socket.send_multipart([topic.encode(), body])
+
+    async def publish_tick(self, symbol: str, bid: float, ask: float, **extra):
+        """Push a tick for a symbol."""
+        await self.publish(f"tick:{symbol}", {"symbol": symbol, "bid": bid, "ask": ask, **extra})
+
+    async def publish_bar(self, symbol: str, timeframe: str, bar: Dict[str, Any]):
+        """Push a bar for a symbol and timeframe."""
+        await self.publish(
+            f"bar:{symbol}:{timeframe}",
+            {"symbol": symbol, "timeframe": timeframe, **bar},
+        )
+
+    async def publish_book(
+        self,
+        symbol: str,
+        bids: List[List[float]],
+        asks: List[List[float]],
+        snapshot: bool = False,
+    ):
+        """Push ``[price, volume]`` depth updates (volume 0 removes a level)."""
+        await self.publish(
+            f"book:{symbol}",
+            {"symbol": symbol, "bids": bids, "asks": asks, "snapshot": snapshot},
+        )
+
+    async def _serve(self):
+        """Receive requests and dispatch each to its own task."""
+        while True:
+            frames = await self.socket.recv_multipart()
+            task = asyncio.create_task(self._handle(frames))
+            self._handlers_running.add(task)
+            task.add_done_callback(self._handlers_running.discard)
+
+    async def _handle(self, frames: list):
+        """Answer a single request, preserving the routing envelope."""
+        envelope, body = frames[:-1], frames[-1]
+        try:
+            command = json.loads(body)
+        except ValueError:
+            return
+
+        action = command.get("action")
+        delay = self.delays.get(action, 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        handler = self.handlers.get(action)
+        if handler is None:
+            reply = {"status": "error", "message": f"Unknown action: {action}"}
+        else:
+            reply = handler(command)
+        reply["id"] = command.get("id")
+
+        self.requests_handled += 1
+        await self.socket.send_multipart([*envelope, json.dumps(reply).encode()])
+
+    def _account_info(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "data": {
+                "balance": 10000.0,
+                "equity": 10000.0,
+                "margin": 0.0,
+                "free_margin": 10000.0,
+                "currency": "USD",
+                "leverage": 100,
+            },
+        }
+
+    def _symbol_info(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "data": {
+                "symbol": command.get("symbol"),
+                "digits": 2,
+                "point": 0.01,
+                "trade_contract_size": 100.0,
+                "volume_min": 0.01,
+                "volume_max": 100.0,
+                "volume_step": 0.01,
+            },
+        }
+
+    def _place_order(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        ticket = next(self._tickets)
+        self.positions.append({
+            "ticket": ticket,
+            "symbol": command.get("symbol"),
+            "type": command.get("order_type"),
+            "volume": command.get("volume"),
+            "sl": command.get("stop_loss"),
+            "tp": command.get("take_profit"),
+        })
+        return {"status": "ok", "ticket": ticket}
+
+    def _close_position(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        ticket = command.get("ticket")
+        before = len(self.positions)
+        self.positions = [p for p in self.positions if p["ticket"] != ticket]
+        if len(self.positions) == before:
+            return {"status": "error", "message": f"Unknown ticket: {ticket}"}
+        return {"status": "ok", "ticket": ticket}
+
+
+async def _main():
+    server = FakeMT5Server()
+    await server.start()
+    print(f"🧪 Fake MT5 bridge listening on {server.address}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,194 @@
+"""
+Account snapshot service for Revolution X
+In-memory account and positions state with change-driven refresh
+
+The API serves account and positions from here instead of asking MT5 on
+every request. The scheduler's ``account_snapshot`` job refreshes it on an
+interval and, through ``run_now``, as soon as a trade is reported;
+concurrent refreshes are coalesced into one MT5 round trip (single-flight). Every response carries the snapshot's age and whether
+it is stale.
+
+In a multi-process deployment only the MT5 owner refreshes. Changes go out
+on the ``account`` and ``positions`` topics for WebSocket clients, and the
+full state with its timestamps goes out as ``snapshot`` after every
+refresh, which API workers adopt (``apply``): a worker that starts late
+catches up within one interval, and its ages track the owner's refreshes
+rather than the last change.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Callable, List
+
+from app.config import settings
+from app.mt5.connector import MT5ConnectionManager
+
+ACCOUNT = "account"
+POSITIONS = "positions"
+SNAPSHOT = "snapshot"  # Full state after every refresh, for API workers
+
+Listener = Callable[[str, Dict[str, Any]], Any]
+
+
+class _Snapshot:
+    """One piece of state and when it was taken."""
+
+    def __init__(self):
+        self.data: Any = None
+        self.updated_at: Optional[float] = None  # Epoch seconds
+
+    def set(self, data: Any, updated_at: Optional[float] = None):
+        self.data = data
+        self.updated_at = updated_at or time.time()
+
+    @property
+    def age(self) -> Optional[float]:
+        if self.updated_at is None:
+            return None
+        return max(time.time() - self.updated_at, 0.0)
+
+    def view(self, stale_after: float) -> Dict[str, Any]:
+        age = self.age
+        return {
+            "data": self.data,
+            "updated_at": datetime.fromtimestamp(self.updated_at, timezone.utc).isoformat()
+            if self.updated_at else None,
+            "age": round(age, 3) if age is not None else None,
+            "stale": age is None or age > stale_after,
+        }
+
+
+class AccountSnapshotService:
+    """
+    Keeps the latest MT5 account info and open positions in memory.
+    """
+
+    def __init__(
+        self,
+        connector: Optional[MT5ConnectionManager] = None,
+        stale_after: Optional[float] = None,
+    ):
+        self.connector = connector
+        self.stale_after = stale_after or settings.SNAPSHOT_STALE_AFTER
+        self.account = _Snapshot()
+        self.positions = _Snapshot()
+        self.listeners: List[Listener] = []
+        self.on_position_closed: Optional[Callable[[int], Any]] = None
+        # Every positions read with the time it started, changed or not
+        self.on_positions: Optional[Callable[[list, float], Any]] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+        # Metrics
+        self.refreshes: int = 0
+        self.coalesced: int = 0
+        self.failed_refreshes: int = 0
+
+    def attach(self, connector: MT5ConnectionManager):
+        """Refresh from this connector (MT5 owner process only)."""
+        self.connector = connector
+
+    async def refresh(self):
+        """
+        Re-read account and positions from MT5. Callers arriving while a
+        refresh is running share its result.
+        """
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+            self._inflight.add_done_callback(self._clear_inflight)
+        else:
+            self.coalesced += 1
+        await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, future: asyncio.Future):
+        if self._inflight is future:
+            self._inflight = None
+
+    async def _refresh(self):
+        if self.connector is None or not self.connector.is_connected:
+            return
+        started = time.time()
+        try:
+            account, positions = await self.connector.get_state()
+        except Exception:
+            self.failed_refreshes += 1
+            raise
+        self.refreshes += 1
+        now = time.time()
+        if account is not None:
+            changed = account != self.account.data
+            self.account.set(account, now)
+            if changed:
+                self._notify(ACCOUNT, {**account, "updated_at": now})
+        if positions is not None:
+            self._update_positions(positions, now)
+            if self.on_positions is not None:
+                self.on_positions(positions, started)
+        self._notify(SNAPSHOT, self.export())
+
+    def _update_positions(self, positions: list, now: float):
+        previous = {p.get("ticket") for p in self.positions.data or []}
+        changed = positions != self.positions.data
+        self.positions.set(positions, now)
+        if not changed:
+            return
+        if self.on_position_closed is not None:
+            for ticket in previous - {p.get("ticket") for p in positions}:
+                self.on_position_closed(ticket)
+        # Keyed by ticket so WebSocket clients receive per-position deltas
+        self._notify(POSITIONS, {str(p.get("ticket")): p for p in positions})
+
+    def _notify(self, topic: str, payload: Dict[str, Any]):
+        for listener in self.listeners:
+            try:
+                result = listener(topic, payload)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                print(f"⚠️ Snapshot listener failed: {e}")
+
+    def export(self) -> Dict[str, Any]:
+        """Both snapshots with the owner's refresh times."""
+        return {
+            ACCOUNT: self.account.data,
+            "account_at": self.account.updated_at,
+            POSITIONS: self.positions.data,
+            "positions_at": self.positions.updated_at,
+        }
+
+    def apply(self, topic: str, payload: Dict[str, Any]):
+        """Adopt the state published by the MT5 owner process."""
+        if topic != SNAPSHOT:
+            return
+        if payload.get(ACCOUNT) is not None:
+            self.account.set(payload[ACCOUNT], payload.get("account_at"))
+        if payload.get(POSITIONS) is not None:
+            self.positions.set(payload[POSITIONS], payload.get("positions_at"))
+
+    async def get(self, topic: str) -> Dict[str, Any]:
+        """
+        Snapshot of ``account`` or ``positions`` with its age. Refreshes
+        first when this process owns MT5 and the snapshot is stale.
+        """
+        snapshot = self.account if topic == ACCOUNT else self.positions
+        age = snapshot.age
+        if self.connector is not None and (age is None or age > self.stale_after):
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️ Snapshot refresh failed: {e}")
+        return snapshot.view(self.stale_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Refresh counters and snapshot ages (seconds)."""
+        return {
+            "refreshes": self.refreshes,
+            "coalesced": self.coalesced,
+            "failed_refreshes": self.failed_refreshes,
+            "account": self.account.view(self.stale_after)["age"],
+            "positions": self.positions.view(self.stale_after)["age"],
+        }
+
+
+# Shared snapshot service
+account_snapshot = AccountSnapshotService()
@@ -0,0 +1,302 @@
+"""
+MetaTrader 5 market data stream for Revolution X
+ZeroMQ PUB/SUB push channel for ticks, bars and depth of market
+
+The MT5 bridge publishes two-frame messages ``[topic, json]`` where the topic
+is ``tick:<SYMBOL>``, ``bar:<SYMBOL>:<TIMEFRAME>`` or ``book:<SYMBOL>``. Every payload carries a
+``seq`` number that increases by one per topic, which lets consumers detect
+gaps caused either by the network or by their own slow-consumer policy.
+"""
+
+import asyncio
+import json
+import zmq
+import zmq.asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Iterable, List, Set
+
+from app.config import settings
+
+# Slow-consumer policies
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+
+def tick_topic(symbol: str) -> str:
+    """Topic name for a symbol's tick stream."""
+    return f"tick:{symbol}"
+
+
+def bar_topic(symbol: str, timeframe: str) -> str:
+    """Topic name for a symbol's bar stream on one timeframe."""
+    return f"bar:{symbol}:{timeframe}"
+
+
+def book_topic(symbol: str) -> str:
+    """Topic name for a symbol's depth-of-market updates."""
+    return f"book:{symbol}"
+
+
+@dataclass
+class MarketEvent:
+    """A single tick, bar or book update received from MT5."""
+    topic: str
+    kind: str  # "tick", "bar" or "book"
+    symbol: str
+    timeframe: Optional[str]
+    seq: int
+    data: Dict[str, Any]
+    gap: int = 0  # Sequence numbers missed on this topic before this event
+
+
+class _EventQueue:
+    """
+    Bounded FIFO applying a slow-consumer policy when full.
+
+    ``drop_oldest`` discards the oldest queued event. ``coalesce`` keeps at
+    most one pending event per topic, replacing it with the newest one.
+    """
+
+    def __init__(self, maxsize: int, policy: str):
+        if policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown slow-consumer policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._fifo: deque = deque()
+        self._latest: "OrderedDict[str, MarketEvent]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._latest) if self.policy == COALESCE else len(self._fifo)
+
+    def put(self, event: MarketEvent):
+        if self.policy == COALESCE:
+            if event.topic in self._latest:
+                # Replace in place so the topic keeps its position in line
+                self._latest[event.topic] = event
+                self.dropped += 1
+            else:
+                if len(self._latest) >= self.maxsize:
+                    self._latest.popitem(last=False)
+                    self.dropped += 1
+                self._latest[event.topic] = event
+        else:
+            if len(self._fifo) >= self.maxsize:
+                self._fifo.popleft()
+                self.dropped += 1
+            self._fifo.append(event)
+        self._ready.set()
+
+    def pop(self) -> MarketEvent:
+        if self.policy == COALESCE:
+            return self._latest.popitem(last=False)[1]
+        return self._fifo.popleft()
+
+    async def wait(self):
+        """Block until an event is queued or ``wake()`` is called."""
+        self._ready.clear()
+        await self._ready.wait()
+
+    def wake(self):
+        self._ready.set()
+
+
+class Subscription:
+    """
+    Async iterator over market events for a set of topics.
+
+    Use ``async for event in subscription`` and close it with ``close()`` or
+    by using it as an async context manager.
+    """
+
+    def __init__(
+        self,
+        stream: "MarketDataStream",
+        topics: Set[str],
+        maxsize: int,
+        policy: str,
+    ):
+        self.topics = topics
+        self._stream = stream
+        self._queue = _EventQueue(maxsize, policy)
+        self._last_seq: Dict[str, int] = {}
+        self.closed = False
+
+    @property
+    def depth(self) -> int:
+        """Number of events waiting to be consumed."""
+        return len(self._queue)
+
+    @property
+    def dropped(self) -> int:
+        """Events discarded by the slow-consumer policy."""
+        return self._queue.dropped
+
+    def last_seq(self, topic: str) -> Optional[int]:
+        """Sequence number of the last event delivered on a topic."""
+        return self._last_seq.get(topic)
+
+    def _deliver(self, event: MarketEvent):
+        if not self.closed:
+            self._queue.put(event)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> MarketEvent:
+        while not self.depth:
+            if self.closed:
+                raise StopAsyncIteration
+            await self._queue.wait()
+        if self.closed:
+            raise StopAsyncIteration
+        event = self._queue.pop()
+
+        last = self._last_seq.get(event.topic)
+        gap = event.seq - last - 1 if last is not None else 0
+        self._last_seq[event.topic] = event.seq
+        if gap:
+            event = MarketEvent(**{**event.__dict__, "gap": gap})
+        return event
+
+    def close(self):
+        """Stop receiving events and release the topics."""
+        if not self.closed:
+            self.closed = True
+            self._stream._unsubscribe(self)
+            self._queue.wake()
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class MarketDataStream:
+    """
+    Owns the SUB socket and fans incoming events out to subscriptions.
+    """
+
+    def __init__(self, context: zmq.asyncio.Context, address: Optional[str] = None):
+        self.address = address or f"tcp://{settings.MT5_HOST}:{settings.MT5_STREAM_PORT}"
+        self.context = context
+        self.socket: Optional[zmq.asyncio.Socket] = None
+        self.received: int = 0
+        self.gaps: int = 0  # Events lost between the bridge and this process
+        self.malformed: int = 0  # Messages skipped because they could not be parsed
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._last_seq: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Connect the SUB socket and start dispatching."""
+        if self.socket:
+            return
+        self.socket = self.context.socket(zmq.SUB)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.setsockopt(zmq.RCVHWM, settings.MT5_STREAM_HWM)
+        self.socket.connect(self.address)
+        for topic in self._subscribers:
+            self.socket.setsockopt(zmq.SUBSCRIBE, topic.encode())
+        self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Stop dispatching, end every subscription and close the socket."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        for subs in list(self._subscribers.values()):
+            for sub in list(subs):
+                sub.close()
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+
+    def subscribe(
+        self,
+        topics: Iterable[str],
+        maxsize: Optional[int] = None,
+        policy: Optional[str] = None,
+    ) -> Subscription:
+        """Register a new subscription for the given topics."""
+        subscription = Subscription(
+            self,
+            set(topics),
+            maxsize or settings.MT5_STREAM_QUEUE_SIZE,
+            policy or settings.MT5_STREAM_POLICY,
+        )
+        for topic in subscription.topics:
+            subs = self._subscribers.setdefault(topic, [])
+            if not subs and self.socket:
+                self.socket.setsockopt(zmq.SUBSCRIBE, topic.encode())
+            subs.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        for topic in subscription.topics:
+            subs = self._subscribers.get(topic)
+            if not subs or subscription not in subs:
+                continue
+            subs.remove(subscription)
+            if not subs:
+                del self._subscribers[topic]
+                self._last_seq.pop(topic, None)
+                if self.socket:
+                    self.socket.setsockopt(zmq.UNSUBSCRIBE, topic.encode())
+
+    async def _dispatch_loop(self):
+        while True:
+            frames = await self.socket.recv_multipart()
+            event = self._parse(frames)
+            if event is None:
+                self.malformed += 1
+                continue
+            self._dispatch(event)
+
+    def _parse(self, frames: List[bytes]) -> Optional[MarketEvent]:
+        """Event from ``[topic, json]`` frames, or None if they are malformed."""
+        if len(frames) != 2:
+            return None
+        try:
+            topic = frames[0].decode()
+            data = json.loads(frames[1])
+            if not isinstance(data, dict):
+                return None
+            seq = int(data.get("seq", 0))
+        except (ValueError, TypeError):
+            return None
+        parts = topic.split(":")
+        kind = parts[0]
+        symbol = parts[1] if len(parts) > 1 else data.get("symbol")
+        timeframe = parts[2] if len(parts) > 2 else None
+        return MarketEvent(
+            topic=topic,
+            kind=kind,
+            symbol=symbol,
+            timeframe=timeframe,
+            seq=seq,
+            data=data,
+        )
+
+    def _dispatch(self, event: MarketEvent):
+        """Fan an event out to every subscription on its topic."""
+        subs = self._subscribers.get(event.topic)
+        if not subs:
+            # Prefix match on the SUB socket may let through e.g. "tick:XAUUSDm"
+            return
+
+        self.received += 1
+        last = self._last_seq.get(event.topic)
+        if last is not None and event.seq > last + 1:
+            self.gaps += event.seq - last - 1
+        self._last_seq[event.topic] = event.seq
+
+        for sub in subs:
+            sub._deliver(event)
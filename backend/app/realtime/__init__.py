@@ -0,0 +1 @@
+"""Real-time distribution module for Revolution X"""
@@ -0,0 +1,226 @@
+"""
+Event bus for Revolution X
+Decouples the market-data/MT5 owner process from API workers
+
+One owner process holds the MT5 connection and publishes ticks, signals,
+positions and account updates on the bus; any number of API worker
+processes subscribe and fan the events out to their WebSocket clients.
+Payloads are msgpack-encoded once by the publisher. A message that cannot
+be decoded is skipped and counted (``undecodable``) rather than ending the
+subscription.
+
+Backends:
+    memory - in-process, for tests and single-process deployments
+    zmq    - owner binds a PUB socket, workers connect SUB sockets
+"""
+
+import asyncio
+from collections import deque
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+import msgpack
+import zmq
+import zmq.asyncio
+
+from app.config import settings
+
+
+def encode(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True, default=str)
+
+
+def decode(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False)
+
+
+class BusSubscription:
+    """
+    Async iterator of ``(topic, payload)`` for the topic prefixes given.
+    Keeps a bounded backlog and drops the oldest events when it overflows.
+    """
+
+    def __init__(self, bus: "EventBus", prefixes: Tuple[str, ...], maxsize: int):
+        self.prefixes = prefixes
+        self.dropped = 0
+        self.undecodable = 0
+        self.closed = False
+        self._bus = bus
+        self._queue: deque = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+
+    def matches(self, topic: str) -> bool:
+        return not self.prefixes or topic.startswith(self.prefixes)
+
+    def _deliver(self, topic: str, data: bytes):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append((topic, data))
+        self._ready.set()
+
+    def __aiter__(self) -> "BusSubscription":
+        return self
+
+    async def __anext__(self) -> Tuple[str, Any]:
+        while True:
+            while not self._queue:
+                if self.closed:
+                    raise StopAsyncIteration
+                self._ready.clear()
+                await self._ready.wait()
+            topic, data = self._queue.popleft()
+            try:
+                return topic, decode(data)
+            except ValueError as e:
+                self.undecodable += 1
+                print(f"⚠️ Event bus skipping undecodable {topic} message: {e}")
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._bus._remove(self)
+            self._ready.set()
+
+
+class EventBus:
+    """Base class: topic-addressed publish/subscribe."""
+
+    def __init__(self):
+        self._subscriptions: List[BusSubscription] = []
+        self.published = 0
+        self.undecodable = 0  # Frames whose topic could not be read
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        for sub in list(self._subscriptions):
+            sub.close()
+
+    async def publish(self, topic: str, payload: Any):
+        """Encode a payload once and publish it on a topic."""
+        await self.publish_raw(topic, encode(payload))
+
+    async def publish_raw(self, topic: str, data: bytes):
+        raise NotImplementedError
+
+    def subscribe(
+        self,
+        prefixes: Iterable[str] = (),
+        maxsize: Optional[int] = None,
+    ) -> BusSubscription:
+        """Subscribe to every topic starting with one of ``prefixes``."""
+        sub = BusSubscription(
+            self, tuple(prefixes), maxsize or settings.EVENT_BUS_QUEUE_SIZE
+        )
+        self._subscriptions.append(sub)
+        return sub
+
+    def _remove(self, sub: BusSubscription):
+        if sub in self._subscriptions:
+            self._subscriptions.remove(sub)
+
+    def _dispatch(self, topic: str, data: bytes):
+        for sub in self._subscriptions:
+            if sub.matches(topic):
+                sub._deliver(topic, data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "published": self.published,
+            "subscriptions": len(self._subscriptions),
+            "backlog": sum(len(s._queue) for s in self._subscriptions),
+            "dropped": sum(s.dropped for s in self._subscriptions),
+            "undecodable": self.undecodable + sum(s.undecodable for s in self._subscriptions),
+        }
+
+
+class InMemoryEventBus(EventBus):
+    """Delivers events to subscribers in the same process."""
+
+    async def publish_raw(self, topic: str, data: bytes):
+        self.published += 1
+        self._dispatch(topic, data)
+
+
+class ZmqEventBus(EventBus):
+    """
+    ZeroMQ PUB/SUB transport. The owner process publishes (``publisher``
+    True) and binds; API workers connect and receive.
+    """
+
+    def __init__(self, url: Optional[str] = None, publisher: bool = False):
+        super().__init__()
+        self.url = url or settings.EVENT_BUS_URL
+        self.publisher = publisher
+        self.context: Optional[zmq.asyncio.Context] = None
+        self.socket: Optional[zmq.asyncio.Socket] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.context = zmq.asyncio.Context()
+        if self.publisher:
+            self.socket = self.context.socket(zmq.PUB)
+            self.socket.setsockopt(zmq.SNDHWM, settings.EVENT_BUS_HWM)
+            self.socket.setsockopt(zmq.LINGER, 0)
+            self.socket.bind(self.url)
+        else:
+            self.socket = self.context.socket(zmq.SUB)
+            self.socket.setsockopt(zmq.RCVHWM, settings.EVENT_BUS_HWM)
+            self.socket.setsockopt(zmq.LINGER, 0)
+            self.socket.setsockopt(zmq.SUBSCRIBE, b"")
+            self.socket.connect(self.url)
+            self._task = asyncio.create_task(self._receive_loop())
+
+    async def stop(self):
+        await super().stop()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+        if self.context:
+            self.context.term()
+            self.context = None
+
+    async def publish_raw(self, topic: str, data: bytes):
+        if not self.publisher:
+            raise RuntimeError("This bus endpoint only subscribes")
+        self.published += 1
+        await self.socket.send_multipart([topic.encode(), data])
+        # Subscribers in this process see the event too
+        self._dispatch(topic, data)
+
+    async def _receive_loop(self):
+        while True:
+            frames = await self.socket.recv_multipart()
+            try:
+                topic, data = frames
+                topic = topic.decode()
+            except ValueError:
+                self.undecodable += 1
+                continue
+            self._dispatch(topic, data)
+
+
+def create_event_bus(publisher: bool = False) -> EventBus:
+    """
+    Bus for the configured backend (``settings.EVENT_BUS_BACKEND``). The
+    memory backend only reaches the same process, so it is refused when
+    ``settings.PROCESS_ROLE`` splits the owner and the API workers.
+    """
+    if settings.EVENT_BUS_BACKEND == "zmq":
+        return ZmqEventBus(publisher=publisher)
+    if settings.EVENT_BUS_BACKEND == "memory":
+        if settings.PROCESS_ROLE != "all":
+            raise ValueError(
+                f"PROCESS_ROLE={settings.PROCESS_ROLE} needs EVENT_BUS_BACKEND=zmq: "
+                "the memory bus cannot reach other processes"
+            )
+        return InMemoryEventBus()
+    raise ValueError(f"Unknown event bus backend: {settings.EVENT_BUS_BACKEND}")
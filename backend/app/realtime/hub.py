@@ -0,0 +1,319 @@
+"""
+WebSocket hub for Revolution X
+Topic-based fan-out of real-time updates to dashboard clients
+
+Every published message is encoded once (msgpack) and the same bytes are
+queued for every subscriber. Dict payloads are delta-encoded per topic
+against the previous value, with a full snapshot sent to new subscribers,
+periodically, and whenever a client has to be resynchronized. Each client
+has a bounded send queue; a client that falls behind is either conflated
+to the latest state of its topics or disconnected.
+
+Frame layout (msgpack map):
+    t: topic       k: "s" snapshot | "d" delta | "b" raw bytes
+    v: version     p: payload      r: keys removed (deltas only)
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Optional, Dict, Any, Callable, List, Set, Union
+
+import msgpack
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.config import settings
+
+SNAPSHOT = "s"
+DELTA = "d"
+RAW = "b"
+
+CONFLATE = "conflate"
+DISCONNECT = "drop"
+
+_MISSING = object()
+
+
+def encode_frame(topic: str, kind: str, version: int, payload: Any, removed=None) -> bytes:
+    frame = {"t": topic, "k": kind, "v": version, "p": payload}
+    if removed:
+        frame["r"] = removed
+    return msgpack.packb(frame, use_bin_type=True, default=str)
+
+
+class _TopicState:
+    """Latest value of a topic and its encoded snapshot."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value: Any = None
+        self.version = 0
+        self.since_snapshot = 0
+        self.subscribers: Set["ClientConnection"] = set()
+        self._snapshot: Optional[bytes] = None
+
+    def snapshot(self) -> Optional[bytes]:
+        """Full-state frame for the current version (encoded once)."""
+        if self.value is None:
+            return None
+        if self._snapshot is None:
+            kind = RAW if isinstance(self.value, (bytes, bytearray, memoryview)) else SNAPSHOT
+            self._snapshot = encode_frame(self.name, kind, self.version, self.value)
+        return self._snapshot
+
+    def update(self, value: Any, use_delta: bool) -> bytes:
+        """Store a new value and return the frame to broadcast."""
+        previous = self.value
+        self.value = value
+        self.version += 1
+        self._snapshot = None
+
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return self.snapshot()
+
+        if (
+            use_delta
+            and isinstance(value, dict)
+            and isinstance(previous, dict)
+            and self.since_snapshot < settings.WS_SNAPSHOT_INTERVAL
+        ):
+            changed = {
+                k: v for k, v in value.items() if previous.get(k, _MISSING) != v
+            }
+            removed = [k for k in previous if k not in value]
+            if len(changed) + len(removed) < len(value):
+                self.since_snapshot += 1
+                return encode_frame(self.name, DELTA, self.version, changed, removed)
+
+        self.since_snapshot = 0
+        return self.snapshot()
+
+
+def _topic_list(value: Any) -> List[str]:
+    """Topics of a control message: one name or a list, strings only."""
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [t for t in value if isinstance(t, str)]
+
+
+class ClientConnection:
+    """One WebSocket client with its bounded send queue."""
+
+    def __init__(self, hub: "WebSocketHub", websocket: WebSocket):
+        self.hub = hub
+        self.websocket = websocket
+        self.topics: Set[str] = set()
+        self.token: Optional[str] = None  # Access token when auth is required
+        self.conflations = 0
+        self.closed = False
+        self._queue: deque = deque()  # (topic, frame); topic None for control replies
+        self._ready = asyncio.Event()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, topic: str, frame: bytes):
+        if self.closed:
+            return
+        if len(self._queue) >= self.hub.queue_size:
+            if self.hub.policy == DISCONNECT:
+                self.close()
+                return
+            self._conflate()
+            if topic in {t for t, _ in self._queue}:
+                # The snapshot just queued already carries this update
+                return
+        self._queue.append((topic, frame))
+        self._ready.set()
+
+    def _conflate(self):
+        """Replace the backlog with one current snapshot per pending topic."""
+        control = [entry for entry in self._queue if entry[0] is None]
+        pending = list(dict.fromkeys(t for t, _ in self._queue if t is not None))
+        self._queue = deque(control)
+        for topic in pending:
+            frame = self.hub.snapshot(topic)
+            if frame is not None:
+                self._queue.append((topic, frame))
+        self.conflations += 1
+
+    async def send_loop(self):
+        while not self.closed:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            _, frame = self._queue.popleft()
+            if isinstance(frame, str):
+                await self.websocket.send_text(frame)
+            else:
+                await self.websocket.send_bytes(frame)
+
+    def send_control(self, message: Dict[str, Any]):
+        """Queue a JSON control reply behind any pending frames."""
+        if not self.closed:
+            self._queue.append((None, json.dumps(message)))
+            self._ready.set()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._ready.set()
+
+
+class WebSocketHub:
+    """
+    Registry of topics and connected clients.
+    """
+
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        policy: Optional[str] = None,
+        use_delta: bool = True,
+    ):
+        self.queue_size = queue_size or settings.WS_CLIENT_QUEUE_SIZE
+        self.policy = policy or settings.WS_SLOW_CLIENT_POLICY
+        self.use_delta = use_delta
+        self.clients: Set[ClientConnection] = set()
+        self._topics: Dict[str, _TopicState] = {}
+        self.published = 0
+        # Token verifier (raises when invalid); None serves clients unauthenticated
+        self.authenticate: Optional[Callable[[str], Any]] = None
+
+    def _topic(self, name: str) -> _TopicState:
+        state = self._topics.get(name)
+        if state is None:
+            state = self._topics[name] = _TopicState(name)
+        return state
+
+    def snapshot(self, topic: str) -> Optional[bytes]:
+        state = self._topics.get(topic)
+        return state.snapshot() if state else None
+
+    def publish(self, topic: str, payload: Union[Dict[str, Any], list, bytes, memoryview]):
+        """
+        Broadcast a value on a topic. The frame is encoded once and shared by
+        every subscriber; bytes payloads are forwarded without re-encoding.
+        """
+        state = self._topic(topic)
+        frame = state.update(payload, self.use_delta)
+        self.published += 1
+        for client in state.subscribers:
+            client.enqueue(topic, frame)
+
+    def subscribe(self, client: ClientConnection, topics):
+        for topic in topics:
+            if topic in client.topics:
+                continue
+            if len(client.topics) >= settings.WS_MAX_TOPICS:
+                break
+            state = self._topic(topic)
+            state.subscribers.add(client)
+            client.topics.add(topic)
+            frame = state.snapshot()
+            if frame is not None:
+                client.enqueue(topic, frame)
+
+    def unsubscribe(self, client: ClientConnection, topics=None):
+        for topic in list(client.topics if topics is None else topics):
+            state = self._topics.get(topic)
+            if state:
+                state.subscribers.discard(client)
+            client.topics.discard(topic)
+
+    async def handle(self, websocket: WebSocket, token: Optional[str] = None):
+        """
+        Serve one WebSocket connection. Clients send JSON (or msgpack)
+        control messages: ``{"action": "subscribe", "topics": [...]}``.
+        With ``authenticate`` set, the token is checked on connect and
+        again (from the in-memory cache) on every control frame.
+        """
+        if self.authenticate is not None:
+            try:
+                self.authenticate(token or "")
+            except Exception:
+                await websocket.close(code=4401)
+                return
+        await websocket.accept()
+        client = ClientConnection(self, websocket)
+        client.token = token
+        self.clients.add(client)
+        sender = asyncio.create_task(client.send_loop())
+        try:
+            while not client.closed:
+                receive = asyncio.create_task(websocket.receive())
+                done, _ = await asyncio.wait(
+                    {receive, sender}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if sender in done:
+                    receive.cancel()
+                    break
+                message = receive.result()
+                if message["type"] == "websocket.disconnect":
+                    break
+                self._handle_control(client, message)
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            print(f"WebSocket error: {e}")
+        finally:
+            client.close()
+            sender.cancel()
+            self.unsubscribe(client)
+            self.clients.discard(client)
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
+    def _handle_control(self, client: ClientConnection, message: Dict[str, Any]):
+        if self.authenticate is not None:
+            try:
+                self.authenticate(client.token or "")
+            except Exception:
+                client.close()  # Session expired or revoked
+                return
+        try:
+            if message.get("bytes") is not None:
+                request = msgpack.unpackb(message["bytes"], raw=False)
+            else:
+                request = json.loads(message.get("text") or "{}")
+        except Exception:
+            request = None
+        if not isinstance(request, dict):
+            client.send_control({"type": "error", "message": "Malformed message"})
+            return
+
+        action = request.get("action")
+        topics = _topic_list(request.get("topics"))
+        if action == "subscribe":
+            self.subscribe(client, topics)
+        elif action == "unsubscribe":
+            self.unsubscribe(client, topics)
+        elif action == "ping":
+            pass
+        else:
+            client.send_control({"type": "error", "message": f"Unknown action: {action}"})
+            return
+        client.send_control({
+            "type": "ack",
+            "action": action,
+            "topics": sorted(client.topics),
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.clients),
+            "topics": len(self._topics),
+            "published": self.published,
+            "max_queue_depth": max((c.depth for c in self.clients), default=0),
+            "conflations": sum(c.conflations for c in self.clients),
+        }
+
+
+# Shared hub instance
+ws_hub = WebSocketHub()
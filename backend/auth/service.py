@@ -1 +1,289 @@
+"""
+Authentication service for Revolution X
+Local JWT verification with a verified-token cache and revocation set
 
+Tokens are verified in-process (signature and expiry) and the claims kept
+in an LRU keyed by the token's SHA-256, bounded by size and by a TTL that
+never outlives the token. Both tokens of a session carry its id as the
+``sid`` claim; revocation is a set of session ids synced incrementally from
+``user_sessions`` (rows changed since the last sync) and checked on every
+call, cached or not, so revoking a session stops its access tokens too.
+Neither a cache hit nor a miss touches the database.
+
+Sessions store ``token_hash``; the raw token is no longer indexed.
+"""
+
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Tuple
+
+from jose import jwt, JWTError
+from sqlalchemy import text, update, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import settings
+from app.database.connection import async_engine
+from app.database.models import UserSession
+
+# Re-read rows changed this long before the last sync: commits can land
+# with an updated_at slightly older than rows already seen
+SYNC_OVERLAP_SECONDS = 5.0
+
+SESSION_SCHEMA = [
+    "ALTER TABLE user_sessions ADD COLUMN IF NOT EXISTS token_hash VARCHAR(64)",
+    "ALTER TABLE user_sessions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()",
+    "UPDATE user_sessions SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex') "
+    "WHERE token_hash IS NULL",
+    "UPDATE user_sessions SET updated_at = created_at WHERE updated_at IS NULL",
+    "ALTER TABLE user_sessions ALTER COLUMN token_hash SET NOT NULL",
+    "DROP INDEX IF EXISTS ix_sessions_token",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_sessions_token_hash ON user_sessions (token_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_sessions_updated_at ON user_sessions (updated_at)",
+]
+
+
+class AuthError(Exception):
+    """Token missing, invalid, expired or revoked."""
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_token(
+    user_id: str,
+    role: str,
+    token_type: str = "access",
+    expires_delta: Optional[timedelta] = None,
+    session_id: Optional[str] = None,
+) -> Tuple[str, datetime]:
+    """Signed JWT and its expiry; ``session_id`` becomes the ``sid`` claim."""
+    if expires_delta is None:
+        expires_delta = (
+            timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+            if token_type == "access"
+            else timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+    now = datetime.now(timezone.utc)
+    expires_at = now + expires_delta
+    claims = {
+        "sub": str(user_id),
+        "role": role,
+        "type": token_type,
+        "iat": int(now.timestamp()),
+        "exp": int(expires_at.timestamp()),
+        "jti": uuid.uuid4().hex,
+    }
+    if session_id is not None:
+        claims["sid"] = str(session_id)
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM), expires_at
+
+
+class TokenCache:
+    """
+    LRU of verified claims keyed by token hash, with per-entry expiry.
+    """
+
+    def __init__(self, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, claims: Dict[str, Any]):
+        # Never trust a cached token past its own expiry
+        expires = min(time.time() + self.ttl, float(claims.get("exp", 0)))
+        self._entries[key] = (expires, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        self._entries.pop(key, None)
+
+
+class RevocationList:
+    """
+    Ids of revoked, unexpired sessions, synced from ``user_sessions``.
+    """
+
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self.engine = engine or async_engine
+        self._revoked: Dict[str, float] = {}  # Session id -> session expiry (epoch)
+        self._watermark: Optional[datetime] = None
+        self.syncs = 0
+        self.last_sync: Optional[float] = None
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, session_id: str, expires_at: float):
+        self._revoked[str(session_id)] = expires_at
+
+    async def sync(self):
+        """Apply sessions changed since the last sync (all revoked ones first time)."""
+        if self._watermark is None:
+            sql = (
+                "SELECT id::text, is_revoked, extract(epoch FROM expires_at)::float8, updated_at "
+                "FROM user_sessions WHERE is_revoked AND expires_at > now()"
+            )
+            args: tuple = ()
+        else:
+            sql = (
+                "SELECT id::text, is_revoked, extract(epoch FROM expires_at)::float8, updated_at "
+                "FROM user_sessions WHERE updated_at >= $1"
+            )
+            args = (self._watermark - timedelta(seconds=SYNC_OVERLAP_SECONDS),)
+        started = datetime.now(timezone.utc)
+        async with self.engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            rows = await raw.driver_connection.fetch(sql, *args)
+
+        for session_id, revoked, expires_at, updated_at in rows:
+            if revoked:
+                self._revoked[session_id] = expires_at
+            else:
+                self._revoked.pop(session_id, None)
+            if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+        if self._watermark is None:
+            self._watermark = started
+
+        now = time.time()
+        for session_id in [sid for sid, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[session_id]
+        self.syncs += 1
+        self.last_sync = now
+
+
+class AuthService:
+    """
+    Verifies bearer tokens without a database round trip.
+    """
+
+    def __init__(self, cache: Optional[TokenCache] = None, revocations: Optional[RevocationList] = None):
+        self.cache = cache or TokenCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+        self.revocations = revocations or RevocationList()
+        self.rejected = 0
+
+    def verify(self, token: str, token_type: str = "access") -> Dict[str, Any]:
+        """Claims of a valid token; raises ``AuthError`` otherwise."""
+        key = hash_token(token)
+        claims = self.cache.get(key)
+        if claims is None:
+            try:
+                claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            except JWTError as e:
+                self.rejected += 1
+                raise AuthError(str(e))
+            self.cache.put(key, claims)
+        if claims.get("sid") in self.revocations:
+            self.rejected += 1
+            raise AuthError("Token revoked")
+        if claims.get("type", "access") != token_type:
+            self.rejected += 1
+            raise AuthError("Wrong token type")
+        return claims
+
+    def user(self, token: str) -> Dict[str, Any]:
+        """The ``{"id", "role"}`` user dict of a valid access token."""
+        claims = self.verify(token)
+        return {"id": claims["sub"], "role": claims.get("role", "trader")}
+
+    async def create_session(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        role: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Issue an access/refresh pair bound to a new session row."""
+        session_id = uuid.uuid4()
+        access, access_expires = create_token(user_id, role, session_id=session_id)
+        refresh, refresh_expires = create_token(user_id, role, token_type="refresh", session_id=session_id)
+        db.add(UserSession(
+            id=session_id,
+            user_id=uuid.UUID(str(user_id)),
+            token=refresh,
+            token_hash=hash_token(refresh),
+            ip_address=ip_address,
+            user_agent=user_agent,
+            expires_at=refresh_expires,
+        ))
+        return {
+            "access_token": access,
+            "refresh_token": refresh,
+            "token_type": "bearer",
+            "expires_at": access_expires.isoformat(),
+        }
+
+    async def revoke(self, db: AsyncSession, token: str) -> bool:
+        """
+        Revoke the session of a refresh token, and with it every access
+        token carrying its ``sid``. Effective here at once and in other
+        workers on their next sync.
+        """
+        key = hash_token(token)
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.token_hash == key)
+            .values(is_revoked=True, updated_at=func.now())
+            .returning(UserSession.id, UserSession.expires_at)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return False
+        session_id, expires_at = row
+        self.revocations.add(session_id, expires_at.timestamp())
+        self.cache.discard(key)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached_tokens": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "revoked": len(self.revocations),
+            "rejected": self.rejected,
+            "revocation_syncs": self.revocations.syncs,
+        }
+
+
+async def setup_sessions(engine: Optional[AsyncEngine] = None):
+    """Add ``token_hash``/``updated_at`` to existing ``user_sessions`` tables."""
+    engine = engine or async_engine
+    async with engine.connect() as conn:
+        exists = await conn.scalar(text("SELECT to_regclass('user_sessions') IS NOT NULL"))
+    if not exists:
+        return
+    async with engine.begin() as conn:
+        for statement in SESSION_SCHEMA:
+            await conn.execute(text(statement))
+
+
+# Shared service
+auth_service = AuthService()
@@ -0,0 +1,422 @@
+"""
+Backtesting engine for Revolution X
+Vectorized simulation over market_data history
+
+A strategy is a function ``strategy(bars, **params) -> Signals`` that marks
+entry bars with +1 (buy) / -1 (sell) and gives stop-loss / take-profit
+distances. Signals on bar ``i`` are filled at the open of bar ``i + 1``.
+Exit bars for all candidate entries are found at once by binary lifting
+over range-min/max tables, O(log max_hold_bars) per entry; only the
+one-position-at-a-time filter walks the list of candidates in Python.
+
+Prices in market_data are bid prices: buys fill at bid + spread and exit at
+bid, sells fill at bid and exit at bid + spread. Market fills (entry, stop,
+timeout) pay ``slippage``; take-profits fill at their limit price.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Callable, Union
+
+import numpy as np
+
+from app.database.connection import async_engine
+from app.database.models import TradeDirection, TradeStatus
+from app.database.timescale import bars_sql
+from core.market_data import Bars
+from core.timeframes import TIMEFRAME_SECONDS
+from strategies.indicators import ATR, EMA
+
+ArrayOrFloat = Union[np.ndarray, float]
+
+EXIT_STOP_LOSS = 1
+EXIT_TAKE_PROFIT = 2
+EXIT_TIMEOUT = 3
+EXIT_REASONS = {
+    EXIT_STOP_LOSS: "stop_loss",
+    EXIT_TAKE_PROFIT: "take_profit",
+    EXIT_TIMEOUT: "timeout",
+}
+
+
+@dataclass
+class Signals:
+    """Strategy output aligned with the input bars."""
+    direction: np.ndarray  # int8: +1 buy, -1 sell, 0 none
+    stop_loss: ArrayOrFloat  # Distance from entry price
+    take_profit: ArrayOrFloat  # Distance from entry price
+
+
+@dataclass
+class BacktestConfig:
+    """Execution and account assumptions for a backtest run."""
+    symbol: str = "XAUUSD"
+    strategy: str = "backtest"
+    volume: float = 0.1  # Lots
+    contract_size: float = 100.0  # Units per lot
+    point: float = 0.1  # Pip size used for profit_loss_pips
+    spread: Optional[float] = None  # Fixed spread; None uses the bar spread column
+    slippage: float = 0.0  # Price units paid on market fills
+    max_hold_bars: int = 500
+    initial_balance: float = 10000.0
+
+
+@dataclass
+class BacktestResult:
+    """Columnar trade list plus summary statistics."""
+    config: BacktestConfig
+    times: np.ndarray = field(repr=False)
+    entry_index: np.ndarray = field(repr=False)
+    exit_index: np.ndarray = field(repr=False)
+    direction: np.ndarray = field(repr=False)
+    entry_price: np.ndarray = field(repr=False)
+    exit_price: np.ndarray = field(repr=False)
+    stop_loss: np.ndarray = field(repr=False)
+    take_profit: np.ndarray = field(repr=False)
+    exit_reason: np.ndarray = field(repr=False)
+    profit_loss: np.ndarray = field(repr=False)
+    balance: np.ndarray = field(repr=False)  # Balance after each trade
+
+    def __len__(self) -> int:
+        return len(self.entry_index)
+
+    def summary(self) -> Dict[str, Any]:
+        pnl = self.profit_loss
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl < 0]
+        equity = np.concatenate(([self.config.initial_balance], self.balance))
+        peak = np.maximum.accumulate(equity)
+        drawdown = ((peak - equity) / peak).max() if len(equity) else 0.0
+        return {
+            "trades": len(pnl),
+            "net_profit": float(pnl.sum()),
+            "win_rate": float(len(wins) / len(pnl)) if len(pnl) else 0.0,
+            "profit_factor": float(wins.sum() / -losses.sum()) if len(losses) else float("inf"),
+            "max_drawdown": float(drawdown),
+            "final_balance": float(equity[-1]),
+        }
+
+    def trades(self) -> List[Dict[str, Any]]:
+        """Trades as dicts shaped like ``app.database.models.Trade`` rows."""
+        cfg = self.config
+        units = cfg.volume * cfg.contract_size
+        balance_before = np.concatenate(([cfg.initial_balance], self.balance[:-1]))
+        rows = []
+        for i in range(len(self)):
+            side = int(self.direction[i])
+            move = (self.exit_price[i] - self.entry_price[i]) * side
+            rows.append({
+                "symbol": cfg.symbol,
+                "direction": TradeDirection.BUY if side > 0 else TradeDirection.SELL,
+                "status": TradeStatus.CLOSED,
+                "entry_price": round(float(self.entry_price[i]), 5),
+                "exit_price": round(float(self.exit_price[i]), 5),
+                "stop_loss": round(float(self.stop_loss[i]), 5),
+                "take_profit": round(float(self.take_profit[i]), 5),
+                "volume": cfg.volume,
+                "risk_amount": round(abs(self.entry_price[i] - self.stop_loss[i]) * units, 2),
+                "profit_loss": round(float(self.profit_loss[i]), 2),
+                "profit_loss_pips": round(float(move / cfg.point), 1),
+                "profit_loss_percent": round(float(self.profit_loss[i] / balance_before[i] * 100), 4),
+                "strategy": cfg.strategy,
+                "entry_reason": f"{cfg.strategy} signal, exit by {EXIT_REASONS[int(self.exit_reason[i])]}",
+                "opened_at": _to_datetime(self.times[self.entry_index[i]]),
+                "closed_at": _to_datetime(self.times[self.exit_index[i]]),
+            })
+        return rows
+
+
+def _to_datetime(epoch: float) -> datetime:
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc)
+
+
+def _broadcast(value: ArrayOrFloat, n: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,))
+
+
+def _range_table(values: np.ndarray, levels: int, op) -> List[np.ndarray]:
+    """
+    Sparse table where ``table[k][i]`` is ``op`` over ``values[i:i + 2**k]``
+    (truncated at the end of the array).
+    """
+    table = [values]
+    for k in range(1, levels):
+        prev, half = table[-1], 1 << (k - 1)
+        level = prev.copy()
+        level[:-half] = op(prev[:-half], prev[half:])
+        table.append(level)
+    return table
+
+
+def _first_touch(
+    table: List[np.ndarray],
+    start: np.ndarray,
+    stop: np.ndarray,
+    untouched,
+) -> np.ndarray:
+    """
+    First index in ``[start, stop)`` whose bar touches the level, found by
+    binary lifting over the sparse table: O(log horizon) per entry, all
+    entries at once. Returns ``stop`` where the level is never touched.
+    """
+    n = len(table[0])
+    pos = start.copy()
+    for k in reversed(range(len(table))):
+        step = 1 << k
+        fits = pos + step <= stop
+        skip = fits & untouched(table[k][np.minimum(pos, n - 1)])
+        pos = np.where(skip, pos + step, pos)
+    return pos
+
+
+def _find_exits(
+    bars: Bars,
+    spread: np.ndarray,
+    entries: np.ndarray,
+    sides: np.ndarray,
+    sl: np.ndarray,
+    tp: np.ndarray,
+    horizon: int,
+):
+    """
+    Exit bar and reason for every candidate entry, fully vectorized.
+    A bar touching both levels counts as a stop-loss (conservative).
+    """
+    n = len(bars.close)
+    levels = max(1, int(horizon).bit_length())
+    stop = np.minimum(entries + horizon, n)
+    sl_at = np.empty(len(entries), dtype=np.int64)
+    tp_at = np.empty(len(entries), dtype=np.int64)
+
+    # Longs exit at bid, shorts at ask (bid + spread)
+    for side, high, low in (
+        (1, bars.high, bars.low),
+        (-1, bars.high + spread, bars.low + spread),
+    ):
+        mask = sides == side
+        if not mask.any():
+            continue
+        max_table = _range_table(high, levels, np.maximum)
+        min_table = _range_table(low, levels, np.minimum)
+        e, s = entries[mask], stop[mask]
+        lvl_sl, lvl_tp = sl[mask], tp[mask]
+        if side > 0:
+            sl_at[mask] = _first_touch(min_table, e, s, lambda v: v > lvl_sl)
+            tp_at[mask] = _first_touch(max_table, e, s, lambda v: v < lvl_tp)
+        else:
+            sl_at[mask] = _first_touch(max_table, e, s, lambda v: v < lvl_sl)
+            tp_at[mask] = _first_touch(min_table, e, s, lambda v: v > lvl_tp)
+
+    sl_hit = sl_at < stop
+    reason = np.where(
+        sl_at <= tp_at,
+        np.where(sl_hit, EXIT_STOP_LOSS, EXIT_TIMEOUT),
+        EXIT_TAKE_PROFIT,
+    ).astype(np.int8)
+    exit_idx = np.select(
+        [reason == EXIT_STOP_LOSS, reason == EXIT_TAKE_PROFIT],
+        [sl_at, tp_at],
+        stop - 1,
+    )
+    return exit_idx, reason
+
+
+def run_backtest(
+    bars: Bars,
+    signals: Signals,
+    config: Optional[BacktestConfig] = None,
+) -> BacktestResult:
+    """Simulate signal -> entry -> SL/TP exit over a block of bars."""
+    cfg = config or BacktestConfig()
+    n = len(bars.close)
+    direction = np.asarray(signals.direction, dtype=np.int8)
+    sl_dist = _broadcast(signals.stop_loss, n)
+    tp_dist = _broadcast(signals.take_profit, n)
+    spread = (
+        _broadcast(cfg.spread, n) if cfg.spread is not None
+        else np.nan_to_num(np.asarray(bars.spread, dtype=np.float64))
+    )
+
+    # Signal on bar i fills at the open of bar i + 1
+    candidates = np.flatnonzero(direction[:-1] != 0)
+    candidates = candidates[np.isfinite(sl_dist[candidates]) & np.isfinite(tp_dist[candidates])]
+    entries = candidates + 1
+    sides = direction[candidates].astype(np.float64)
+    entry_px = bars.open[entries] + np.where(sides > 0, spread[entries], 0.0) + sides * cfg.slippage
+    sl_px = entry_px - sides * sl_dist[candidates]
+    tp_px = entry_px + sides * tp_dist[candidates]
+
+    exit_idx, reason = _find_exits(
+        bars, spread, entries, sides, sl_px, tp_px, cfg.max_hold_bars
+    )
+
+    # One position at a time: skip entries before the previous exit
+    taken = []
+    free_from = -1
+    for i, (entry, exit_) in enumerate(zip(entries.tolist(), exit_idx.tolist())):
+        if entry > free_from:
+            taken.append(i)
+            free_from = exit_
+    taken = np.array(taken, dtype=np.int64)
+
+    entries, exit_idx, reason = entries[taken], exit_idx[taken], reason[taken]
+    sides, entry_px, sl_px, tp_px = sides[taken], entry_px[taken], sl_px[taken], tp_px[taken]
+
+    # Shorts close at ask; market exits pay slippage, take-profits do not
+    close_px = bars.close[exit_idx] + np.where(sides < 0, spread[exit_idx], 0.0) - sides * cfg.slippage
+    exit_px = np.select(
+        [reason == EXIT_STOP_LOSS, reason == EXIT_TAKE_PROFIT],
+        [sl_px - sides * cfg.slippage, tp_px],
+        close_px,
+    )
+
+    pnl = (exit_px - entry_px) * sides * cfg.volume * cfg.contract_size
+    return BacktestResult(
+        config=cfg,
+        times=bars.time,
+        entry_index=entries,
+        exit_index=exit_idx,
+        direction=sides.astype(np.int8),
+        entry_price=entry_px,
+        exit_price=exit_px,
+        stop_loss=sl_px,
+        take_profit=tp_px,
+        exit_reason=reason,
+        profit_loss=pnl,
+        balance=cfg.initial_balance + np.cumsum(pnl),
+    )
+
+
+# ==========================================
+# Data sources
+# ==========================================
+
+async def load_bars(
+    symbol: str,
+    timeframe: str,
+    start: datetime,
+    end: datetime,
+) -> Bars:
+    """Load a range of bars into owned NumPy columns."""
+    sql = bars_sql(timeframe, "time >= $2 AND time < $3")
+    async with async_engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        rows = await raw.driver_connection.fetch(sql, symbol, start, end)
+
+    if not rows:
+        return Bars(*np.empty((7, 0)))
+    columns = np.array(
+        [[np.nan if v is None else float(v) for v in row] for row in rows],
+        dtype=np.float64,
+    ).T
+    return Bars(*np.ascontiguousarray(columns))
+
+
+def synthetic_bars(
+    n: int,
+    timeframe: str = "M1",
+    start_price: float = 2000.0,
+    volatility: float = 0.0002,
+    spread: float = 0.25,
+    start: Optional[datetime] = None,
+    seed: Optional[int] = None,
+) -> Bars:
+    """
+    Random-walk OHLCV bars for running backtests without a database.
+    ``volatility`` is the per-bar standard deviation of log returns.
+    """
+    rng = np.random.default_rng(seed)
+    step = TIMEFRAME_SECONDS[timeframe]
+    t0 = (start or datetime(2024, 1, 1, tzinfo=timezone.utc)).timestamp()
+
+    ticks = 4  # Intra-bar path points used to shape highs and lows
+    returns = rng.normal(0.0, volatility / np.sqrt(ticks), size=(n, ticks))
+    path = start_price * np.exp(np.cumsum(returns.ravel())).reshape(n, ticks)
+    close = path[:, -1]
+    open_ = np.concatenate(([start_price], close[:-1]))
+    high = np.maximum(path.max(axis=1), open_)
+    low = np.minimum(path.min(axis=1), open_)
+
+    return Bars(
+        time=t0 + np.arange(n, dtype=np.float64) * step,
+        open=open_,
+        high=high,
+        low=low,
+        close=close,
+        volume=rng.integers(50, 500, size=n).astype(np.float64),
+        spread=np.full(n, spread),
+    )
+
+
+# ==========================================
+# Reference strategy
+# ==========================================
+
+def ema_crossover(
+    bars: Bars,
+    fast: int = 20,
+    slow: int = 50,
+    atr_period: int = 14,
+    sl_atr: float = 1.5,
+    tp_atr: float = 3.0,
+) -> Signals:
+    """Enter on EMA crosses with ATR-scaled stops."""
+    fast_ema = EMA(fast).batch(bars.close)
+    slow_ema = EMA(slow).batch(bars.close)
+    atr = ATR(atr_period).batch(bars.high, bars.low, bars.close)
+
+    above = fast_ema > slow_ema
+    crossed = np.zeros(len(above), dtype=bool)
+    crossed[1:] = above[1:] != above[:-1]
+    crossed &= np.isfinite(slow_ema) & np.isfinite(atr)
+
+    direction = np.where(crossed, np.where(above, 1, -1), 0).astype(np.int8)
+    return Signals(direction, atr * sl_atr, atr * tp_atr)
+
+
+# ==========================================
+# Parameter sweeps
+# ==========================================
+
+_worker_bars: Optional[Bars] = None
+
+
+def _init_worker(bars: Bars):
+    # Ship the bars once per worker process, not once per parameter set
+    global _worker_bars
+    _worker_bars = bars
+
+
+def _run_params(args) -> Dict[str, Any]:
+    strategy, params, config = args
+    result = run_backtest(_worker_bars, strategy(_worker_bars, **params), config)
+    return {"params": params, **result.summary()}
+
+
+def run_sweep(
+    strategy: Callable[..., Signals],
+    param_grid: Dict[str, list],
+    bars: Bars,
+    config: Optional[BacktestConfig] = None,
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Backtest every combination in ``param_grid`` across a process pool.
+    ``strategy`` must be a module-level function so it can be pickled.
+    Returns one summary per combination, best net profit first.
+    """
+    config = config or BacktestConfig()
+    keys = list(param_grid)
+    jobs = [
+        (strategy, dict(zip(keys, values)), config)
+        for values in itertools.product(*(param_grid[k] for k in keys))
+    ]
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(bars,),
+    ) as pool:
+        results = list(pool.map(_run_params, jobs))
+    return sorted(results, key=lambda r: r["net_profit"], reverse=True)
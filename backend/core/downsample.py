@@ -0,0 +1,52 @@
+"""
+Downsampling for Revolution X
+Largest-Triangle-Three-Buckets (LTTB) for chart series
+
+LTTB keeps the first and last points and, for every bucket in between, the
+point forming the largest triangle with the point kept from the previous
+bucket and the average of the next bucket. Peaks and troughs survive, which
+plain striding would lose.
+"""
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the points LTTB keeps out of ``(x, y)``.
+
+    Returns every index when the series already has ``threshold`` points or
+    fewer. Apply the indices to the other columns (OHLCV) of the same rows.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the points between the fixed first and last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    # Average of each bucket, computed for all buckets at once
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(edges[1:] - edges[:-1], 1)
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / counts
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+    # The last bucket looks ahead to the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(threshold, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        bx, by = x[lo:hi], y[lo:hi]
+        # Twice the triangle area; the constant factor does not change argmax
+        area = np.abs(
+            (x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
@@ -1 +1,257 @@
+"""
+Market data cache for Revolution X
+Columnar OHLCV ring buffers per (symbol, timeframe)
 
+Strategies, microstructure and AI modules read the most recent bars from
+here instead of querying TimescaleDB. Each buffer stores its columns twice
+back to back (a "double-mapped" ring), so the last N bars are always one
+contiguous slice and can be handed out as zero-copy ``np.ndarray`` views.
+"""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, NamedTuple, Tuple, Callable, Awaitable
+
+import numpy as np
+
+from app.config import settings
+from app.database.connection import async_engine
+from app.database.ingestion import to_datetime
+from app.database.timescale import bars_sql
+
+FIELDS = ("time", "open", "high", "low", "close", "volume", "spread")
+TIME, OPEN, HIGH, LOW, CLOSE, VOLUME, SPREAD = range(len(FIELDS))
+
+WARMUP_RETRY_SECONDS = 30.0
+
+
+class Bars(NamedTuple):
+    """
+    Column views over the most recent bars, oldest first.
+
+    The arrays alias the ring buffer: they are only valid until the next
+    append. Copy them if they must outlive the current evaluation.
+    """
+    time: np.ndarray  # epoch seconds
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    spread: np.ndarray
+
+
+class OHLCVRingBuffer:
+    """
+    Fixed-capacity OHLCV store with O(1) append and contiguous tail views.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        # Every bar is written at ``i`` and ``i + capacity``
+        self._data = np.full((len(FIELDS), 2 * capacity), np.nan, dtype=np.float64)
+        self._head = 0  # Next write slot in [0, capacity)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_time(self) -> Optional[float]:
+        """Open time of the newest bar, in epoch seconds."""
+        if not self._size:
+            return None
+        return float(self._data[TIME, self._head - 1 + self.capacity])
+
+    def append(
+        self,
+        time: float,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float = 0.0,
+        spread: float = np.nan,
+    ) -> bool:
+        """
+        Add a bar, or update the newest bar in place if ``time`` matches it.
+        Out-of-order bars are ignored and ``False`` is returned.
+        """
+        row = (time, open, high, low, close, volume, spread)
+        last = self.last_time
+        if last is not None and time <= last:
+            if time < last:
+                return False
+            slot = (self._head - 1) % self.capacity
+        else:
+            slot = self._head
+            self._head = (self._head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+        self._data[:, slot] = row
+        self._data[:, slot + self.capacity] = row
+        return True
+
+    def extend(self, columns: np.ndarray):
+        """
+        Append many bars at once. ``columns`` has shape (len(FIELDS), n) and
+        is ordered oldest first.
+        """
+        n = columns.shape[1]
+        if n == 0:
+            return
+        if n >= self.capacity:
+            columns = columns[:, -self.capacity:]
+            n = self.capacity
+        slots = (self._head + np.arange(n)) % self.capacity
+        self._data[:, slots] = columns
+        self._data[:, slots + self.capacity] = columns
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def column(self, field: int, n: Optional[int] = None) -> np.ndarray:
+        """Zero-copy view of the last ``n`` values of one field."""
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        return self._data[field, end - n:end]
+
+    def last(self, n: Optional[int] = None) -> Bars:
+        """Zero-copy views of the last ``n`` bars (all stored bars by default)."""
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        block = self._data[:, end - n:end]
+        return Bars(*block)
+
+    def to_columns(self) -> np.ndarray:
+        """Copy of every stored bar as a (len(FIELDS), n) array."""
+        return np.vstack(self.last())
+
+
+HistoryLoader = Callable[[str, str, int], Awaitable[np.ndarray]]
+
+
+async def load_history(symbol: str, timeframe: str, limit: int) -> np.ndarray:
+    """
+    Read the most recent ``limit`` bars (continuous aggregate for coarse
+    timeframes). Returns a (len(FIELDS), n) float64 array ordered oldest first.
+    """
+    sql = bars_sql(timeframe, order="time DESC", limit="$2")
+    async with async_engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        rows = await raw.driver_connection.fetch(sql, symbol, limit)
+
+    if not rows:
+        return np.empty((len(FIELDS), 0), dtype=np.float64)
+    columns = np.array(
+        [[np.nan if v is None else float(v) for v in row] for row in reversed(rows)],
+        dtype=np.float64,
+    )
+    return columns.T
+
+
+class MarketDataCache:
+    """
+    Shared in-process cache of recent bars for every (symbol, timeframe).
+
+    Buffers are created on first access and warmed up from the market_data
+    table once; afterwards they are kept current by live bar events.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        loader: Optional[HistoryLoader] = None,
+    ):
+        self.capacity = capacity or settings.MARKET_CACHE_CAPACITY
+        self._loader = loader or load_history
+        self._buffers: Dict[Tuple[str, str], OHLCVRingBuffer] = {}
+        self._warmed: set = set()
+        self._warm_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._retry_at: Dict[Tuple[str, str], float] = {}
+
+    def buffer(self, symbol: str, timeframe: str) -> OHLCVRingBuffer:
+        """Return the buffer for a key without triggering warm-up."""
+        key = (symbol, timeframe)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = self._buffers[key] = OHLCVRingBuffer(self.capacity)
+        return buf
+
+    async def get(self, symbol: str, timeframe: str) -> OHLCVRingBuffer:
+        """Return the buffer for a key, loading history on first access."""
+        key = (symbol, timeframe)
+        if key not in self._warmed and time.monotonic() >= self._retry_at.get(key, 0.0):
+            await self._warm_up(key)
+        return self.buffer(symbol, timeframe)
+
+    async def last(self, symbol: str, timeframe: str, n: Optional[int] = None) -> Bars:
+        """Zero-copy views of the last ``n`` bars for a key."""
+        return (await self.get(symbol, timeframe)).last(n)
+
+    async def _warm_up(self, key: Tuple[str, str]):
+        lock = self._warm_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._warmed:
+                return
+            buf = self.buffer(*key)
+            try:
+                history = await self._loader(key[0], key[1], self.capacity)
+            except Exception as e:
+                # Serve live bars only until the retry delay has passed
+                print(f"⚠️ Market data warm-up failed for {key}: {e}")
+                self._retry_at[key] = time.monotonic() + WARMUP_RETRY_SECONDS
+                return
+
+            # Keep bars that arrived live while history was loading
+            live = buf.to_columns()
+            if live.shape[1]:
+                history = history[:, history[TIME] < live[TIME, 0]]
+            buf.clear()
+            buf.extend(history)
+            buf.extend(live)
+            self._warmed.add(key)
+            self._warm_locks.pop(key, None)
+
+    def on_bar(self, symbol: str, timeframe: str, bar: Dict[str, Any]) -> bool:
+        """Apply a live bar (new or an update of the newest one)."""
+        spread = bar.get("spread")
+        return self.buffer(symbol, timeframe).append(
+            to_datetime(bar["time"]).timestamp(),
+            bar["open"],
+            bar["high"],
+            bar["low"],
+            bar["close"],
+            bar.get("volume", 0.0),
+            np.nan if spread is None else spread,
+        )
+
+    async def consume(self, subscription, resampler=None):
+        """
+        Keep buffers current from an MT5 bar subscription. With a
+        ``Resampler``, base-timeframe bars also update the forming bar of
+        every coarser timeframe.
+        """
+        async for event in subscription:
+            if event.kind != "bar":
+                continue
+            self.on_bar(event.symbol, event.timeframe, event.data)
+            if resampler is not None and event.timeframe == resampler.base:
+                history = None
+                if resampler.needs_history(event.symbol):
+                    # Warmed base bars fill the part of each bucket before startup
+                    history = await self.last(event.symbol, event.timeframe)
+                for timeframe, bar in resampler.on_bar(event.symbol, event.data, history):
+                    self.on_bar(event.symbol, timeframe, bar)
+
+    def keys(self) -> list:
+        return list(self._buffers)
+
+
+# Shared cache instance
+market_data_cache = MarketDataCache()
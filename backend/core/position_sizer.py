@@ -1 +1,81 @@
+"""
+Position sizer for Revolution X
+Fixed-fractional lot sizing from the stop distance
 
+Volume is chosen so that a stop-out loses ``RISK_PER_TRADE`` of equity,
+rounded down to the broker's volume step. Contract specifications are
+fetched from MT5 once per symbol and kept in memory, so sizing an order is
+pure arithmetic.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class SymbolSpec:
+    """Contract specification needed to size an order."""
+    symbol: str
+    contract_size: float = 100.0
+    volume_min: float = 0.01
+    volume_max: float = 100.0
+    volume_step: float = 0.01
+
+    @classmethod
+    def from_info(cls, symbol: str, info: Dict[str, Any]) -> "SymbolSpec":
+        """Build from an MT5 ``symbol_info`` reply."""
+        return cls(
+            symbol=symbol,
+            contract_size=float(info.get("trade_contract_size", cls.contract_size)),
+            volume_min=float(info.get("volume_min", cls.volume_min)),
+            volume_max=float(info.get("volume_max", cls.volume_max)),
+            volume_step=float(info.get("volume_step", cls.volume_step)),
+        )
+
+
+class PositionSizer:
+    """
+    Sizes orders by risk per trade.
+    """
+
+    def __init__(self, risk_per_trade: Optional[float] = None):
+        self.risk_per_trade = risk_per_trade or settings.RISK_PER_TRADE
+        self._specs: Dict[str, SymbolSpec] = {}
+
+    def spec(self, symbol: str) -> Optional[SymbolSpec]:
+        return self._specs.get(symbol)
+
+    def set_spec(self, spec: SymbolSpec):
+        self._specs[spec.symbol] = spec
+
+    def size(
+        self,
+        spec: SymbolSpec,
+        equity: float,
+        entry: float,
+        stop_loss: float,
+        risk_fraction: Optional[float] = None,
+    ) -> Tuple[float, float]:
+        """
+        Volume and money at risk for an order.
+
+        Returns ``(0.0, 0.0)`` when the stop is missing or even the minimum
+        volume would risk more than allowed.
+        """
+        stop_distance = abs(entry - stop_loss)
+        if not stop_distance or equity <= 0:
+            return 0.0, 0.0
+
+        budget = equity * (risk_fraction or self.risk_per_trade)
+        loss_per_lot = stop_distance * spec.contract_size
+        # Round down to the volume step (with a little tolerance for floats)
+        steps = math.floor(budget / loss_per_lot / spec.volume_step + 1e-9)
+        volume = min(steps * spec.volume_step, spec.volume_max)
+        if volume < spec.volume_min:
+            return 0.0, 0.0
+
+        volume = round(volume, 8)
+        return volume, volume * loss_per_lot
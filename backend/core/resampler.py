@@ -0,0 +1,133 @@
+"""
+Resampler for Revolution X
+Incremental M1 -> coarser timeframe bars for the live, unfinished bar
+
+TimescaleDB continuous aggregates serve closed coarse bars; this keeps the
+current bucket of every coarser timeframe up to date from the M1 stream.
+The broker re-publishes the forming M1 bar as it changes, so each bucket
+keeps the aggregate of its finished M1 bars separately from the M1 bar
+still in progress. Bucket boundaries match ``time_bucket`` (epoch aligned).
+
+The first bucket of each (symbol, timeframe) after startup is seeded from
+the base-timeframe history already cached for the symbol (bars of that
+bucket older than the first live bar), so a forming H4 or D1 bar does not
+start from whatever the process happened to see since it started.
+"""
+
+from typing import Optional, Dict, Any, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.database.timescale import BASE_TIMEFRAME
+from core.timeframes import TIMEFRAME_SECONDS
+
+Bar = Dict[str, Any]
+
+
+def _merge(agg: Optional[Bar], bar: Bar) -> Bar:
+    """Fold a later bar into an aggregate (returns a new dict)."""
+    if agg is None:
+        return dict(bar)
+    return {
+        "time": agg["time"],
+        "open": agg["open"],
+        "high": max(agg["high"], bar["high"]),
+        "low": min(agg["low"], bar["low"]),
+        "close": bar["close"],
+        "volume": agg["volume"] + bar["volume"],
+        "spread": bar.get("spread"),
+    }
+
+
+def _aggregate(history, start: float, until: float) -> Optional[Bar]:
+    """One bar from the ``history`` bars in ``[start, until)``."""
+    mask = (history.time >= start) & (history.time < until)
+    if not mask.any():
+        return None
+    idx = np.flatnonzero(mask)
+    first, last = idx[0], idx[-1]
+    spread = history.spread[last]
+    return {
+        "time": start,
+        "open": float(history.open[first]),
+        "high": float(history.high[idx].max()),
+        "low": float(history.low[idx].min()),
+        "close": float(history.close[last]),
+        "volume": float(history.volume[idx].sum()),
+        "spread": None if np.isnan(spread) else float(spread),
+    }
+
+
+class _Bucket:
+    __slots__ = ("start", "closed", "current")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.closed: Optional[Bar] = None  # Finished M1 bars
+        self.current: Optional[Bar] = None  # M1 bar still forming
+
+    def update(self, bar: Bar):
+        if self.current is not None and bar["time"] != self.current["time"]:
+            self.closed = _merge(self.closed, self.current)
+        self.current = bar
+
+    def value(self) -> Bar:
+        merged = _merge(self.closed, self.current)
+        merged["time"] = self.start
+        return merged
+
+
+class Resampler:
+    """
+    Builds the forming bar of each target timeframe per symbol.
+    """
+
+    def __init__(self, timeframes: Optional[Iterable[str]] = None):
+        self.base = BASE_TIMEFRAME
+        self.timeframes = list(timeframes or settings.RESAMPLE_TIMEFRAMES)
+        self.seconds = {tf: TIMEFRAME_SECONDS[tf] for tf in self.timeframes}
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._seeded: Set[Tuple[str, str]] = set()
+
+    def needs_history(self, symbol: str) -> bool:
+        """Whether the next ``on_bar`` for ``symbol`` would seed a bucket."""
+        return any((symbol, tf) not in self._seeded for tf in self.timeframes)
+
+    def on_bar(self, symbol: str, bar: Bar, history=None) -> List[Tuple[str, Bar]]:
+        """
+        Feed one M1 bar (new or an update of the forming one). Returns the
+        updated ``(timeframe, bar)`` of every target timeframe; a timeframe
+        whose bucket rolled over starts a new bar. ``history`` (``Bars`` of
+        the base timeframe) seeds the first bucket of each timeframe.
+        """
+        bar = {
+            "time": float(bar["time"]),
+            "open": bar["open"],
+            "high": bar["high"],
+            "low": bar["low"],
+            "close": bar["close"],
+            "volume": bar.get("volume", 0),
+            "spread": bar.get("spread"),
+        }
+        out = []
+        for tf, seconds in self.seconds.items():
+            start = bar["time"] - bar["time"] % seconds
+            key = (symbol, tf)
+            bucket = self._buckets.get(key)
+            if bucket is None or start > bucket.start:
+                bucket = self._buckets[key] = _Bucket(start)
+                if key not in self._seeded:
+                    self._seeded.add(key)
+                    if history is not None:
+                        bucket.closed = _aggregate(history, start, bar["time"])
+            elif start < bucket.start:
+                continue  # Late bar for a bucket already rolled
+            bucket.update(bar)
+            out.append((tf, bucket.value()))
+        return out
+
+    def current(self, symbol: str, timeframe: str) -> Optional[Bar]:
+        """The forming bar of a timeframe, if any."""
+        bucket = self._buckets.get((symbol, timeframe))
+        return bucket.value() if bucket else None
@@ -1 +1,169 @@
+"""
+Risk manager for Revolution X
+Pre-trade limits checked against in-memory exposure counters
 
+The counters (open trades, trades today, money at risk) are updated as
+orders are reserved, filled, rejected and closed, so a pre-trade check is a
+handful of comparisons with no I/O. Orders in flight hold a reservation,
+which keeps concurrent signals from jointly overshooting a limit while
+their first order is still waiting for the broker.
+
+An order that got no reply (timeout, lost connection) may still fill, so
+its reservation is kept as "unknown" until a positions refresh read after
+it settles it: a new position on the same symbol takes the reservation
+over, otherwise it is released.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+from app.config import settings
+
+
+def _utc_day() -> int:
+    return datetime.now(timezone.utc).toordinal()
+
+
+class RiskManager:
+    """
+    Enforces ``MAX_CONCURRENT_TRADES``, ``MAX_DAILY_TRADES``,
+    ``RISK_PER_TRADE`` and ``MAX_TOTAL_RISK``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_daily: Optional[int] = None,
+        risk_per_trade: Optional[float] = None,
+        max_total_risk: Optional[float] = None,
+    ):
+        self.max_concurrent = max_concurrent or settings.MAX_CONCURRENT_TRADES
+        self.max_daily = max_daily or settings.MAX_DAILY_TRADES
+        self.risk_per_trade = risk_per_trade or settings.RISK_PER_TRADE
+        self.max_total_risk = max_total_risk or settings.MAX_TOTAL_RISK
+
+        self._positions: Dict[int, float] = {}  # ticket -> money at risk
+        self._reserved: Dict[str, float] = {}  # order id -> money at risk
+        self._unknown: Dict[str, Tuple[str, float]] = {}  # order id -> (symbol, marked at)
+        self.open_risk = 0.0  # Filled positions plus reservations
+        self.daily_trades = 0
+        self.rejections = 0
+        self._day = _utc_day()
+
+    @property
+    def open_trades(self) -> int:
+        return len(self._positions) + len(self._reserved)
+
+    def _roll_day(self):
+        today = _utc_day()
+        if today != self._day:
+            self._day = today
+            self.daily_trades = 0
+
+    def check(self, risk_amount: float, equity: float) -> Optional[str]:
+        """Reason an order would breach a limit, or ``None`` if it fits."""
+        self._roll_day()
+        if self.open_trades >= self.max_concurrent:
+            return f"MAX_CONCURRENT_TRADES reached ({self.max_concurrent})"
+        if self.daily_trades >= self.max_daily:
+            return f"MAX_DAILY_TRADES reached ({self.max_daily})"
+        if equity <= 0:
+            return "No equity"
+        # Small tolerance: sizing rounds to the volume step
+        if risk_amount > equity * self.risk_per_trade * 1.0001:
+            return f"RISK_PER_TRADE exceeded ({risk_amount / equity:.2%})"
+        if self.open_risk + risk_amount > equity * self.max_total_risk * 1.0001:
+            return f"MAX_TOTAL_RISK exceeded ({(self.open_risk + risk_amount) / equity:.2%})"
+        return None
+
+    def reserve(self, order_id: str, risk_amount: float, equity: float) -> Optional[str]:
+        """
+        Check the limits and, if the order fits, hold its exposure until it
+        is filled or released. Returns the rejection reason, if any.
+        """
+        reason = self.check(risk_amount, equity)
+        if reason:
+            self.rejections += 1
+            return reason
+        self._reserved[order_id] = risk_amount
+        self.open_risk += risk_amount
+        self.daily_trades += 1
+        return None
+
+    def confirm(self, order_id: str, ticket: int):
+        """The order filled: its reservation becomes an open position."""
+        risk_amount = self._reserved.pop(order_id, 0.0)
+        self._unknown.pop(order_id, None)
+        if ticket in self._positions:
+            # Already adopted from a positions refresh
+            self.open_risk -= self._positions[ticket]
+        self._positions[ticket] = risk_amount
+
+    def release(self, order_id: str):
+        """The order failed: give back its exposure and daily slot."""
+        self._unknown.pop(order_id, None)
+        if order_id in self._reserved:
+            self.open_risk -= self._reserved.pop(order_id)
+            self.daily_trades = max(self.daily_trades - 1, 0)
+
+    def mark_unknown(self, order_id: str, symbol: str):
+        """No reply for the order: hold its reservation until ``reconcile``."""
+        if order_id in self._reserved:
+            self._unknown[order_id] = (symbol, time.time())
+
+    def is_unknown(self, order_id: str) -> bool:
+        return order_id in self._unknown
+
+    def reconcile(
+        self, positions: Iterable[Tuple[int, float, str]], as_of: float
+    ) -> List[Tuple[int, Optional[str]]]:
+        """
+        Settle against the broker's open positions ``(ticket, risk, symbol)``
+        read at ``as_of`` (epoch seconds). Untracked tickets are adopted, each
+        taking over the oldest unknown order on its symbol; unknown orders
+        marked before ``as_of`` that no ticket accounts for are released (a
+        later fill still shows up as an untracked ticket and is adopted).
+        Returns the adopted ``(ticket, order id or None)`` pairs.
+        """
+        adopted = []
+        for ticket, risk_amount, symbol in positions:
+            if ticket in self._positions:
+                continue
+            order_id = next(
+                (o for o, (s, _) in sorted(self._unknown.items(), key=lambda u: u[1][1]) if s == symbol),
+                None,
+            )
+            if order_id is not None:
+                del self._unknown[order_id]
+                self.open_risk -= self._reserved.pop(order_id)
+            self._positions[ticket] = risk_amount
+            self.open_risk += risk_amount
+            adopted.append((ticket, order_id))
+        for order_id in [o for o, (_, marked) in self._unknown.items() if marked < as_of]:
+            self.release(order_id)
+        return adopted
+
+    def close(self, ticket: int) -> bool:
+        """A position was closed. Returns False if it was not tracked."""
+        if ticket not in self._positions:
+            return False
+        self.open_risk -= self._positions.pop(ticket)
+        if not self._positions and not self._reserved:
+            self.open_risk = 0.0  # Clear accumulated float error
+        return True
+
+    def sync(self, positions: Iterable[Tuple[int, float]]):
+        """Rebuild open positions, e.g. from MT5 after a restart."""
+        self._positions = dict(positions)
+        self.open_risk = sum(self._positions.values()) + sum(self._reserved.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_trades": self.open_trades,
+            "in_flight": len(self._reserved),
+            "unknown": len(self._unknown),
+            "daily_trades": self.daily_trades,
+            "open_risk": round(self.open_risk, 2),
+            "rejections": self.rejections,
+        }
@@ -0,0 +1,9 @@
+"""
+Timeframes for Revolution X
+Bar lengths shared by the live pipeline, the scheduler and the backtester
+"""
+
+TIMEFRAME_SECONDS = {
+    "M1": 60, "M5": 300, "M15": 900, "M30": 1800,
+    "H1": 3600, "H4": 14400, "D1": 86400,
+}
@@ -1 +1,323 @@
+"""
+Trading engine for Revolution X
+Signal -> sizing -> risk checks -> order -> ack
 
+Everything before the order is sent runs synchronously on in-memory state
+(equity, contract specs, exposure counters); the only await in the hot path
+is the broker round trip. Each stage is stamped with ``perf_counter_ns`` so
+signal-to-ack latency can be broken down per order.
+"""
+
+import itertools
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Callable, List, Set
+
+import numpy as np
+
+from app.config import settings
+from app.database.journal import WriteBehindJournal
+from app.mt5.connector import MT5ConnectionManager
+from core.position_sizer import PositionSizer, SymbolSpec
+from core.risk_manager import RiskManager
+
+# A sent order ends "acked" when the broker answers (fill or rejection)
+# or "failed" when no answer came (timeout, connection lost)
+STAGES = ("signal", "sized", "checked", "sent", "acked", "failed")
+
+FILLED = "filled"
+REJECTED = "rejected"
+FAILED = "failed"
+UNKNOWN = "unknown"  # Sent without a reply; settled by the next positions refresh
+
+_TRADE_NAMESPACE = uuid.UUID("9b1f0c52-3f0e-4c1a-9d4e-5a0c6e7d2b11")
+
+
+def trade_id(ticket: int) -> str:
+    """Stable trades.id for an MT5 ticket, so later updates need no lookup."""
+    return str(uuid.uuid5(_TRADE_NAMESPACE, f"mt5:{ticket}"))
+
+
+@dataclass
+class TradeSignal:
+    """An instruction to open a position."""
+    symbol: str
+    direction: str  # "buy" | "sell"
+    entry: float
+    stop_loss: float
+    take_profit: Optional[float] = None
+    strategy: Optional[str] = None
+    confidence: Optional[float] = None
+    reason: Optional[str] = None
+    user_id: Optional[str] = None  # Defaults to settings.TRADING_USER_ID
+    created_ns: int = field(default_factory=time.perf_counter_ns)
+
+
+@dataclass
+class ExecutionReport:
+    """Outcome of one signal with its per-stage timestamps."""
+    order_id: str
+    signal: TradeSignal
+    status: str = REJECTED
+    reason: Optional[str] = None
+    volume: float = 0.0
+    risk_amount: float = 0.0
+    ticket: Optional[int] = None
+    stamps: Dict[str, int] = field(default_factory=dict)
+
+    def stamp(self, stage: str):
+        self.stamps[stage] = time.perf_counter_ns()
+
+    def latency_us(self) -> Dict[str, float]:
+        """Microseconds spent in each stage and end to end."""
+        reached = [s for s in STAGES if s in self.stamps]
+        out = {
+            f"{a}_to_{b}": (self.stamps[b] - self.stamps[a]) / 1000
+            for a, b in zip(reached, reached[1:])
+        }
+        if len(reached) > 1:
+            out["total"] = (self.stamps[reached[-1]] - self.stamps[reached[0]]) / 1000
+        return out
+
+
+class TradingEngine:
+    """
+    Executes trade signals against MT5 within the configured risk limits.
+    """
+
+    def __init__(
+        self,
+        connector: MT5ConnectionManager,
+        sizer: Optional[PositionSizer] = None,
+        risk: Optional[RiskManager] = None,
+        journal: Optional[WriteBehindJournal] = None,
+        history: int = 1000,
+    ):
+        self.connector = connector
+        self.sizer = sizer or PositionSizer()
+        self.risk = risk or RiskManager()
+        self.journal = journal
+        self.listeners: List[Callable[[ExecutionReport], Any]] = []
+        self.equity = 0.0
+        self.reports: deque = deque(maxlen=history)
+        self.journaled: Set[int] = set()  # Tickets whose open is in the journal
+        self._unanswered: Dict[str, ExecutionReport] = {}  # Order id -> UNKNOWN report
+        self._order_ids = itertools.count(1)
+        self._prefix = f"{os.getpid():x}"
+
+    async def start(self, symbols: Optional[List[str]] = None):
+        """
+        Load equity, contract specs and open positions so the hot path
+        never has to ask MT5 for them.
+        """
+        account = await self.connector.get_account_info()
+        if account:
+            self.update_account(account)
+        for symbol in symbols or settings.TRADABLE_ASSETS:
+            await self.load_spec(symbol)
+        await self.sync_positions()
+
+    def update_account(self, account: Dict[str, Any]):
+        self.equity = float(account.get("equity") or account.get("balance") or 0.0)
+
+    async def load_spec(self, symbol: str) -> SymbolSpec:
+        info = await self.connector.get_symbol_info(symbol)
+        spec = SymbolSpec.from_info(symbol, info) if info else SymbolSpec(symbol)
+        self.sizer.set_spec(spec)
+        return spec
+
+    async def sync_positions(self):
+        """Rebuild the exposure counters from MT5's open positions."""
+        positions = [
+            (pos.get("ticket"), self._position_risk(pos))
+            for pos in await self.connector.get_positions()
+        ]
+        self.risk.sync(positions)
+        # Positions opened by an earlier run were journaled if a user was set
+        if settings.TRADING_USER_ID:
+            self.journaled.update(ticket for ticket, _ in positions)
+
+    def _position_risk(self, pos: Dict[str, Any]) -> float:
+        spec = self.sizer.spec(pos.get("symbol")) or SymbolSpec(pos.get("symbol"))
+        entry, sl = pos.get("price_open"), pos.get("sl")
+        if entry and sl:
+            return abs(entry - sl) * float(pos.get("volume") or 0) * spec.contract_size
+        # Unknown stop: assume a full per-trade risk
+        return self.equity * self.risk.risk_per_trade
+
+    def on_positions(self, positions: List[Dict[str, Any]], as_of: float):
+        """
+        Reconcile the exposure counters with a positions refresh read at
+        ``as_of``: settles unanswered orders and counts positions the engine
+        has not seen (late fills, trades opened outside it).
+        """
+        adopted = self.risk.reconcile(
+            [(p.get("ticket"), self._position_risk(p), p.get("symbol")) for p in positions],
+            as_of,
+        )
+        for ticket, order_id in adopted:
+            report = self._unanswered.pop(order_id, None) if order_id else None
+            if report is None:
+                continue
+            report.ticket = ticket
+            report.status, report.reason = FILLED, None
+            if self.journal is not None:
+                self._journal(report)
+            for listener in self.listeners:
+                listener(report)
+        for order_id in [o for o in self._unanswered if not self.risk.is_unknown(o)]:
+            self._unanswered.pop(order_id).status = FAILED
+
+    async def execute(self, signal: TradeSignal) -> ExecutionReport:
+        """Size, check and place one order."""
+        report = await self._execute(signal)
+        if self.journal is not None:
+            self._journal(report)
+        for listener in self.listeners:
+            listener(report)
+        return report
+
+    async def _execute(self, signal: TradeSignal) -> ExecutionReport:
+        report = ExecutionReport(
+            order_id=f"{self._prefix}-{next(self._order_ids)}",
+            signal=signal,
+        )
+        report.stamps["signal"] = signal.created_ns
+        self.reports.append(report)
+
+        spec = self.sizer.spec(signal.symbol)
+        if spec is None:
+            # Off the hot path only for symbols not loaded at start
+            spec = await self.load_spec(signal.symbol)
+        report.volume, report.risk_amount = self.sizer.size(
+            spec, self.equity, signal.entry, signal.stop_loss
+        )
+        report.stamp("sized")
+        if not report.volume:
+            report.reason = "Stop too wide or too tight for the minimum volume"
+            return report
+
+        report.reason = self.risk.reserve(report.order_id, report.risk_amount, self.equity)
+        report.stamp("checked")
+        if report.reason:
+            return report
+
+        if not self.connector.is_connected:
+            self.risk.release(report.order_id)
+            report.status, report.reason = FAILED, "MT5 not connected"
+            return report
+
+        report.stamp("sent")
+        try:
+            response = await self.connector.place_order(
+                symbol=signal.symbol,
+                direction=signal.direction,
+                volume=report.volume,
+                stop_loss=signal.stop_loss,
+                take_profit=signal.take_profit,
+                comment=signal.strategy or "Revolution X",
+            )
+        except Exception as e:
+            report.stamp("failed")
+            # The order may still have reached the broker: keep its exposure
+            # until a positions refresh shows whether it filled
+            self.risk.mark_unknown(report.order_id, signal.symbol)
+            self._unanswered[report.order_id] = report
+            report.status, report.reason = UNKNOWN, str(e)
+            return report
+        report.stamp("acked")
+
+        if not response or response.get("status") != "ok":
+            self.risk.release(report.order_id)
+            report.reason = (response or {}).get("message", "Order rejected by broker")
+            return report
+
+        report.ticket = response.get("ticket")
+        self.risk.confirm(report.order_id, report.ticket)
+        report.status, report.reason = FILLED, None
+        return report
+
+    def _journal(self, report: ExecutionReport):
+        """Hand the outcome to the write-behind journal (no database I/O here)."""
+        signal = report.signal
+        user_id = signal.user_id or settings.TRADING_USER_ID
+        if report.status == FILLED and user_id:
+            self.journaled.add(report.ticket)
+            self.journal.trade(
+                id=trade_id(report.ticket),
+                user_id=user_id,
+                symbol=signal.symbol,
+                direction=signal.direction,
+                status="open",
+                entry_price=signal.entry,
+                stop_loss=signal.stop_loss,
+                take_profit=signal.take_profit,
+                volume=report.volume,
+                risk_amount=round(report.risk_amount, 2),
+                strategy=signal.strategy,
+                ai_confidence=signal.confidence,
+                entry_reason=signal.reason,
+                opened_at=datetime.now(timezone.utc).isoformat(),
+            )
+        self.journal.audit(f"order_{report.status}", {
+            "order_id": report.order_id,
+            "ticket": report.ticket,
+            "symbol": signal.symbol,
+            "direction": signal.direction,
+            "volume": report.volume,
+            "risk_amount": report.risk_amount,
+            "reason": report.reason,
+            "latency_us": report.latency_us(),
+        }, user_id=user_id)
+
+    async def close(self, ticket: int) -> Optional[Dict[str, Any]]:
+        """Close a position and release its exposure."""
+        response = await self.connector.close_position(ticket)
+        if response and response.get("status") == "ok":
+            self.on_position_closed(ticket, response.get("price"), response.get("profit"))
+        return response
+
+    def on_position_closed(
+        self,
+        ticket: int,
+        exit_price: Optional[float] = None,
+        profit_loss: Optional[float] = None,
+    ):
+        """A position was closed (by the engine, SL/TP hit or manually)."""
+        if not self.risk.close(ticket):
+            return
+        # A close without a journaled open would update a row that does not exist
+        if self.journal is not None and ticket in self.journaled:
+            self.journaled.discard(ticket)
+            self.journal.trade(
+                id=trade_id(ticket),
+                status="closed",
+                exit_price=exit_price,
+                profit_loss=profit_loss,
+                closed_at=datetime.now(timezone.utc).isoformat(),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        filled = [r for r in self.reports if r.status == FILLED]
+        out: Dict[str, Any] = {
+            "equity": self.equity,
+            "orders": len(self.reports),
+            "filled": len(filled),
+            "risk": self.risk.stats(),
+        }
+        if filled:
+            total = np.array([r.latency_us()["total"] for r in filled])
+            pre_trade = np.array([
+                (r.stamps["sent"] - r.stamps["signal"]) / 1000 for r in filled
+            ])
+            out["latency_us"] = {
+                "signal_to_ack_p50": round(float(np.percentile(total, 50)), 1),
+                "signal_to_ack_p99": round(float(np.percentile(total, 99)), 1),
+                "pre_trade_p50": round(float(np.percentile(pre_trade, 50)), 1),
+                "pre_trade_p99": round(float(np.percentile(pre_trade, 99)), 1),
+            }
+        return out
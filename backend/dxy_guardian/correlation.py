@@ -1 +1,201 @@
+"""
+DXY correlation for Revolution X
+Rolling Pearson/Spearman correlation and beta between DXY and the metals
 
+Live updates are O(1) per bar: ``RollingCorrelation`` keeps windowed means
+and co-moments (Welford's update, run backwards for the bar that leaves the
+window) and re-sums them from its ring every ``window`` bars so float error
+cannot accumulate. Spearman needs the ranks of the whole window, so it is
+computed from the ring on request and cached until the next bar.
+
+``rolling_pearson()`` and ``rolling_spearman()`` compute the same values
+for every bar of whole arrays, for backfills.
+"""
+
+import math
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NAN = float("nan")
+
+
+@dataclass
+class CorrelationResult:
+    """Statistics of one (metal, window) pair at its latest bar."""
+    pearson: float = NAN
+    spearman: float = NAN
+    beta: float = NAN  # Metal return per unit of DXY return
+    samples: int = 0
+    time: float = 0.0  # Bar time of the latest sample
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: (None if isinstance(v, float) and math.isnan(v) else v)
+                for k, v in asdict(self).items()}
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Average ranks along the last axis (ties share their mean rank)."""
+    n = values.shape[-1]
+    order = np.argsort(values, axis=-1, kind="stable")
+    s = np.take_along_axis(values, order, axis=-1)
+    positions = np.broadcast_to(np.arange(n), s.shape)
+    # First and last sorted position of each run of equal values
+    edge = np.ones(s.shape[:-1] + (1,), dtype=bool)
+    starts = np.concatenate([edge, s[..., 1:] != s[..., :-1]], axis=-1)
+    ends = np.concatenate([s[..., 1:] != s[..., :-1], edge], axis=-1)
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=-1)
+    last = np.flip(np.minimum.accumulate(np.flip(np.where(ends, positions, n - 1), -1), axis=-1), -1)
+    ranks = np.empty(values.shape, dtype=np.float64)
+    np.put_along_axis(ranks, order, (first + last) / 2.0, axis=-1)
+    return ranks
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pearson correlation and beta (y on x) along the last axis."""
+    dx = x - x.mean(axis=-1, keepdims=True)
+    dy = y - y.mean(axis=-1, keepdims=True)
+    sxy = (dx * dy).sum(axis=-1)
+    sxx = (dx * dx).sum(axis=-1)
+    syy = (dy * dy).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sxy / np.sqrt(sxx * syy), sxy / sxx
+
+
+def rolling_pearson(x: np.ndarray, y: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation and beta (y on x) of every trailing ``window``;
+    ``nan`` for the first ``window - 1`` bars.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    corr = np.full(len(x), np.nan)
+    beta = np.full(len(x), np.nan)
+    if len(x) >= window:
+        corr[window - 1:], beta[window - 1:] = _pearson(
+            sliding_window_view(x, window), sliding_window_view(y, window)
+        )
+    return corr, beta
+
+
+def rolling_spearman(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """Spearman rank correlation of every trailing ``window``."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = _pearson(
+            _ranks(sliding_window_view(x, window)), _ranks(sliding_window_view(y, window))
+        )[0]
+    return out
+
+
+class RollingCorrelation:
+    """
+    Windowed correlation of paired samples ``(x, y)`` in O(1) per sample.
+    """
+
+    def __init__(self, window: int):
+        if window < 3:
+            raise ValueError("window must be at least 3")
+        self.window = window
+        self._x = np.zeros(window, dtype=np.float64)
+        self._y = np.zeros(window, dtype=np.float64)
+        self._head = 0  # Next write slot
+        self.count = 0
+        self._since_resum = 0
+        self._mx = self._my = 0.0
+        self._sxx = self._syy = self._sxy = 0.0
+        self._spearman: float = NAN
+        self._spearman_valid = False
+
+    def _resum(self):
+        """Recompute the moments from the ring (bounds float drift)."""
+        x, y = self.window_values()
+        if len(x):
+            self._mx, self._my = float(x.mean()), float(y.mean())
+            dx, dy = x - self._mx, y - self._my
+            self._sxx, self._syy, self._sxy = float(dx @ dx), float(dy @ dy), float(dx @ dy)
+        self._since_resum = 0
+
+    def update(self, x: float, y: float):
+        if self.count == self.window:
+            # Remove the oldest sample: Welford's update in reverse
+            ox, oy = self._x[self._head], self._y[self._head]
+            n = self.count
+            mx = (n * self._mx - ox) / (n - 1)
+            my = (n * self._my - oy) / (n - 1)
+            self._sxx -= (ox - mx) * (ox - self._mx)
+            self._syy -= (oy - my) * (oy - self._my)
+            self._sxy -= (ox - mx) * (oy - self._my)
+            self._mx, self._my = mx, my
+            self.count -= 1
+
+        self._x[self._head] = x
+        self._y[self._head] = y
+        self._head = (self._head + 1) % self.window
+        self.count += 1
+        dx, dy = x - self._mx, y - self._my
+        self._mx += dx / self.count
+        self._my += dy / self.count
+        self._sxx += dx * (x - self._mx)
+        self._syy += dy * (y - self._my)
+        self._sxy += dx * (y - self._my)
+        self._spearman_valid = False
+
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self._resum()
+
+    def extend(self, x: np.ndarray, y: np.ndarray):
+        """Load the last ``window`` samples of whole arrays (backfill)."""
+        x = np.asarray(x, dtype=np.float64)[-self.window:]
+        y = np.asarray(y, dtype=np.float64)[-self.window:]
+        n = len(x)
+        self._x[:n], self._y[:n] = x, y
+        self._head = n % self.window
+        self.count = n
+        self._spearman_valid = False
+        self._resum()
+
+    def window_values(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Samples in the window, oldest first."""
+        if self.count < self.window:
+            return self._x[:self.count], self._y[:self.count]
+        return np.roll(self._x, -self._head), np.roll(self._y, -self._head)
+
+    @property
+    def ready(self) -> bool:
+        return self.count == self.window
+
+    @property
+    def pearson(self) -> float:
+        if not self.ready or self._sxx <= 0 or self._syy <= 0:
+            return NAN
+        return self._sxy / math.sqrt(self._sxx * self._syy)
+
+    @property
+    def beta(self) -> float:
+        """Slope of y on x."""
+        if not self.ready or self._sxx <= 0:
+            return NAN
+        return self._sxy / self._sxx
+
+    @property
+    def x_std(self) -> float:
+        """Sample standard deviation of x over the window."""
+        if self.count < 2:
+            return NAN
+        return math.sqrt(max(self._sxx, 0.0) / (self.count - 1))
+
+    @property
+    def spearman(self) -> float:
+        if not self.ready:
+            return NAN
+        if not self._spearman_valid:
+            x, y = self.window_values()
+            self._spearman = float(_pearson(_ranks(x), _ranks(y))[0])
+            self._spearman_valid = True
+        return self._spearman
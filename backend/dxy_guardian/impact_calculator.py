@@ -1 +1,72 @@
+"""
+DXY impact calculator for Revolution X
+Expected metal moves from DXY moves, per correlation window
 
+Uses the tracker's cached beta and correlation, so an assessment is a few
+multiplications per (metal, window) rather than a regression.
+
+    expected_move = beta * dxy_return
+    dxy_z         = dxy_return / std(dxy returns over the window)
+
+A move is flagged when the DXY return is unusual (``|dxy_z|`` at or above
+``DXY_IMPACT_Z``) and the relationship is strong (``|pearson|`` at or above
+``DXY_IMPACT_MIN_CORRELATION``).
+"""
+
+import math
+from typing import Optional, Dict, Any, List
+
+from app.config import settings
+from dxy_guardian.tracker import DXYTracker, dxy_tracker
+
+
+class ImpactCalculator:
+    """
+    Translates DXY moves into expected metal moves.
+    """
+
+    def __init__(self, tracker: Optional[DXYTracker] = None):
+        self.tracker = tracker or dxy_tracker
+
+    def assess(self, metal: str, dxy_return: float, window: int) -> Dict[str, Any]:
+        """Expected log return of ``metal`` for a DXY log return."""
+        result = self.tracker.result(metal, window)
+        volatility = self.tracker.dxy_volatility(window)
+        if math.isnan(result.beta) or math.isnan(result.pearson):
+            return {"metal": metal, "window": window, "ready": False}
+
+        z = dxy_return / volatility if volatility > 0 else 0.0
+        expected = result.beta * dxy_return
+        strong = abs(result.pearson) >= settings.DXY_IMPACT_MIN_CORRELATION
+        return {
+            "metal": metal,
+            "window": window,
+            "ready": True,
+            "dxy_return": dxy_return,
+            "dxy_z": z,
+            "expected_return": expected,
+            "expected_pct": (math.exp(expected) - 1.0) * 100.0,
+            "direction": "up" if expected > 0 else "down" if expected < 0 else "flat",
+            "pearson": result.pearson,
+            "beta": result.beta,
+            "alert": strong and abs(z) >= settings.DXY_IMPACT_Z,
+        }
+
+    def latest(self, metal: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Assess the latest DXY bar for every (metal, window)."""
+        dxy_return = self.tracker.last_dxy_return()
+        if dxy_return is None:
+            return []
+        metals = [metal] if metal else self.tracker.metals
+        return [
+            self.assess(m, dxy_return, w)
+            for m in metals
+            for w in self.tracker.windows
+        ]
+
+    def alerts(self) -> List[Dict[str, Any]]:
+        return [a for a in self.latest() if a.get("alert")]
+
+
+# Shared calculator
+impact_calculator = ImpactCalculator()
@@ -1 +1,203 @@
+"""
+DXY tracker for Revolution X
+Aligns DXY and metal bars and keeps their rolling correlations current
 
+A bar is final once the next bar of the same symbol opens. Final closes of
+DXY and each metal are matched on bar time; every matched pair adds one log
+return sample to the ``RollingCorrelation`` of each window, so the cost per
+bar is constant however many windows and metals are tracked. Results are
+cached per (metal, window) and replaced as each sample arrives.
+"""
+
+import math
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+import numpy as np
+
+from app.config import settings
+from app.database.ingestion import to_datetime
+from core.market_data import market_data_cache
+from dxy_guardian.correlation import (
+    CorrelationResult,
+    RollingCorrelation,
+    rolling_pearson,
+    rolling_spearman,
+)
+
+# Final closes kept per symbol while waiting for the other side of a pair
+PENDING_BARS = 64
+
+
+class DXYTracker:
+    """
+    Rolling DXY/metal statistics for every (metal, window).
+    """
+
+    def __init__(
+        self,
+        metals: Optional[List[str]] = None,
+        windows: Optional[List[int]] = None,
+        dxy_symbol: Optional[str] = None,
+        timeframe: Optional[str] = None,
+    ):
+        self.dxy = dxy_symbol or settings.DXY_SYMBOL
+        self.metals = list(metals or settings.TRADABLE_ASSETS)
+        self.windows = list(windows or settings.DXY_WINDOWS)
+        self.timeframe = timeframe or settings.DXY_TIMEFRAME
+        self.stats_by_pair: Dict[Tuple[str, int], RollingCorrelation] = {
+            (m, w): RollingCorrelation(w) for m in self.metals for w in self.windows
+        }
+        self.results: Dict[Tuple[str, int], CorrelationResult] = {}
+        self.listeners: List[Callable[[str, float], Any]] = []
+
+        self._open: Dict[str, Tuple[float, float]] = {}  # Symbol -> (time, close) of the forming bar
+        self._final: Dict[str, "OrderedDict[float, float]"] = {}
+        self._last_common: Dict[str, Tuple[float, float, float]] = {}  # Metal -> (time, metal, dxy)
+        self.samples = 0
+
+    # ----- live -----
+
+    def on_bar(self, symbol: str, bar: Dict[str, Any]):
+        """Apply a live bar (new or an update of the newest one)."""
+        if symbol != self.dxy and symbol not in self.metals:
+            return
+        t = to_datetime(bar["time"]).timestamp()
+        close = float(bar["close"])
+        current = self._open.get(symbol)
+        if current is not None and t > current[0]:
+            self._finalize(symbol, *current)
+        if current is None or t >= current[0]:
+            self._open[symbol] = (t, close)
+
+    def _finalize(self, symbol: str, t: float, close: float):
+        closes = self._final.setdefault(symbol, OrderedDict())
+        closes[t] = close
+        while len(closes) > PENDING_BARS:
+            closes.popitem(last=False)
+
+        if symbol == self.dxy:
+            for metal in self.metals:
+                metal_close = self._final.get(metal, {}).get(t)
+                if metal_close is not None:
+                    self._on_common(metal, t, metal_close, close)
+        else:
+            dxy_close = self._final.get(self.dxy, {}).get(t)
+            if dxy_close is not None:
+                self._on_common(symbol, t, close, dxy_close)
+
+    def _on_common(self, metal: str, t: float, metal_close: float, dxy_close: float):
+        last = self._last_common.get(metal)
+        self._last_common[metal] = (t, metal_close, dxy_close)
+        if last is None or t <= last[0] or min(metal_close, dxy_close, last[1], last[2]) <= 0:
+            return
+        x = math.log(dxy_close / last[2])
+        y = math.log(metal_close / last[1])
+        for window in self.windows:
+            stats = self.stats_by_pair[(metal, window)]
+            stats.update(x, y)
+            self.results[(metal, window)] = CorrelationResult(
+                pearson=stats.pearson,
+                beta=stats.beta,
+                samples=stats.count,
+                time=t,
+            )
+        self.samples += 1
+        for listener in self.listeners:
+            listener(metal, t)
+
+    async def consume(self, subscription):
+        """Apply every bar event of an MT5 subscription."""
+        async for event in subscription:
+            if event.kind == "bar" and event.timeframe == self.timeframe:
+                self.on_bar(event.symbol, event.data)
+
+    # ----- backfill -----
+
+    async def backfill(self):
+        """Seed every window from the bar cache (vectorized)."""
+        dxy = await market_data_cache.last(self.dxy, self.timeframe)
+        for metal in self.metals:
+            bars = await market_data_cache.last(metal, self.timeframe)
+            self.load(metal, bars.time, bars.close, dxy.time, dxy.close)
+
+    def load(
+        self,
+        metal: str,
+        metal_time: np.ndarray,
+        metal_close: np.ndarray,
+        dxy_time: np.ndarray,
+        dxy_close: np.ndarray,
+    ) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Align two close series, compute every window's rolling statistics
+        over the whole history and seed the live state from its tail.
+        Returns ``{window: {"time", "pearson", "spearman", "beta"}}``.
+        """
+        common, mi, di = np.intersect1d(metal_time, dxy_time, return_indices=True)
+        mc, dc = np.asarray(metal_close)[mi], np.asarray(dxy_close)[di]
+        valid = (mc > 0) & (dc > 0)
+        common, mc, dc = common[valid], mc[valid], dc[valid]
+        if len(common) < 2:
+            return {}
+        x = np.diff(np.log(dc))
+        y = np.diff(np.log(mc))
+        times = common[1:]
+
+        history = {}
+        for window in self.windows:
+            pearson, beta = rolling_pearson(x, y, window)
+            spearman = rolling_spearman(x, y, window)
+            history[window] = {"time": times, "pearson": pearson, "spearman": spearman, "beta": beta}
+
+            stats = self.stats_by_pair[(metal, window)]
+            stats.extend(x, y)
+            self.results[(metal, window)] = CorrelationResult(
+                pearson=stats.pearson, beta=stats.beta, samples=stats.count, time=float(times[-1]),
+            )
+        self._last_common[metal] = (float(common[-1]), float(mc[-1]), float(dc[-1]))
+        return history
+
+    # ----- results -----
+
+    def result(self, metal: str, window: int) -> CorrelationResult:
+        """Cached statistics of a pair, with Spearman filled in on demand."""
+        result = self.results.get((metal, window))
+        if result is None:
+            return CorrelationResult()
+        if math.isnan(result.spearman):
+            result.spearman = self.stats_by_pair[(metal, window)].spearman
+        return result
+
+    def dxy_volatility(self, window: int) -> float:
+        """Standard deviation of DXY log returns over a window."""
+        for metal in self.metals:
+            stats = self.stats_by_pair[(metal, window)]
+            if stats.count > 1:
+                return stats.x_std
+        return float("nan")
+
+    def last_dxy_return(self) -> Optional[float]:
+        """Log return of the latest final DXY bar."""
+        closes = self._final.get(self.dxy)
+        if not closes or len(closes) < 2:
+            return None
+        (_, prev), (_, last) = list(closes.items())[-2:]
+        return math.log(last / prev) if prev > 0 and last > 0 else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            metal: {str(w): self.result(metal, w).to_dict() for w in self.windows}
+            for metal in self.metals
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pairs": len(self.stats_by_pair),
+            "samples": self.samples,
+            "ready": sum(1 for s in self.stats_by_pair.values() if s.ready),
+        }
+
+
+# Shared tracker
+dxy_tracker = DXYTracker()
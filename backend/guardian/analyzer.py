@@ -1 +1,191 @@
+"""
+Guardian analyzer for Revolution X
+Streaming anomaly detection over runtime metrics
 
+Each series (p99 endpoint latency, event-loop lag, MT5 round trip, DB pool
+saturation...) feeds an exponentially weighted mean and variance. A value
+more than ``ANOMALY_Z`` deviations from the mean, after a warm-up, is a
+finding; a series that stays anomalous is reported again only after a
+cooldown. Findings are written to ``guardian_logs`` in batches by
+``GuardianLogWriter``, so detection never waits on the database.
+"""
+
+import asyncio
+import json
+import math
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Dict, Any
+
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database.connection import AsyncSessionLocal
+from app.database.models import GuardianLog
+
+
+class EWMADetector:
+    """
+    Exponentially weighted mean/variance with a z-score test.
+
+    The value is scored against the statistics *before* it is folded in,
+    so a spike cannot mask itself.
+    """
+
+    def __init__(self, alpha: float, threshold: float, warmup: int, min_std: float = 0.0):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_std = min_std  # Floor so a flat series does not flag noise
+        self.mean: Optional[float] = None
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, value: float) -> Optional[float]:
+        """Fold in ``value``; returns its z-score if it is anomalous."""
+        self.count += 1
+        if self.mean is None:
+            self.mean = value
+            return None
+        diff = value - self.mean
+        std = max(math.sqrt(self.var), self.min_std)
+        z = diff / std if std > 0 else 0.0
+        incr = self.alpha * diff
+        self.mean += incr
+        self.var = (1 - self.alpha) * (self.var + diff * incr)
+        if self.count > self.warmup and abs(z) >= self.threshold:
+            return z
+        return None
+
+
+@dataclass
+class Finding:
+    series: str
+    value: float
+    mean: float
+    z: float
+    detected_at: float = field(default_factory=time.time)
+
+    @property
+    def description(self) -> str:
+        direction = "above" if self.z > 0 else "below"
+        return (
+            f"{self.series} = {self.value:.3f} is {abs(self.z):.1f} deviations "
+            f"{direction} its recent mean {self.mean:.3f}"
+        )
+
+
+class AnomalyAnalyzer:
+    """
+    One detector per series, created on first sight.
+    """
+
+    def __init__(
+        self,
+        alpha: Optional[float] = None,
+        threshold: Optional[float] = None,
+        warmup: Optional[int] = None,
+        cooldown: Optional[float] = None,
+    ):
+        self.alpha = alpha or settings.ANOMALY_ALPHA
+        self.threshold = threshold or settings.ANOMALY_Z
+        self.warmup = warmup or settings.ANOMALY_WARMUP
+        self.cooldown = cooldown if cooldown is not None else settings.ANOMALY_COOLDOWN
+        self.detectors: Dict[str, EWMADetector] = {}
+        self.min_std: Dict[str, float] = {}
+        self._last_reported: Dict[str, float] = {}
+        self.recent: deque = deque(maxlen=100)
+        self.findings = 0
+
+    def observe(self, series: str, value: float) -> Optional[Finding]:
+        detector = self.detectors.get(series)
+        if detector is None:
+            detector = self.detectors[series] = EWMADetector(
+                self.alpha, self.threshold, self.warmup, self._floor(series)
+            )
+        mean = detector.mean
+        z = detector.update(value)
+        if z is None:
+            return None
+        now = time.time()
+        if now - self._last_reported.get(series, 0.0) < self.cooldown:
+            return None
+        self._last_reported[series] = now
+        finding = Finding(series, value, mean, z, now)
+        self.recent.append(finding)
+        self.findings += 1
+        return finding
+
+    def _floor(self, series: str) -> float:
+        """Longest configured prefix wins, e.g. ``endpoint:`` for every endpoint."""
+        best = ""
+        for prefix in self.min_std:
+            if series.startswith(prefix) and len(prefix) > len(best):
+                best = prefix
+        return self.min_std.get(best, 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "series": len(self.detectors),
+            "findings": self.findings,
+            "recent": [asdict(f) for f in list(self.recent)[-5:]],
+        }
+
+
+class GuardianLogWriter:
+    """
+    Bounded queue of findings written to ``guardian_logs`` in batches.
+    Oldest findings are dropped if the database stays unavailable.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, max_queue: Optional[int] = None):
+        self.batch_size = batch_size or settings.GUARDIAN_LOG_BATCH
+        self._queue: deque = deque(maxlen=max_queue or settings.GUARDIAN_LOG_MAX_QUEUE)
+        self._flush_lock = asyncio.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def record(self, finding: Finding):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(finding)
+
+    async def flush(self) -> int:
+        """Write everything queued; returns the number of rows written."""
+        written = 0
+        async with self._flush_lock:
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                rows = [
+                    {
+                        "id": uuid.uuid4(),
+                        "action_type": "anomaly",
+                        "description": f.description,
+                        "new_value": json.dumps(asdict(f)),
+                        "applied": False,
+                    }
+                    for f in batch
+                ]
+                try:
+                    async with AsyncSessionLocal() as session:
+                        await session.execute(insert(GuardianLog.__table__), rows)
+                        await session.commit()
+                except Exception:
+                    # Back in front for the next flush
+                    self._queue.extendleft(reversed(batch))
+                    self.failed_flushes += 1
+                    raise
+                written += len(batch)
+                self.written += len(batch)
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
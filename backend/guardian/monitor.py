@@ -1 +1,281 @@
+"""
+Guardian runtime monitor for Revolution X
+Fixed-memory latency histograms for the running process
 
+Samples event-loop lag, MT5 round-trip time, database pool saturation and
+per-endpoint request latency. Latencies go into HDR-style histograms: 64
+linear sub-buckets per power of two (about 3% relative error), fixed size
+whatever the traffic, recorded with a bit-length and a list increment.
+Every ``MONITOR_INTERVAL`` the window histograms are folded into the
+totals and their p99 (or the pool's peak saturation) is fed to the
+anomaly analyzer; findings are queued for ``guardian_logs``.
+
+The request middleware is plain ASGI and costs two clock reads and one
+histogram increment per request.
+"""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, List
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.database.connection import async_engine
+from app.mt5.connector import MT5ConnectionManager
+from guardian.analyzer import AnomalyAnalyzer, GuardianLogWriter
+
+SUB_BITS = 6
+SUB_COUNT = 1 << SUB_BITS  # 64
+HALF_COUNT = SUB_COUNT >> 1  # 32
+MAX_EXPONENT = 31  # Top bucket starts near 2^36 us (~19 hours)
+BUCKETS = SUB_COUNT + MAX_EXPONENT * HALF_COUNT
+
+# Endpoint series beyond this share one "other" histogram
+MAX_ENDPOINTS = 200
+
+
+def _bucket(value: int) -> int:
+    if value < SUB_COUNT:
+        return value if value > 0 else 0
+    exponent = value.bit_length() - SUB_BITS
+    if exponent > MAX_EXPONENT:
+        return BUCKETS - 1
+    return SUB_COUNT + (exponent - 1) * HALF_COUNT + (value >> exponent) - HALF_COUNT
+
+
+def _bucket_upper(index: int) -> int:
+    """Highest value that lands in bucket ``index``."""
+    if index < SUB_COUNT:
+        return index
+    exponent, sub = divmod(index - SUB_COUNT, HALF_COUNT)
+    exponent += 1
+    return ((sub + HALF_COUNT + 1) << exponent) - 1
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of integer microseconds.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record_us(self, value: int):
+        self.counts[_bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def record(self, seconds: float):
+        self.record_us(int(seconds * 1_000_000))
+
+    def merge(self, other: "LatencyHistogram"):
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        self.counts = [0] * BUCKETS
+        self.count = self.total = self.max = 0
+
+    def percentile(self, q: float) -> int:
+        """Microseconds at or below which ``q`` percent of values fall."""
+        if not self.count:
+            return 0
+        rank = max(1, int(q / 100 * self.count + 0.5))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_upper(i), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Counts and percentiles in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count / 1000, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50) / 1000,
+            "p90_ms": self.percentile(90) / 1000,
+            "p99_ms": self.percentile(99) / 1000,
+            "p999_ms": self.percentile(99.9) / 1000,
+            "max_ms": self.max / 1000,
+        }
+
+
+class _Series:
+    """Totals since start plus the current analysis window."""
+
+    __slots__ = ("total", "window")
+
+    def __init__(self):
+        self.total = LatencyHistogram()
+        self.window = LatencyHistogram()
+
+    def rotate(self) -> LatencyHistogram:
+        window = self.window
+        self.window = LatencyHistogram()
+        self.total.merge(window)
+        return window
+
+
+class RuntimeMonitor:
+    """
+    Collects runtime latency series and feeds the anomaly analyzer.
+    """
+
+    def __init__(
+        self,
+        analyzer: Optional[AnomalyAnalyzer] = None,
+        writer: Optional[GuardianLogWriter] = None,
+        engine: Optional[AsyncEngine] = None,
+    ):
+        self.analyzer = analyzer or AnomalyAnalyzer()
+        self.writer = writer or GuardianLogWriter()
+        self.engine = engine or async_engine
+        self.series: Dict[str, _Series] = {
+            "loop_lag": _Series(),
+            "mt5_rtt": _Series(),
+        }
+        self.endpoints: Dict[str, _Series] = {}
+        self.pool_capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        self.pool_checked_out = 0
+        self.pool_peak = 0.0  # Highest saturation this window
+        self.mt5_errors = 0
+        self.windows = 0
+        # Ignore jitter below these (ms, or a fraction for the pool)
+        self.analyzer.min_std.update({
+            "endpoint:": 1.0, "loop_lag": 1.0, "mt5_rtt": 1.0, "db_pool": 0.05,
+        })
+
+    # Recording
+
+    def record_request(self, method: str, route: Optional[str], elapsed_ns: int):
+        key = f"{method} {route}" if route else "unmatched"
+        series = self.endpoints.get(key)
+        if series is None:
+            if len(self.endpoints) >= MAX_ENDPOINTS:
+                key = "other"
+                series = self.endpoints.get(key)
+            if series is None:
+                series = self.endpoints[key] = _Series()
+        series.window.record_us(elapsed_ns // 1000)
+
+    def sample_db_pool(self):
+        pool = self.engine.sync_engine.pool
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        self.pool_checked_out = checked_out
+        saturation = checked_out / self.pool_capacity if self.pool_capacity else 0.0
+        if saturation > self.pool_peak:
+            self.pool_peak = saturation
+
+    async def run_lag_sampler(self, interval: Optional[float] = None):
+        """
+        Measure how late a sleep wakes up (event-loop lag) and sample the
+        DB pool on the same tick.
+        """
+        interval = interval or settings.MONITOR_LAG_INTERVAL
+        loop = asyncio.get_running_loop()
+        lag = self.series["loop_lag"]
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag.window.record(max(loop.time() - expected, 0.0))
+            try:
+                self.sample_db_pool()
+            except Exception:
+                pass
+
+    async def sample_mt5(self, connector: MT5ConnectionManager):
+        if not connector.is_connected:
+            return
+        try:
+            rtt = await connector.ping(timeout=settings.MT5_TIMEOUT)
+        except Exception:
+            self.mt5_errors += 1
+            return
+        self.series["mt5_rtt"].window.record(rtt)
+
+    # Analysis
+
+    async def analyze(self) -> list:
+        """Close the current window and run anomaly detection on it."""
+        self.windows += 1
+        observations = []
+        for name, series in self.series.items():
+            window = series.rotate()
+            if window.count:
+                observations.append((f"{name}.p99", window.percentile(99) / 1000))
+        for key, series in self.endpoints.items():
+            window = series.rotate()
+            if window.count:
+                observations.append((f"endpoint:{key}.p99", window.percentile(99) / 1000))
+        observations.append(("db_pool.saturation", self.pool_peak))
+        self.pool_peak = 0.0
+
+        findings = []
+        for name, value in observations:
+            finding = self.analyzer.observe(name, value)
+            if finding is not None:
+                findings.append(finding)
+                self.writer.record(finding)
+                print(f"⚠️ Guardian: {finding.description}")
+        return findings
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loop_lag": self.series["loop_lag"].total.summary(),
+            "mt5_rtt": {**self.series["mt5_rtt"].total.summary(), "errors": self.mt5_errors},
+            "db_pool": {
+                "checked_out": self.pool_checked_out,
+                "capacity": self.pool_capacity,
+            },
+            "endpoints": {
+                key: series.total.summary()
+                for key, series in sorted(self.endpoints.items())
+            },
+            "windows": self.windows,
+            "anomalies": self.analyzer.stats(),
+            "logs": self.writer.stats(),
+        }
+
+
+class LatencyMiddleware:
+    """
+    ASGI middleware timing each HTTP request by its route template.
+    """
+
+    def __init__(self, app, monitor: Optional[RuntimeMonitor] = None):
+        self.app = app
+        self.monitor = monitor or runtime_monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            self.monitor.record_request(
+                scope["method"],
+                getattr(route, "path", None),
+                time.perf_counter_ns() - started,
+            )
+
+
+# Shared monitor
+runtime_monitor = RuntimeMonitor()
@@ -1 +1,63 @@
+"""
+Order book imbalance for Revolution X
+Top-N depth imbalance maintained incrementally
 
+Keeps the resting volume within ``depth`` ticks of the touch on each side.
+A change to a level inside the window adjusts the sum by the difference; only
+a move of the touch itself re-sums the (short) window.
+
+    imbalance = (bid_volume - ask_volume) / (bid_volume + ask_volume)
+
+ranges from -1 (all offers) to +1 (all bids).
+"""
+
+from typing import Dict, Any
+
+BID = 0
+ASK = 1
+
+
+class ImbalanceTracker:
+    """
+    Running top-N volume per side for one ``OrderBook``.
+    """
+
+    __slots__ = ("depth", "bid_volume", "ask_volume")
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.bid_volume = 0.0
+        self.ask_volume = 0.0
+
+    def reset(self, book):
+        """Re-sum both windows (after a snapshot or a move of the touch)."""
+        if book.best_bid >= 0:
+            lo = max(book.best_bid - self.depth + 1, 0)
+            self.bid_volume = float(book.bids[lo:book.best_bid + 1].sum())
+        else:
+            self.bid_volume = 0.0
+        if book.best_ask < book.levels:
+            self.ask_volume = float(book.asks[book.best_ask:book.best_ask + self.depth].sum())
+        else:
+            self.ask_volume = 0.0
+
+    def on_level(self, book, side: int, index: int, change: float):
+        """A level changed by ``change`` without moving the touch."""
+        if side == BID:
+            if book.best_bid - self.depth < index <= book.best_bid:
+                self.bid_volume += change
+        elif book.best_ask <= index < book.best_ask + self.depth:
+            self.ask_volume += change
+
+    @property
+    def imbalance(self) -> float:
+        total = self.bid_volume + self.ask_volume
+        return (self.bid_volume - self.ask_volume) / total if total > 0 else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "bid_volume": self.bid_volume,
+            "ask_volume": self.ask_volume,
+            "imbalance": round(self.imbalance, 4),
+        }
@@ -1 +1,94 @@
+"""
+Liquidity heatmap for Revolution X
+Rolling time x price matrix of resting depth
 
+Every ``interval`` seconds the combined bid+ask volume of ``rows`` price
+ticks around the mid is written as one row of a preallocated matrix. Each
+row is self-describing::
+
+    [time, price of level 0, volume level 0, ..., volume level rows-1]
+
+Rows are written twice, ``columns`` apart (a double-written ring like the
+OHLCV buffers), so the latest rows are always one contiguous block and
+``export()`` can hand them out as a zero-copy ``memoryview``. ``export(since)``
+carries only the rows sampled after ``since`` together with the shape needed
+to read them; ``written`` numbers the rows so a client can tell when it
+missed some (``first`` > its last ``written``) and must start over.
+"""
+
+from typing import Dict, Any
+
+import numpy as np
+
+TIME = 0
+PRICE = 1
+FIRST_LEVEL = 2
+
+
+class LiquidityHeatmap:
+    """
+    Samples an ``OrderBook`` into a fixed-size rolling matrix.
+    """
+
+    def __init__(self, rows: int, columns: int, interval: float):
+        self.rows = rows
+        self.columns = columns
+        self.interval = interval
+        self.count = 0
+        self.written = 0  # Rows sampled since creation
+        self._data = np.zeros((2 * columns, rows + FIRST_LEVEL), dtype=np.float64)
+        self._head = -1
+        self._next_sample = 0.0
+
+    def maybe_sample(self, book, now: float) -> bool:
+        """Sample if the interval has elapsed since the last row."""
+        if now < self._next_sample:
+            return False
+        self.sample(book, now)
+        self._next_sample = now + self.interval
+        return True
+
+    def sample(self, book, now: float):
+        """Write the depth around the mid as the newest row (no allocation)."""
+        if book.base is None or book.best_bid < 0 or book.best_ask >= book.levels:
+            return
+        mid = (book.best_bid + book.best_ask) // 2
+        lo = min(max(mid - self.rows // 2, 0), max(book.levels - self.rows, 0))
+        hi = lo + min(self.rows, book.levels)
+
+        self._head = (self._head + 1) % self.columns
+        row = self._data[self._head]
+        row[TIME] = now
+        row[PRICE] = (book.base + lo) * book.tick_size
+        np.add(book.bids[lo:hi], book.asks[lo:hi], out=row[FIRST_LEVEL:FIRST_LEVEL + hi - lo])
+        self._data[self._head + self.columns] = row
+        self.count = min(self.count + 1, self.columns)
+        self.written += 1
+
+    def matrix(self, since: int = 0) -> np.ndarray:
+        """
+        View of the rows sampled after row ``since`` (all retained rows by
+        default), oldest first; valid until the next sample.
+        """
+        n = min(max(self.written - since, 0), self.count)
+        end = self._head + self.columns + 1
+        return self._data[end - n:end]
+
+    def export(self, since: int = 0) -> Dict[str, Any]:
+        """
+        The rows sampled after row ``since`` as a zero-copy view of their
+        bytes (float64, row-major), with the metadata to reshape them.
+        """
+        rows = self.matrix(since)
+        data = memoryview(rows).cast("B") if len(rows) else memoryview(b"")
+        return {**self.meta(len(rows)), "data": data}
+
+    def meta(self, rows: int) -> Dict[str, Any]:
+        return {
+            "rows": rows,
+            "row_width": self.rows + FIRST_LEVEL,
+            "dtype": "float64",
+            "interval": self.interval,
+            "first": self.written - rows,
+            "written": self.written,
+        }
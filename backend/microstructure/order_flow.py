@@ -1 +1,365 @@
+"""
+Order flow engine for Revolution X
+Array-backed depth of market, cumulative delta and derived metrics
 
+Each symbol's book is two float64 arrays (bids, asks) indexed by price in
+ticks relative to a movable base, so applying a level update is an index
+computation and a store. The touch is tracked incrementally; the arrays are
+only re-centered when a price falls outside the window, and never so far
+that the touch leaves it: a level too deep to fit is dropped, and a level
+that would cross the touch from outside the window means the book can no
+longer be trusted, so it waits for the next snapshot. Book updates come
+from ``book:<SYMBOL>`` stream events::
+
+    {"bids": [[price, volume], ...], "asks": [...], "snapshot": false}
+
+where volume 0 removes a level. After a sequence gap the book ignores
+increments until the next snapshot. Trades (ticks with ``last``/``volume``)
+feed the cumulative delta, classified by the MT5 buy/sell flags or, failing
+those, by price against the touch.
+"""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable, Iterable
+
+import numpy as np
+
+from app.config import settings
+from microstructure.imbalance import ImbalanceTracker, BID, ASK
+from microstructure.liquidity_heatmap import LiquidityHeatmap
+
+# MT5 tick flags
+TICK_FLAG_BUY = 32
+TICK_FLAG_SELL = 64
+
+
+class OrderBook:
+    """
+    Depth of market for one symbol in price-indexed arrays.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        tick_size: float,
+        levels: Optional[int] = None,
+        imbalance: Optional[ImbalanceTracker] = None,
+    ):
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.levels = levels or settings.MICRO_BOOK_LEVELS
+        self.bids = np.zeros(self.levels, dtype=np.float64)
+        self.asks = np.zeros(self.levels, dtype=np.float64)
+        self.base: Optional[int] = None  # Price of index 0, in ticks
+        self.best_bid = -1  # Index; -1 when there are no bids
+        self.best_ask = self.levels  # Index; levels when there are no asks
+        self.imbalance = imbalance
+        self.synced = False  # False until the first snapshot / after a gap
+
+        # Metrics
+        self.updates: int = 0
+        self.recenters: int = 0
+        self.dropped: int = 0  # Levels too far from the touch to keep
+        self.desyncs: int = 0  # Crossing levels outside the window
+
+    # ----- prices -----
+
+    def price(self, index: int) -> float:
+        return (self.base + index) * self.tick_size
+
+    @property
+    def bid_price(self) -> Optional[float]:
+        return self.price(self.best_bid) if self.best_bid >= 0 else None
+
+    @property
+    def ask_price(self) -> Optional[float]:
+        return self.price(self.best_ask) if self.best_ask < self.levels else None
+
+    def _index(self, price: float, side: int, grow: bool = True) -> int:
+        """Array index of a price, re-centering if needed (-1 if it does not fit)."""
+        ticks = int(round(price / self.tick_size))
+        if self.base is None:
+            self.base = ticks - self.levels // 2
+        index = ticks - self.base
+        if 0 <= index < self.levels:
+            return index
+        if not grow or not self._recenter(ticks, side):
+            return -1
+        return ticks - self.base
+
+    def _recenter(self, ticks: int, side: int) -> bool:
+        """
+        Move the window so ``ticks`` fits while keeping the touch in it,
+        centered on the touch as far as possible. False if it cannot fit.
+        """
+        has_bid, has_ask = self.best_bid >= 0, self.best_ask < self.levels
+        if has_bid or has_ask:
+            lo = self.base + (self.best_bid if has_bid else self.best_ask)
+            hi = self.base + (self.best_ask if has_ask else self.best_bid)
+            if max(hi, ticks) - min(lo, ticks) >= self.levels:
+                if (side == BID and ticks < lo) or (side == ASK and ticks > hi):
+                    self.dropped += 1  # Deep level: outside the tracked window
+                else:
+                    # Crosses the touch from outside the window: the book is stale
+                    self.synced = False
+                    self.desyncs += 1
+                return False
+            base = (lo + hi) // 2 - self.levels // 2
+            base = min(max(base, max(hi, ticks) - self.levels + 1), min(lo, ticks))
+        else:
+            base = ticks - self.levels // 2
+        shift = base - self.base
+        for arr in (self.bids, self.asks):
+            if abs(shift) >= self.levels:
+                arr[:] = 0.0
+            elif shift > 0:
+                arr[:-shift] = arr[shift:]
+                arr[-shift:] = 0.0
+            elif shift < 0:
+                arr[-shift:] = arr[:shift]
+                arr[:-shift] = 0.0
+        self.base = base
+        self.recenters += 1
+        self._find_touch()
+        if self.imbalance is not None:
+            self.imbalance.reset(self)
+        return True
+
+    def _find_touch(self):
+        nz = np.flatnonzero(self.bids)
+        self.best_bid = int(nz[-1]) if len(nz) else -1
+        nz = np.flatnonzero(self.asks)
+        self.best_ask = int(nz[0]) if len(nz) else self.levels
+
+    # ----- updates -----
+
+    def _set_bid(self, price: float, volume: float):
+        i = self._index(price, BID, grow=volume > 0)
+        if i < 0:
+            return  # Outside the window
+        change = volume - self.bids[i]
+        self.bids[i] = volume
+        if volume > 0 and i > self.best_bid:
+            self.best_bid = i
+        elif volume <= 0 and i == self.best_bid:
+            nz = np.flatnonzero(self.bids[:i])
+            self.best_bid = int(nz[-1]) if len(nz) else -1
+        elif self.imbalance is not None:
+            self.imbalance.on_level(self, BID, i, change)
+            return
+        if self.imbalance is not None:
+            self.imbalance.reset(self)
+
+    def _set_ask(self, price: float, volume: float):
+        i = self._index(price, ASK, grow=volume > 0)
+        if i < 0:
+            return  # Outside the window
+        change = volume - self.asks[i]
+        self.asks[i] = volume
+        if volume > 0 and i < self.best_ask:
+            self.best_ask = i
+        elif volume <= 0 and i == self.best_ask:
+            nz = np.flatnonzero(self.asks[i + 1:])
+            self.best_ask = i + 1 + int(nz[0]) if len(nz) else self.levels
+        elif self.imbalance is not None:
+            self.imbalance.on_level(self, ASK, i, change)
+            return
+        if self.imbalance is not None:
+            self.imbalance.reset(self)
+
+    def clear(self):
+        self.bids[:] = 0.0
+        self.asks[:] = 0.0
+        self.best_bid, self.best_ask = -1, self.levels
+
+    def apply(
+        self,
+        bids: Iterable = (),
+        asks: Iterable = (),
+        snapshot: bool = False,
+    ):
+        """Apply ``[price, volume]`` level updates (or a full snapshot)."""
+        if snapshot:
+            self.clear()
+            self.synced = True
+        elif not self.synced:
+            return
+        for price, volume in bids:
+            self._set_bid(price, volume)
+        for price, volume in asks:
+            self._set_ask(price, volume)
+        if snapshot and self.imbalance is not None:
+            self.imbalance.reset(self)
+        self.updates += 1
+
+    def depth(self, n: int) -> Dict[str, np.ndarray]:
+        """Views of the ``n`` ticks on each side of the touch (touch first)."""
+        bid_lo = max(self.best_bid - n + 1, 0)
+        return {
+            "bids": self.bids[bid_lo:self.best_bid + 1][::-1],
+            "asks": self.asks[self.best_ask:self.best_ask + n],
+        }
+
+
+class CumulativeDelta:
+    """
+    Aggressor-signed traded volume: running total and per-bar value.
+    """
+
+    __slots__ = ("bar_seconds", "delta", "bar_delta", "buy_volume", "sell_volume",
+                 "_bar_start", "_last_price", "_last_side")
+
+    def __init__(self, bar_seconds: int = 60):
+        self.bar_seconds = bar_seconds
+        self.delta = 0.0
+        self.bar_delta = 0.0
+        self.buy_volume = 0.0
+        self.sell_volume = 0.0
+        self._bar_start = 0.0
+        self._last_price: Optional[float] = None
+        self._last_side = 0
+
+    def classify(self, price: float, flags: int, book: Optional[OrderBook]) -> int:
+        """+1 for a buyer-initiated trade, -1 for a seller-initiated one."""
+        if flags & TICK_FLAG_BUY and not flags & TICK_FLAG_SELL:
+            return 1
+        if flags & TICK_FLAG_SELL and not flags & TICK_FLAG_BUY:
+            return -1
+        if book is not None:
+            ask, bid = book.ask_price, book.bid_price
+            if ask is not None and price >= ask:
+                return 1
+            if bid is not None and price <= bid:
+                return -1
+        # Tick rule: same side as the last price change
+        if self._last_price is not None and price != self._last_price:
+            return 1 if price > self._last_price else -1
+        return self._last_side or 1
+
+    def on_trade(self, price: float, volume: float, side: int, timestamp: float):
+        bar_start = timestamp - timestamp % self.bar_seconds
+        if bar_start != self._bar_start:
+            self._bar_start = bar_start
+            self.bar_delta = 0.0
+        signed = volume * side
+        self.delta += signed
+        self.bar_delta += signed
+        if side > 0:
+            self.buy_volume += volume
+        else:
+            self.sell_volume += volume
+        self._last_price = price
+        self._last_side = side
+
+
+class SymbolFlow:
+    """Book, delta, imbalance and heatmap of one symbol."""
+
+    def __init__(self, symbol: str, tick_size: float):
+        self.imbalance = ImbalanceTracker(settings.MICRO_IMBALANCE_DEPTH)
+        self.book = OrderBook(symbol, tick_size, imbalance=self.imbalance)
+        self.delta = CumulativeDelta()
+        self.heatmap = LiquidityHeatmap(
+            settings.MICRO_HEATMAP_ROWS,
+            settings.MICRO_HEATMAP_COLUMNS,
+            settings.MICRO_HEATMAP_INTERVAL,
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        book = self.book
+        return {
+            "bid": book.bid_price,
+            "ask": book.ask_price,
+            "synced": book.synced,
+            "imbalance": round(self.imbalance.imbalance, 4),
+            "bid_depth": self.imbalance.bid_volume,
+            "ask_depth": self.imbalance.ask_volume,
+            "delta": self.delta.delta,
+            "bar_delta": self.delta.bar_delta,
+            "buy_volume": self.delta.buy_volume,
+            "sell_volume": self.delta.sell_volume,
+        }
+
+
+Publisher = Callable[[str, Any], Awaitable[None]]
+
+
+class MicrostructureEngine:
+    """
+    Maintains a ``SymbolFlow`` per symbol from MT5 book and tick events.
+    """
+
+    def __init__(self, tick_sizes: Optional[Dict[str, float]] = None):
+        self.tick_sizes = tick_sizes or settings.MICRO_TICK_SIZES
+        self.flows: Dict[str, SymbolFlow] = {}
+        self.gaps = 0
+
+    def flow(self, symbol: str) -> SymbolFlow:
+        flow = self.flows.get(symbol)
+        if flow is None:
+            flow = self.flows[symbol] = SymbolFlow(symbol, self.tick_sizes.get(symbol, 0.01))
+        return flow
+
+    def on_book(self, symbol: str, data: Dict[str, Any], gap: int = 0):
+        flow = self.flow(symbol)
+        if gap and not data.get("snapshot"):
+            # Missed increments: the book is wrong until the next snapshot
+            flow.book.synced = False
+            self.gaps += 1
+            return
+        flow.book.apply(data.get("bids", ()), data.get("asks", ()), bool(data.get("snapshot")))
+        if flow.book.synced:
+            flow.heatmap.maybe_sample(flow.book, float(data.get("time") or time.time()))
+
+    def on_tick(self, symbol: str, data: Dict[str, Any]):
+        price, volume = data.get("last"), data.get("volume")
+        if not price or not volume:
+            return  # Quote-only tick
+        flow = self.flow(symbol)
+        side = flow.delta.classify(price, int(data.get("flags", 0)), flow.book)
+        flow.delta.on_trade(price, float(volume), side, float(data.get("time") or time.time()))
+
+    def on_event(self, event):
+        if event.kind == "book":
+            self.on_book(event.symbol, event.data, event.gap)
+        elif event.kind == "tick":
+            self.on_tick(event.symbol, event.data)
+
+    async def consume(self, subscription):
+        """Apply every book and tick event of an MT5 subscription."""
+        async for event in subscription:
+            self.on_event(event)
+
+    async def publish_forever(self, publish: Publisher, interval: Optional[float] = None):
+        """
+        Publish ``orderflow:<SYMBOL>`` summaries and the ``heatmap:<SYMBOL>``
+        rows sampled since the last publish every ``interval`` seconds.
+        """
+        interval = interval or settings.MICRO_PUBLISH_INTERVAL
+        sent: Dict[str, int] = {}  # Heatmap rows published per symbol
+        while True:
+            await asyncio.sleep(interval)
+            for symbol, flow in list(self.flows.items()):
+                try:
+                    await publish(f"orderflow:{symbol}", flow.summary())
+                    written = flow.heatmap.written
+                    if written > sent.get(symbol, 0):
+                        await publish(f"heatmap:{symbol}", flow.heatmap.export(sent.get(symbol, 0)))
+                        sent[symbol] = written
+                except Exception as e:
+                    print(f"⚠️ Order flow publish failed for {symbol}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self.flows),
+            "gaps": self.gaps,
+            "updates": sum(f.book.updates for f in self.flows.values()),
+            "recenters": sum(f.book.recenters for f in self.flows.values()),
+            "dropped": sum(f.book.dropped for f in self.flows.values()),
+            "desyncs": sum(f.book.desyncs for f in self.flows.values()),
+        }
+
+
+# Shared engine
+microstructure_engine = MicrostructureEngine()
@@ -1 +1,344 @@
+"""
+Job scheduler for Revolution X
+Asyncio scheduler with interval, cron and bar-close triggers
 
+Each job has its own loop: it sleeps until the trigger's next fire time
+(plus optional random jitter), then starts the job in the background, so a
+slow run never delays the schedule. A run that would overlap the previous
+one is skipped and counted. ``run_now()`` fires a job immediately; if it is
+running, one follow-up run is queued instead.
+
+Coroutine functions run on the event loop, plain functions in a thread, and
+``cpu_bound`` jobs in a process pool (they must be picklable). Every job
+keeps a histogram of its run durations.
+
+Bar-close triggers fire ``offset`` seconds after each bar of a timeframe
+closes (bars aligned to the epoch in UTC, as MT5 server bars are).
+"""
+
+import asyncio
+import bisect
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Callable, Sequence, Set
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+from core.timeframes import TIMEFRAME_SECONDS
+
+
+class IntervalTrigger:
+    """Every ``seconds``, aligned to the epoch plus ``offset``."""
+
+    def __init__(self, seconds: float, offset: float = 0.0):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+        self.offset = offset
+
+    def next_fire(self, after: float) -> float:
+        return (math.floor((after - self.offset) / self.seconds) + 1) * self.seconds + self.offset
+
+    def __repr__(self) -> str:
+        return f"every {self.seconds}s"
+
+
+class BarCloseTrigger(IntervalTrigger):
+    """``offset`` seconds after each ``timeframe`` bar closes."""
+
+    def __init__(self, timeframe: str, offset: float = 0.2):
+        if timeframe not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unknown timeframe {timeframe}")
+        super().__init__(TIMEFRAME_SECONDS[timeframe], offset)
+        self.timeframe = timeframe
+
+    def __repr__(self) -> str:
+        return f"{self.timeframe} close +{self.offset}s"
+
+
+def _parse_field(spec: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_spec = part.split("/", 1)
+            step = int(step_spec)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Invalid cron field '{spec}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronTrigger:
+    """
+    Five-field cron expression (minute hour day month weekday) evaluated
+    in ``tz``. Weekday 0 or 7 is Sunday; as in cron, a restricted day and
+    weekday match if either does.
+    """
+
+    def __init__(self, expression: str, tz: str = "UTC"):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        self.tz = ZoneInfo(tz)
+        self.minutes = sorted(_parse_field(fields[0], 0, 59))
+        self.hours = sorted(_parse_field(fields[1], 0, 23))
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays  # Cron counts from Sunday
+        if self._any_day or self._any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_fire(self, after: float) -> float:
+        start = datetime.fromtimestamp(after, self.tz).replace(second=0, microsecond=0, tzinfo=None)
+        start += timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        local = day.replace(hour=hour, minute=minute)
+                        if local >= start:
+                            return local.replace(tzinfo=self.tz).timestamp()
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never fires: '{self.expression}'")
+
+    def __repr__(self) -> str:
+        return f"cron '{self.expression}'"
+
+
+class DurationHistogram:
+    """
+    Run durations in log-spaced buckets (about 9% wide, 0.1 ms to ~1 h),
+    so percentiles cost a scan of ~200 counters rather than a sort.
+    """
+
+    BOUNDS: List[float] = [0.1 * 2 ** (i / 8) for i in range(200)]  # Milliseconds
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q``-th percentile (ms)."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q / 100 * self.count)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.BOUNDS[i], self.max) if i < len(self.BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p90_ms": round(self.percentile(90), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max, 3),
+        }
+
+
+class Job:
+    """A scheduled callable and its run statistics."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        trigger: Any,
+        args: Sequence[Any] = (),
+        jitter: float = 0.0,
+        cpu_bound: bool = False,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.args = tuple(args)
+        self.jitter = jitter
+        self.cpu_bound = cpu_bound
+        self.timeout = timeout
+        self.durations = DurationHistogram()
+        self.running: Optional[asyncio.Task] = None
+        self.rerun = False  # run_now() arrived while running
+        self.wakeup = asyncio.Event()
+        self.next_run: Optional[float] = None
+        self.last_run: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.loop_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.runs: int = 0
+        self.skipped: int = 0
+        self.failed: int = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trigger": repr(self.trigger),
+            "running": self.running is not None,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "last_run": self.last_run,
+            "next_run": self.next_run,
+            "last_error": self.last_error,
+            "duration": self.durations.summary(),
+        }
+
+
+class Scheduler:
+    """
+    Runs registered jobs on their triggers until stopped.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.SCHEDULER_WORKERS
+        self.jobs: Dict[str, Job] = {}
+        self.running = False
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        trigger: Any,
+        args: Sequence[Any] = (),
+        jitter: float = 0.0,
+        cpu_bound: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Job:
+        """Register a job (replacing one of the same name); starts at once if running."""
+        self.remove(name)
+        job = self.jobs[name] = Job(name, func, trigger, args, jitter, cpu_bound, timeout)
+        if self.running:
+            job.loop_task = asyncio.create_task(self._job_loop(job))
+        return job
+
+    def remove(self, name: str):
+        job = self.jobs.pop(name, None)
+        if job is not None and job.loop_task is not None:
+            job.loop_task.cancel()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        for job in self.jobs.values():
+            job.loop_task = asyncio.create_task(self._job_loop(job))
+        print(f"✅ Scheduler started ({len(self.jobs)} jobs)")
+
+    async def stop(self):
+        self.running = False
+        tasks = []
+        for job in self.jobs.values():
+            for task in (job.loop_task, job.running):
+                if task is not None:
+                    task.cancel()
+                    tasks.append(task)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def run_now(self, name: str):
+        """Fire a job immediately, or once more right after its current run."""
+        job = self.jobs.get(name)
+        if job is None:
+            return
+        if job.running is not None:
+            job.rerun = True
+        else:
+            job.wakeup.set()
+
+    async def _job_loop(self, job: Job):
+        scheduled = time.time()
+        while True:
+            scheduled = job.trigger.next_fire(max(scheduled, time.time()))
+            job.next_run = scheduled
+            delay = scheduled - time.time() + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+            job.wakeup.clear()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(job.wakeup.wait(), delay)
+                    scheduled = time.time()  # Fired early by run_now()
+                except asyncio.TimeoutError:
+                    pass
+            if job.running is not None:
+                job.skipped += 1
+                continue
+            job.running = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: Job):
+        while True:
+            job.rerun = False
+            started = time.perf_counter()
+            job.last_run = time.time()
+            try:
+                await asyncio.wait_for(self._call(job), job.timeout)
+                job.last_error = None
+            except asyncio.CancelledError:
+                job.running = None
+                raise
+            except Exception as e:
+                job.failed += 1
+                job.last_error = str(e) or type(e).__name__
+                print(f"⚠️ Job {job.name} failed: {job.last_error}")
+            job.runs += 1
+            job.durations.record((time.perf_counter() - started) * 1000)
+            if not job.rerun or not self.running:
+                break
+        job.running = None
+
+    async def _call(self, job: Job):
+        if asyncio.iscoroutinefunction(job.func):
+            return await job.func(*job.args)
+        loop = asyncio.get_running_loop()
+        if job.cpu_bound:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            return await loop.run_in_executor(self._pool, job.func, *job.args)
+        return await loop.run_in_executor(None, job.func, *job.args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+
+# Shared scheduler
+scheduler = Scheduler()
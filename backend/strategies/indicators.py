@@ -0,0 +1,346 @@
+"""
+Streaming indicators for Revolution X
+Incremental O(1) updates with matching batch mode
+
+Every indicator keeps only the state it needs to absorb one new bar, so the
+per-bar cost stays flat however long the history grows. ``batch()`` runs
+the same indicator over whole NumPy arrays and returns exactly the values
+the incremental path would have produced bar by bar, so backtests and live
+trading share one implementation.
+
+Values are ``nan`` until an indicator has seen enough bars.
+"""
+
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NAN = float("nan")
+
+
+class Indicator(ABC):
+    """
+    Base class for streaming indicators.
+
+    Subclasses implement ``update()`` for one bar. The default ``batch()``
+    replays ``update()`` over the input columns; subclasses override it with
+    a vectorized version where that gives bit-identical results.
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self.value: float = NAN
+
+    def fresh(self) -> "Indicator":
+        """New instance with the same parameters and empty state."""
+        return type(self)(**self.params)
+
+    def reset(self):
+        self.__init__(**self.params)
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    @abstractmethod
+    def update(self, *values: float) -> float:
+        """Absorb one bar and return the new value."""
+
+    def batch(self, *columns: np.ndarray) -> np.ndarray:
+        """Indicator values for every bar of the given columns."""
+        indicator = self.fresh()
+        lists = [np.asarray(col, dtype=np.float64).tolist() for col in columns]
+        return np.array(
+            [indicator.update(*row) for row in zip(*lists)], dtype=np.float64
+        )
+
+
+class EMA(Indicator):
+    """Exponential moving average seeded with the SMA of the first bars."""
+
+    def __init__(self, period: int):
+        super().__init__(period=period)
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._count = 0
+        self._seed_sum = 0.0
+
+    def update(self, value: float) -> float:
+        if self._count < self.period:
+            self._count += 1
+            self._seed_sum += value
+            if self._count == self.period:
+                self.value = self._seed_sum / self.period
+            return self.value
+        self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class RSI(Indicator):
+    """Relative Strength Index with Wilder smoothing."""
+
+    def __init__(self, period: int = 14):
+        super().__init__(period=period)
+        self.period = period
+        self._prev: Optional[float] = None
+        self._count = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def update(self, close: float) -> float:
+        prev, self._prev = self._prev, close
+        if prev is None:
+            return self.value
+
+        change = close - prev
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        p = self.period
+
+        if self._count < p:
+            self._count += 1
+            self._avg_gain += gain
+            self._avg_loss += loss
+            if self._count < p:
+                return self.value
+            self._avg_gain /= p
+            self._avg_loss /= p
+        else:
+            self._avg_gain = (self._avg_gain * (p - 1) + gain) / p
+            self._avg_loss = (self._avg_loss * (p - 1) + loss) / p
+
+        if self._avg_loss == 0.0:
+            self.value = 100.0 if self._avg_gain > 0 else 50.0
+        else:
+            rs = self._avg_gain / self._avg_loss
+            self.value = 100.0 - 100.0 / (1.0 + rs)
+        return self.value
+
+
+class ATR(Indicator):
+    """Average True Range with Wilder smoothing."""
+
+    def __init__(self, period: int = 14):
+        super().__init__(period=period)
+        self.period = period
+        self._prev_close: Optional[float] = None
+        self._count = 0
+        self._seed_sum = 0.0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        prev_close, self._prev_close = self._prev_close, close
+        if prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+        p = self.period
+        if self._count < p:
+            self._count += 1
+            self._seed_sum += tr
+            if self._count == p:
+                self.value = self._seed_sum / p
+            return self.value
+        self.value = (self.value * (p - 1) + tr) / p
+        return self.value
+
+
+class _RollingExtreme(Indicator):
+    """Rolling max/min over a fixed window using a monotonic deque."""
+
+    _is_max = True
+
+    def __init__(self, window: int):
+        super().__init__(window=window)
+        self.window = window
+        self._index = -1
+        self._deque: deque = deque()  # (index, value), monotonic
+
+    def update(self, value: float) -> float:
+        self._index += 1
+        dq = self._deque
+        if self._is_max:
+            while dq and dq[-1][1] <= value:
+                dq.pop()
+        else:
+            while dq and dq[-1][1] >= value:
+                dq.pop()
+        dq.append((self._index, value))
+        if dq[0][0] <= self._index - self.window:
+            dq.popleft()
+        if self._index + 1 >= self.window:
+            self.value = dq[0][1]
+        return self.value
+
+    def batch(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        out = np.full(values.shape[0], np.nan)
+        if values.shape[0] >= self.window:
+            windows = sliding_window_view(values, self.window)
+            out[self.window - 1:] = windows.max(axis=1) if self._is_max else windows.min(axis=1)
+        return out
+
+
+class RollingMax(_RollingExtreme):
+    """Highest value of the last ``window`` bars."""
+    _is_max = True
+
+
+class RollingMin(_RollingExtreme):
+    """Lowest value of the last ``window`` bars."""
+    _is_max = False
+
+
+class VWAP(Indicator):
+    """
+    Volume-weighted average price of the typical price (H+L+C)/3.
+    With ``session_seconds`` set, the average restarts at every session
+    boundary (86400 for a daily UTC anchor).
+    """
+
+    def __init__(self, session_seconds: Optional[int] = None):
+        super().__init__(session_seconds=session_seconds)
+        self.session_seconds = session_seconds
+        self._session: Optional[int] = None
+        self._cum_pv = 0.0
+        self._cum_v = 0.0
+
+    def update(
+        self,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+        time: float = 0.0,
+    ) -> float:
+        if self.session_seconds:
+            session = int(time // self.session_seconds)
+            if session != self._session:
+                self._session = session
+                self._cum_pv = 0.0
+                self._cum_v = 0.0
+
+        self._cum_pv += (high + low + close) / 3.0 * volume
+        self._cum_v += volume
+        if self._cum_v > 0:
+            self.value = self._cum_pv / self._cum_v
+        return self.value
+
+    def batch(
+        self,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        time: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        high, low, close, volume = (
+            np.asarray(a, dtype=np.float64) for a in (high, low, close, volume)
+        )
+        pv = (high + low + close) / 3.0 * volume
+        n = pv.shape[0]
+
+        if self.session_seconds and time is not None:
+            sessions = np.floor_divide(np.asarray(time, dtype=np.float64), self.session_seconds)
+            starts = np.flatnonzero(np.diff(sessions, prepend=np.nan) != 0)
+        else:
+            starts = np.array([0])
+        bounds = np.append(starts, n)
+
+        cum_pv = np.empty(n)
+        cum_v = np.empty(n)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            # np.cumsum accumulates sequentially, matching update()
+            np.cumsum(pv[start:end], out=cum_pv[start:end])
+            np.cumsum(volume[start:end], out=cum_v[start:end])
+
+        out = np.full(n, np.nan)
+        valid = cum_v > 0
+        out[valid] = cum_pv[valid] / cum_v[valid]
+        # Like update(), hold the last value through zero-volume stretches
+        if not valid.all():
+            idx = np.where(valid, np.arange(n), -1)
+            np.maximum.accumulate(idx, out=idx)
+            held = idx >= 0
+            out[held] = out[idx[held]]
+        return out
+
+
+class SwingPivots(Indicator):
+    """
+    Fractal swing highs/lows.
+
+    Bar ``i`` is a swing high when its high is strictly above the ``left``
+    bars before it and not below the ``right`` bars after it (mirror image
+    for swing lows). A pivot is confirmed ``right`` bars after it formed.
+    """
+
+    def __init__(self, left: int = 2, right: int = 2):
+        super().__init__(left=left, right=right)
+        self.left = left
+        self.right = right
+        self._index = -1
+        self._highs: deque = deque(maxlen=left + right + 1)
+        self._lows: deque = deque(maxlen=left + right + 1)
+        self.last_high: Optional[Tuple[int, float]] = None
+        self.last_low: Optional[Tuple[int, float]] = None
+
+    def update(
+        self, high: float, low: float
+    ) -> Tuple[Optional[Tuple[int, float]], Optional[Tuple[int, float]]]:
+        """
+        Absorb one bar. Returns ``(swing_high, swing_low)`` confirmed on this
+        bar, each as ``(bar_index, price)`` or ``None``.
+        """
+        self._index += 1
+        self._highs.append(high)
+        self._lows.append(low)
+        if len(self._highs) < self._highs.maxlen:
+            return None, None
+
+        pivot_index = self._index - self.right
+        swing_high = swing_low = None
+        highs, lows, k = self._highs, self._lows, self.left
+
+        h = highs[k]
+        if all(h > highs[j] for j in range(k)) and all(
+            h >= highs[j] for j in range(k + 1, len(highs))
+        ):
+            swing_high = self.last_high = (pivot_index, h)
+
+        lo = lows[k]
+        if all(lo < lows[j] for j in range(k)) and all(
+            lo <= lows[j] for j in range(k + 1, len(lows))
+        ):
+            swing_low = self.last_low = (pivot_index, lo)
+
+        return swing_high, swing_low
+
+    def batch(
+        self, high: np.ndarray, low: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Boolean masks marking swing-high and swing-low bars (at the pivot
+        bar itself, not the confirmation bar).
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        n, k, size = high.shape[0], self.left, self.left + self.right + 1
+        is_high = np.zeros(n, dtype=bool)
+        is_low = np.zeros(n, dtype=bool)
+        if n < size:
+            return is_high, is_low
+
+        hw = sliding_window_view(high, size)
+        lw = sliding_window_view(low, size)
+        hc = hw[:, k:k + 1]
+        lc = lw[:, k:k + 1]
+        high_ok = (hc > hw[:, :k]).all(axis=1) & (hc >= hw[:, k + 1:]).all(axis=1)
+        low_ok = (lc < lw[:, :k]).all(axis=1) & (lc <= lw[:, k + 1:]).all(axis=1)
+        is_high[k:n - self.right] = high_ok
+        is_low[k:n - self.right] = low_ok
+        return is_high, is_low
@@ -1 +1,217 @@
+"""
+Kill zones and trading sessions for Revolution X
+DST-aware session calendar precomputed into sorted UTC arrays
 
+Sessions and ICT kill zones are defined in the local time of their market
+(London, New York, Tokyo, ...). Once per year of use, every window's daily
+occurrences are converted to UTC with ``zoneinfo`` and merged into one
+sorted array of boundaries, each segment carrying the bitmask of windows
+active in it. A lookup is then a single ``bisect`` (or no search at all
+when bar times arrive in order), and labeling a whole bar array is one
+``np.searchsorted``. No timezone conversion happens on the hot path.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+WEEKDAYS = (0, 1, 2, 3, 4)  # Monday .. Friday
+
+
+@dataclass(frozen=True)
+class SessionWindow:
+    """A daily window in its market's local time."""
+    name: str
+    tz: str
+    start: time
+    end: time  # Earlier than ``start`` for windows that cross midnight
+    kind: str = "session"  # session | kill_zone
+    weekdays: Tuple[int, ...] = WEEKDAYS  # Local weekdays the window starts on
+
+
+DEFAULT_WINDOWS: Tuple[SessionWindow, ...] = (
+    # Sessions
+    SessionWindow("sydney", "Australia/Sydney", time(7), time(16)),
+    SessionWindow("tokyo", "Asia/Tokyo", time(9), time(18)),
+    SessionWindow("london", "Europe/London", time(8), time(17)),
+    SessionWindow("new_york", "America/New_York", time(8), time(17)),
+    # ICT kill zones (New York time); the Asian range forms Sunday-Thursday evenings
+    SessionWindow("asia_range", "America/New_York", time(20), time(0), "kill_zone", (6, 0, 1, 2, 3)),
+    SessionWindow("london_open", "America/New_York", time(2), time(5), "kill_zone"),
+    SessionWindow("new_york_open", "America/New_York", time(7), time(10), "kill_zone"),
+    SessionWindow("london_close", "America/New_York", time(10), time(12), "kill_zone"),
+)
+
+
+def _occurrences(window: SessionWindow, first: date, last: date) -> Iterable[Tuple[float, float]]:
+    """UTC (start, end) epochs of every occurrence starting in [first, last]."""
+    zone = ZoneInfo(window.tz)
+    day = first
+    while day <= last:
+        if day.weekday() in window.weekdays:
+            start = datetime.combine(day, window.start, zone)
+            end_day = day + timedelta(days=1) if window.end <= window.start else day
+            end = datetime.combine(end_day, window.end, zone)
+            yield start.timestamp(), end.timestamp()
+        day += timedelta(days=1)
+
+
+def build_segments(
+    windows: Iterable[SessionWindow], first: date, last: date
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Boundaries (sorted UTC epochs) and the bitmask active from each boundary
+    to the next, for windows starting between ``first`` and ``last``.
+    """
+    events: List[Tuple[float, int, int]] = []  # (time, is_start, bit)
+    for bit, window in enumerate(windows):
+        for start, end in _occurrences(window, first, last):
+            events.append((start, 1, 1 << bit))
+            events.append((end, 0, 1 << bit))
+    # Ends sort before starts at the same instant, so back-to-back windows
+    # stay continuous
+    events.sort()
+
+    bounds: List[float] = [float("-inf")]
+    masks: List[int] = [0]
+    mask = 0
+    for t, is_start, bit in events:
+        mask = mask | bit if is_start else mask & ~bit
+        if t == bounds[-1]:
+            masks[-1] = mask
+        elif mask != masks[-1]:
+            bounds.append(t)
+            masks.append(mask)
+    return np.array(bounds, dtype=np.float64), np.array(masks, dtype=np.uint32)
+
+
+class SessionCalendar:
+    """
+    Session/kill-zone membership of UTC timestamps via precomputed segments.
+
+    Years are built on first use; the calendar always covers a contiguous
+    range of years.
+    """
+
+    def __init__(self, windows: Iterable[SessionWindow] = DEFAULT_WINDOWS):
+        self.windows = tuple(windows)
+        if len(self.windows) > 32:
+            raise ValueError("At most 32 windows per calendar")
+        self.bits: Dict[str, int] = {w.name: 1 << i for i, w in enumerate(self.windows)}
+        self._years: Optional[Tuple[int, int]] = None
+        self._bounds = np.empty(0)
+        self._masks = np.empty(0, dtype=np.uint32)
+        self._bounds_list: List[float] = []
+        self._masks_list: List[int] = []
+        # Segment of the previous lookup: in-order bar times skip the search
+        self._cached = (float("inf"), float("-inf"), 0)  # lo, hi, mask
+        self.builds = 0
+
+    # ----- precomputation -----
+
+    def _ensure(self, first_year: int, last_year: int):
+        if self._years and self._years[0] <= first_year and last_year <= self._years[1]:
+            return
+        if self._years:
+            first_year = min(first_year, self._years[0])
+            last_year = max(last_year, self._years[1])
+        # A local day either side of the UTC years: a window opening late on
+        # 31 December in New York, or on 1 January in Sydney (still 31
+        # December in UTC), overlaps the covered range
+        bounds, masks = build_segments(
+            self.windows, date(first_year - 1, 12, 31), date(last_year + 1, 1, 1)
+        )
+        self._bounds, self._masks = bounds, masks
+        self._bounds_list, self._masks_list = bounds.tolist(), masks.tolist()
+        self._years = (first_year, last_year)
+        self._cached = (float("inf"), float("-inf"), 0)
+        self.builds += 1
+
+    def _covers(self, ts: float) -> bool:
+        years = self._years
+        return bool(years) and _year_start(years[0]) <= ts < _year_start(years[1] + 1)
+
+    # ----- lookups -----
+
+    def mask(self, ts: float) -> int:
+        """Bitmask of the windows active at a UTC epoch."""
+        lo, hi, mask = self._cached
+        if lo <= ts < hi:
+            return mask
+        if not self._covers(ts):
+            year = datetime.fromtimestamp(ts, timezone.utc).year
+            self._ensure(year, year)
+        bounds = self._bounds_list
+        i = bisect_right(bounds, ts) - 1
+        hi = bounds[i + 1] if i + 1 < len(bounds) else _year_start(self._years[1] + 1)
+        self._cached = (bounds[i], hi, self._masks_list[i])
+        return self._masks_list[i]
+
+    def active(self, ts: float) -> List[str]:
+        """Names of the windows active at a UTC epoch."""
+        return self.names(self.mask(ts))
+
+    def is_active(self, ts: float, name: str) -> bool:
+        return bool(self.mask(ts) & self.bits[name])
+
+    def in_kill_zone(self, ts: float) -> bool:
+        return bool(self.mask(ts) & self.kill_zone_mask)
+
+    @property
+    def kill_zone_mask(self) -> int:
+        return sum(self.bits[w.name] for w in self.windows if w.kind == "kill_zone")
+
+    def names(self, mask: int) -> List[str]:
+        return [w.name for w in self.windows if mask & self.bits[w.name]]
+
+    def label(self, times: np.ndarray) -> np.ndarray:
+        """Bitmask of active windows for every UTC epoch of an array."""
+        times = np.asarray(times, dtype=np.float64)
+        if not len(times):
+            return np.empty(0, dtype=np.uint32)
+        first = datetime.fromtimestamp(float(times.min()), timezone.utc).year
+        last = datetime.fromtimestamp(float(times.max()), timezone.utc).year
+        self._ensure(first, last)
+        return self._masks[np.searchsorted(self._bounds, times, side="right") - 1]
+
+    def membership(self, times: np.ndarray, name: str) -> np.ndarray:
+        """Boolean mask of the bars inside one window."""
+        return (self.label(times) & self.bits[name]) != 0
+
+    def bounds(self, ts: float, name: str) -> Optional[Tuple[float, float]]:
+        """UTC (start, end) of the occurrence of ``name`` containing ``ts`` or
+        the latest one before it (e.g. the Asian range to trade off)."""
+        self.mask(ts)  # Builds the year if needed
+        bit = self.bits[name]
+        i = bisect_right(self._bounds_list, ts) - 1
+        # Walk back to a segment where the window is active
+        while i >= 0 and not self._masks_list[i] & bit:
+            i -= 1
+        if i < 0:
+            return None
+        end_i = i
+        while i > 0 and self._masks_list[i - 1] & bit:
+            i -= 1
+        start = self._bounds_list[i]
+        end = self._bounds_list[end_i + 1] if end_i + 1 < len(self._bounds_list) else float("inf")
+        return start, end
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "windows": len(self.windows),
+            "years": self._years,
+            "segments": len(self._bounds_list),
+            "builds": self.builds,
+        }
+
+
+def _year_start(year: int) -> float:
+    return datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+# Shared calendar
+session_calendar = SessionCalendar()
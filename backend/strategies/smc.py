@@ -1 +1,459 @@
+"""
+Smart Money Concepts for Revolution X
+Market structure, order blocks, fair value gaps and liquidity sweeps
 
+``SMCDetector.update()`` absorbs one closed bar in amortized O(1):
+
+1. Open zones the bar trades through are mitigated (max/min heaps).
+2. Swing levels the bar's wick exceeds are taken out (monotonic stacks);
+   if it closes back inside, that is a liquidity sweep.
+3. A close beyond the latest unbroken swing is a break of structure: BOS
+   in the direction of the trend, CHoCH against it. The last opposite
+   candle before the break becomes an order block.
+4. A gap between bar ``i - 2`` and bar ``i`` is a fair value gap.
+5. Swing pivots confirmed on this bar become the new structure and
+   liquidity levels.
+
+``SMCDetector.batch()`` finds the same events and zones over whole arrays
+with NumPy (only the handful of structure breaks is walked in order), and
+returns exactly what replaying ``update()`` bar by bar would have produced.
+
+Open zones are kept in a ``ZoneIndex`` bucketed by price, so "is price in
+an unmitigated zone" only looks at the zones overlapping one bucket.
+"""
+
+import heapq
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+import numpy as np
+
+from app.config import settings
+from app.database.ingestion import to_datetime
+from core.market_data import market_data_cache
+from strategies.indicators import SwingPivots
+
+BULLISH = 1
+BEARISH = -1
+
+# Order of events and zones created on the same bar
+_SWEEP_HIGH, _SWEEP_LOW, _BREAK_UP, _BREAK_DOWN = range(4)
+_OB_UP, _OB_DOWN, _FVG_UP, _FVG_DOWN = range(4)
+
+
+@dataclass
+class StructureEvent:
+    """BOS, CHoCH or liquidity sweep on a bar."""
+    kind: str  # bos | choch | sweep
+    direction: int  # BULLISH or BEARISH (a sweep of highs is bearish)
+    level: float  # Swing level broken or swept
+    index: int  # Bar index
+    time: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.__dict__.copy()
+
+
+@dataclass
+class Zone:
+    """Order block or fair value gap; open until price trades through it."""
+    id: int
+    kind: str  # order_block | fvg
+    direction: int  # BULLISH (demand) or BEARISH (supply)
+    top: float
+    bottom: float
+    index: int  # Bar that created the zone
+    time: float
+    mitigated: Optional[int] = None  # Bar that traded through it
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.__dict__.copy()
+
+
+class ZoneIndex:
+    """
+    Open zones bucketed by price for point queries.
+
+    A zone is registered in every ``bucket_size``-wide bucket it overlaps;
+    ``containing(price)`` checks only the zones of the price's bucket.
+    """
+
+    def __init__(self, bucket_size: float):
+        self.bucket_size = bucket_size
+        self._buckets: Dict[int, Dict[int, Zone]] = {}
+        self._zones: Dict[int, Zone] = {}
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def _span(self, zone: Zone) -> range:
+        return range(
+            math.floor(zone.bottom / self.bucket_size),
+            math.floor(zone.top / self.bucket_size) + 1,
+        )
+
+    def add(self, zone: Zone):
+        self._zones[zone.id] = zone
+        for b in self._span(zone):
+            self._buckets.setdefault(b, {})[zone.id] = zone
+
+    def remove(self, zone: Zone):
+        if self._zones.pop(zone.id, None) is None:
+            return
+        for b in self._span(zone):
+            bucket = self._buckets.get(b)
+            if bucket is not None:
+                bucket.pop(zone.id, None)
+                if not bucket:
+                    del self._buckets[b]
+
+    def containing(self, price: float, direction: Optional[int] = None) -> List[Zone]:
+        bucket = self._buckets.get(math.floor(price / self.bucket_size))
+        if not bucket:
+            return []
+        return [
+            z for z in bucket.values()
+            if z.bottom <= price <= z.top and (direction is None or z.direction == direction)
+        ]
+
+    def zones(self) -> List[Zone]:
+        return sorted(self._zones.values(), key=lambda z: z.id)
+
+
+@dataclass
+class SMCResult:
+    events: List[StructureEvent]
+    zones: List[Zone]  # Every zone created, mitigated or not
+
+
+def _first_index(values: np.ndarray, start: int, level: float, above: bool, strict: bool) -> int:
+    """First index >= ``start`` where ``values`` crosses ``level``; -1 if none.
+    Searches in growing blocks since most levels are reached soon."""
+    n = len(values)
+    size = 64
+    while start < n:
+        block = values[start:start + size]
+        if above:
+            hit = block > level if strict else block >= level
+        else:
+            hit = block < level if strict else block <= level
+        found = np.flatnonzero(hit)
+        if len(found):
+            return start + int(found[0])
+        start += size
+        size *= 2
+    return -1
+
+
+class SMCDetector:
+    """
+    Incremental market-structure state for one (symbol, timeframe).
+    """
+
+    def __init__(
+        self,
+        left: int = 2,
+        right: int = 2,
+        bucket_size: float = 1.0,
+        max_events: Optional[int] = None,
+    ):
+        self.left = left
+        self.right = right
+        self.bucket_size = bucket_size
+        self.reset(max_events)
+
+    def reset(self, max_events: Optional[int] = None):
+        self.pivots = SwingPivots(self.left, self.right)
+        self.index = -1
+        self.trend = 0
+        self.zones = ZoneIndex(self.bucket_size)
+        self.events: deque = deque(maxlen=max_events or settings.SMC_MAX_EVENTS)
+        self._swing_high: Optional[float] = None  # Latest unbroken swing levels
+        self._swing_low: Optional[float] = None
+        self._highs: List[float] = []  # Untaken liquidity, decreasing
+        self._lows: List[float] = []  # Untaken liquidity, increasing
+        self._demand: List[Tuple[float, int, Zone]] = []  # Max-heap on bottom
+        self._supply: List[Tuple[float, int, Zone]] = []  # Min-heap on top
+        self._last_bullish: Optional[Tuple[float, float]] = None  # (high, low) of last up candle
+        self._last_bearish: Optional[Tuple[float, float]] = None
+        self._prev: deque = deque(maxlen=2)  # (high, low) of the two previous bars
+        self._next_zone = 0
+
+    # ----- incremental -----
+
+    def _add_zone(self, kind: str, direction: int, top: float, bottom: float, time: float):
+        zone = Zone(self._next_zone, kind, direction, top, bottom, self.index, time)
+        self._next_zone += 1
+        self.zones.add(zone)
+        if direction == BULLISH:
+            heapq.heappush(self._demand, (-bottom, zone.id, zone))
+        else:
+            heapq.heappush(self._supply, (top, zone.id, zone))
+        return zone
+
+    def update(
+        self, time: float, open: float, high: float, low: float, close: float
+    ) -> List[StructureEvent]:
+        """Absorb one closed bar; returns the events it produced."""
+        self.index += 1
+        i = self.index
+        events: List[StructureEvent] = []
+
+        # 1. Mitigation
+        while self._demand and -self._demand[0][0] >= low:
+            zone = heapq.heappop(self._demand)[2]
+            zone.mitigated = i
+            self.zones.remove(zone)
+        while self._supply and self._supply[0][0] <= high:
+            zone = heapq.heappop(self._supply)[2]
+            zone.mitigated = i
+            self.zones.remove(zone)
+
+        # 2. Liquidity taken out by the wicks
+        taken = None
+        while self._highs and self._highs[-1] < high:
+            level = self._highs.pop()
+            taken = level if taken is None else max(taken, level)
+        if taken is not None and close < taken:
+            events.append(StructureEvent("sweep", BEARISH, taken, i, time))
+        taken = None
+        while self._lows and self._lows[-1] > low:
+            level = self._lows.pop()
+            taken = level if taken is None else min(taken, level)
+        if taken is not None and close > taken:
+            events.append(StructureEvent("sweep", BULLISH, taken, i, time))
+
+        # 3. Breaks of structure, order blocks
+        if self._swing_high is not None and close > self._swing_high:
+            events.append(StructureEvent(self._break_kind(BULLISH), BULLISH, self._swing_high, i, time))
+            self._swing_high = None
+            self.trend = BULLISH
+            if self._last_bearish is not None:
+                self._add_zone("order_block", BULLISH, *self._last_bearish, time)
+        if self._swing_low is not None and close < self._swing_low:
+            events.append(StructureEvent(self._break_kind(BEARISH), BEARISH, self._swing_low, i, time))
+            self._swing_low = None
+            self.trend = BEARISH
+            if self._last_bullish is not None:
+                self._add_zone("order_block", BEARISH, *self._last_bullish, time)
+
+        # 4. Fair value gaps
+        if len(self._prev) == 2:
+            high2, low2 = self._prev[0]
+            if low > high2:
+                self._add_zone("fvg", BULLISH, low, high2, time)
+            if high < low2:
+                self._add_zone("fvg", BEARISH, low2, high, time)
+        self._prev.append((high, low))
+
+        # 5. New swings
+        swing_high, swing_low = self.pivots.update(high, low)
+        if swing_high is not None:
+            self._swing_high = swing_high[1]
+            self._highs.append(swing_high[1])
+        if swing_low is not None:
+            self._swing_low = swing_low[1]
+            self._lows.append(swing_low[1])
+
+        if close > open:
+            self._last_bullish = (high, low)
+        elif close < open:
+            self._last_bearish = (high, low)
+
+        self.events.extend(events)
+        return events
+
+    def _break_kind(self, direction: int) -> str:
+        return "choch" if self.trend and self.trend != direction else "bos"
+
+    def in_zone(self, price: float, direction: Optional[int] = None) -> List[Zone]:
+        """Unmitigated zones containing ``price``."""
+        return self.zones.containing(price, direction)
+
+    # ----- batch -----
+
+    def batch(
+        self,
+        time: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+    ) -> SMCResult:
+        """Events and zones of whole arrays, identical to replaying ``update()``."""
+        time, open, high, low, close = (
+            np.asarray(a, dtype=np.float64) for a in (time, open, high, low, close)
+        )
+        n = len(close)
+        is_high, is_low = SwingPivots(self.left, self.right).batch(high, low)
+        pivot_highs, pivot_lows = np.flatnonzero(is_high), np.flatnonzero(is_low)
+
+        found: List[Tuple[int, int, Any]] = []  # (index, order, payload)
+
+        # Liquidity: the first bar after confirmation whose wick exceeds a level
+        for pivots, values, above, order in (
+            (pivot_highs, high, True, _SWEEP_HIGH),
+            (pivot_lows, low, False, _SWEEP_LOW),
+        ):
+            taken: Dict[int, float] = {}
+            for p in pivots.tolist():
+                level = float(values[p])
+                j = _first_index(values, p + self.right + 1, level, above, strict=True)
+                if j >= 0:
+                    taken[j] = max(taken.get(j, level), level) if above else min(taken.get(j, level), level)
+            for j, level in taken.items():
+                if (close[j] < level) if above else (close[j] > level):
+                    found.append((j, order, level))
+
+        # Structure: the first close beyond each swing before the next swing
+        for pivots, values, up, order in (
+            (pivot_highs, high, True, _BREAK_UP),
+            (pivot_lows, low, False, _BREAK_DOWN),
+        ):
+            active = np.full(n, -1, dtype=np.int64)
+            starts = pivots + self.right + 1
+            keep = starts < n
+            active[starts[keep]] = np.flatnonzero(keep)
+            np.maximum.accumulate(active, out=active)
+            has = active >= 0
+            levels = np.where(has, values[pivots[np.maximum(active, 0)]] if len(pivots) else np.nan, np.nan)
+            crossed = has & ((close > levels) if up else (close < levels))
+            idx = np.flatnonzero(crossed)
+            _, first = np.unique(active[idx], return_index=True)
+            for j in idx[first].tolist():
+                found.append((j, order, float(levels[j])))
+
+        # Walk the (sparse) events in bar order for trend and BOS/CHoCH
+        found.sort(key=lambda e: (e[0], e[1]))
+        positions = np.arange(n)
+        last_bear = np.maximum.accumulate(np.where(close < open, positions, -1))
+        last_bull = np.maximum.accumulate(np.where(close > open, positions, -1))
+
+        events: List[StructureEvent] = []
+        new_zones: List[Tuple[int, int, str, int, float, float]] = []
+        trend = 0
+        for j, order, level in found:
+            t = float(time[j])
+            if order == _SWEEP_HIGH:
+                events.append(StructureEvent("sweep", BEARISH, level, j, t))
+            elif order == _SWEEP_LOW:
+                events.append(StructureEvent("sweep", BULLISH, level, j, t))
+            else:
+                direction = BULLISH if order == _BREAK_UP else BEARISH
+                kind = "choch" if trend and trend != direction else "bos"
+                events.append(StructureEvent(kind, direction, level, j, t))
+                trend = direction
+                candle = (last_bear if direction == BULLISH else last_bull)[j - 1] if j > 0 else -1
+                if candle >= 0:
+                    new_zones.append((
+                        j, _OB_UP if direction == BULLISH else _OB_DOWN, "order_block",
+                        direction, float(high[candle]), float(low[candle]),
+                    ))
+
+        # Fair value gaps
+        if n >= 3:
+            for j in (np.flatnonzero(low[2:] > high[:-2]) + 2).tolist():
+                new_zones.append((j, _FVG_UP, "fvg", BULLISH, float(low[j]), float(high[j - 2])))
+            for j in (np.flatnonzero(high[2:] < low[:-2]) + 2).tolist():
+                new_zones.append((j, _FVG_DOWN, "fvg", BEARISH, float(low[j - 2]), float(high[j])))
+
+        new_zones.sort(key=lambda z: (z[0], z[1]))
+        zones: List[Zone] = []
+        for zone_id, (j, _, kind, direction, top, bottom) in enumerate(new_zones):
+            if direction == BULLISH:
+                end = _first_index(low, j + 1, bottom, above=False, strict=False)
+            else:
+                end = _first_index(high, j + 1, top, above=True, strict=False)
+            zones.append(Zone(
+                zone_id, kind, direction, top, bottom, j, float(time[j]),
+                mitigated=end if end >= 0 else None,
+            ))
+        return SMCResult(events, zones)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bars": self.index + 1,
+            "trend": self.trend,
+            "open_zones": len(self.zones),
+            "liquidity": len(self._highs) + len(self._lows),
+        }
+
+
+class SMCEngine:
+    """
+    ``SMCDetector`` per (symbol, timeframe) fed by closed live bars.
+
+    The stream repeats the forming bar as it updates; a bar is passed to the
+    detector once the next bar of the same key opens.
+    """
+
+    def __init__(self, timeframes: Optional[Iterable[str]] = None):
+        self.timeframes = list(timeframes or settings.SMC_TIMEFRAMES)
+        self.detectors: Dict[Tuple[str, str], SMCDetector] = {}
+        self._forming: Dict[Tuple[str, str], Tuple[float, float, float, float, float]] = {}
+
+    def detector(self, symbol: str, timeframe: str) -> SMCDetector:
+        key = (symbol, timeframe)
+        detector = self.detectors.get(key)
+        if detector is None:
+            tick = settings.MICRO_TICK_SIZES.get(symbol, 0.01)
+            detector = self.detectors[key] = SMCDetector(
+                settings.SMC_SWING_LEFT,
+                settings.SMC_SWING_RIGHT,
+                bucket_size=tick * settings.SMC_ZONE_BUCKET_TICKS,
+            )
+        return detector
+
+    async def warm_up(self, symbols: Optional[Iterable[str]] = None):
+        """Replay recent cached bars (all but the forming one) into each detector."""
+        for symbol in symbols or settings.TRADABLE_ASSETS:
+            for timeframe in self.timeframes:
+                bars = await market_data_cache.last(symbol, timeframe, settings.SMC_WARMUP_BARS)
+                detector = self.detector(symbol, timeframe)
+                detector.reset()
+                columns = [np.asarray(c).tolist() for c in bars[:5]]
+                rows = list(zip(*columns))
+                for row in rows[:-1]:
+                    detector.update(*row)
+                if rows:
+                    self._forming[(symbol, timeframe)] = rows[-1]
+
+    def on_bar(self, symbol: str, timeframe: str, bar: Dict[str, Any]) -> List[StructureEvent]:
+        key = (symbol, timeframe)
+        row = (
+            to_datetime(bar["time"]).timestamp(),
+            float(bar["open"]), float(bar["high"]), float(bar["low"]), float(bar["close"]),
+        )
+        forming = self._forming.get(key)
+        events: List[StructureEvent] = []
+        if forming is not None and row[0] > forming[0]:
+            events = self.detector(symbol, timeframe).update(*forming)
+        if forming is None or row[0] >= forming[0]:
+            self._forming[key] = row
+        return events
+
+    async def consume(self, subscription):
+        """Apply every bar event of an MT5 subscription."""
+        async for event in subscription:
+            if event.kind == "bar" and event.timeframe in self.timeframes:
+                self.on_bar(event.symbol, event.timeframe, event.data)
+
+    def snapshot(self, symbol: str, timeframe: str) -> Dict[str, Any]:
+        detector = self.detector(symbol, timeframe)
+        return {
+            "trend": detector.trend,
+            "events": [e.to_dict() for e in list(detector.events)[-20:]],
+            "zones": [z.to_dict() for z in detector.zones.zones()],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "detectors": len(self.detectors),
+            "open_zones": sum(len(d.zones) for d in self.detectors.values()),
+        }
+
+
+# Shared engine
+smc_engine = SMCEngine()
@@ -1 +1,360 @@
+"""
+Volume profile for Revolution X
+Session and rolling-window profiles kept as fixed-bin histograms
 
+Each bar spreads its volume evenly over the price bins between its low and
+high. Profiles are NumPy histograms updated in place per bar: a rolling
+profile subtracts the bar that leaves the window instead of rebuilding, and
+an in-progress bar is replaced by removing its previous contribution first.
+Levels (POC, value area, HVN/LVN) are derived lazily and cached until the
+histogram next changes.
+
+``VolumeProfile.from_bars()`` builds the same histogram from whole arrays
+with a difference array, which is how past sessions are loaded.
+"""
+
+import math
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.database.connection import async_engine
+from app.database.ingestion import to_datetime
+from app.database.timescale import bars_sql
+
+EPSILON = 1e-9
+
+
+@dataclass
+class ProfileLevels:
+    """Key prices of a volume profile (bin centers)."""
+    poc: Optional[float] = None  # Point of control: bin with the most volume
+    vah: Optional[float] = None  # Value area high
+    val: Optional[float] = None  # Value area low
+    hvn: List[float] = field(default_factory=list)  # High-volume nodes
+    lvn: List[float] = field(default_factory=list)  # Low-volume nodes
+    volume: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def value_area(hist: np.ndarray, poc: int, fraction: float) -> Tuple[int, int]:
+    """
+    Bin range around ``poc`` holding ``fraction`` of the volume, grown one
+    bin at a time towards the heavier neighbour (ties extend upwards).
+    """
+    target = float(hist.sum()) * fraction
+    values = hist.tolist()
+    lo = hi = poc
+    covered = values[poc]
+    last = len(values) - 1
+    while covered < target and (lo > 0 or hi < last):
+        up = values[hi + 1] if hi < last else -1.0
+        down = values[lo - 1] if lo > 0 else -1.0
+        if up >= down:
+            hi += 1
+            covered += up
+        else:
+            lo -= 1
+            covered += down
+    return lo, hi
+
+
+def volume_nodes(hist: np.ndarray, smooth: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of high-volume nodes (local maxima at or above the mean) and
+    low-volume nodes (local minima at or below half the mean) of the
+    smoothed histogram.
+    """
+    if len(hist) < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if smooth > 1:
+        # Edge padding so the first and last bins are not pulled towards zero
+        padded = np.pad(hist, (smooth // 2, smooth - 1 - smooth // 2), mode="edge")
+        s = np.convolve(padded, np.ones(smooth) / smooth, mode="valid")
+    else:
+        s = hist
+    mid = s[1:-1]
+    mean = float(s.mean())
+    peaks = (mid > s[:-2]) & (mid >= s[2:]) & (mid >= mean)
+    troughs = (mid < s[:-2]) & (mid <= s[2:]) & (mid <= 0.5 * mean)
+    return np.flatnonzero(peaks) + 1, np.flatnonzero(troughs) + 1
+
+
+class VolumeProfile:
+    """
+    Volume-at-price histogram with fixed-width bins.
+
+    Bin ``k`` covers ``[k * bin_size, (k + 1) * bin_size)``; the array holds
+    bins ``origin`` onwards and grows (or slides) as prices move.
+    """
+
+    def __init__(self, bin_size: float, value_area: Optional[float] = None):
+        self.bin_size = bin_size
+        self.value_area = value_area or settings.VOLUME_PROFILE_VALUE_AREA
+        self.hist = np.zeros(0, dtype=np.float64)
+        self.origin = 0
+        self.total = 0.0
+        self.bars = 0
+        self._last: Optional[Tuple[float, float, float, float]] = None  # time, low, high, volume
+        self._levels: Optional[ProfileLevels] = None
+
+    # ----- histogram -----
+
+    def _bin(self, price: float) -> int:
+        return math.floor(price / self.bin_size + EPSILON)
+
+    def _ensure(self, lo: int, hi: int):
+        """Make bins ``lo..hi`` addressable, dropping empty edges first."""
+        end = self.origin + len(self.hist)
+        if lo >= self.origin and hi < end:
+            return
+        nz = np.flatnonzero(self.hist > EPSILON)
+        if len(nz):
+            lo, hi = min(lo, self.origin + int(nz[0])), max(hi, self.origin + int(nz[-1]))
+        margin = max((hi - lo) // 2, 16)
+        origin = lo - margin
+        hist = np.zeros(hi - lo + 1 + 2 * margin, dtype=np.float64)
+        if len(nz):
+            keep = slice(int(nz[0]), int(nz[-1]) + 1)
+            start = self.origin + int(nz[0]) - origin
+            hist[start:start + keep.stop - keep.start] = self.hist[keep]
+        self.hist, self.origin = hist, origin
+
+    def _apply(self, low: float, high: float, volume: float, sign: float):
+        lo, hi = self._bin(min(low, high)), self._bin(max(low, high))
+        self._ensure(lo, hi)
+        segment = self.hist[lo - self.origin:hi - self.origin + 1]
+        segment += sign * volume / (hi - lo + 1)
+        if sign < 0:
+            # Float residue of add-then-subtract must not leave negative bins
+            np.maximum(segment, 0.0, out=segment)
+        self.total = max(self.total + sign * volume, 0.0)
+        self._levels = None
+
+    def add(self, low: float, high: float, volume: float):
+        if volume > 0:
+            self._apply(low, high, volume, 1.0)
+            self.bars += 1
+
+    def remove(self, low: float, high: float, volume: float):
+        if volume > 0:
+            self._apply(low, high, volume, -1.0)
+            self.bars -= 1
+
+    def on_bar(self, time: float, high: float, low: float, volume: float):
+        """Add a bar, or replace the newest one if ``time`` matches it."""
+        if self._last is not None and self._last[0] == time:
+            self.remove(*self._last[1:])
+        self.add(low, high, volume)
+        self._last = (time, low, high, volume)
+
+    def merge(self, other: "VolumeProfile"):
+        """Add another profile with the same bin size into this one."""
+        nz = np.flatnonzero(other.hist > EPSILON)
+        if not len(nz):
+            return
+        lo, hi = other.origin + int(nz[0]), other.origin + int(nz[-1])
+        self._ensure(lo, hi)
+        self.hist[lo - self.origin:hi - self.origin + 1] += other.hist[nz[0]:nz[-1] + 1]
+        self.total += other.total
+        self.bars += other.bars
+        self._levels = None
+
+    @classmethod
+    def from_bars(
+        cls,
+        high: np.ndarray,
+        low: np.ndarray,
+        volume: np.ndarray,
+        bin_size: float,
+        value_area: Optional[float] = None,
+    ) -> "VolumeProfile":
+        """Profile of whole arrays, equal to adding the bars one by one."""
+        profile = cls(bin_size, value_area)
+        high, low, volume = (np.asarray(a, dtype=np.float64) for a in (high, low, volume))
+        keep = volume > 0
+        if not keep.any():
+            return profile
+        high, low, volume = high[keep], low[keep], volume[keep]
+        lo = np.floor(np.minimum(low, high) / bin_size + EPSILON).astype(np.int64)
+        hi = np.floor(np.maximum(low, high) / bin_size + EPSILON).astype(np.int64)
+        origin = int(lo.min())
+        n = int(hi.max()) - origin + 1
+        per_bin = volume / (hi - lo + 1)
+        # Difference array: +v at the first bin, -v after the last
+        diff = np.bincount(lo - origin, per_bin, minlength=n + 1)
+        diff -= np.bincount(hi - origin + 1, per_bin, minlength=n + 1)
+        profile.hist = np.maximum(np.cumsum(diff[:n]), 0.0)
+        profile.origin = origin
+        profile.total = float(volume.sum())
+        profile.bars = int(len(volume))
+        return profile
+
+    # ----- levels -----
+
+    def price(self, index: int) -> float:
+        """Center price of the array's ``index``-th bin."""
+        return (self.origin + index + 0.5) * self.bin_size
+
+    def levels(self) -> ProfileLevels:
+        if self._levels is not None:
+            return self._levels
+        nz = np.flatnonzero(self.hist > EPSILON)
+        if not len(nz):
+            self._levels = ProfileLevels()
+            return self._levels
+
+        first, last = int(nz[0]), int(nz[-1])
+        active = self.hist[first:last + 1]
+        poc = int(np.argmax(active))
+        lo, hi = value_area(active, poc, self.value_area)
+        hvn, lvn = volume_nodes(active)
+        self._levels = ProfileLevels(
+            poc=self.price(first + poc),
+            vah=self.price(first + hi),
+            val=self.price(first + lo),
+            hvn=[self.price(first + int(i)) for i in hvn],
+            lvn=[self.price(first + int(i)) for i in lvn],
+            volume=self.total,
+        )
+        return self._levels
+
+    def histogram(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(bin center prices, volumes) of the non-empty range."""
+        nz = np.flatnonzero(self.hist > EPSILON)
+        if not len(nz):
+            return np.empty(0), np.empty(0)
+        first, last = int(nz[0]), int(nz[-1]) + 1
+        prices = (self.origin + np.arange(first, last) + 0.5) * self.bin_size
+        return prices, self.hist[first:last].copy()
+
+
+class RollingVolumeProfile(VolumeProfile):
+    """
+    Profile of the last ``window`` bars; the oldest bar is subtracted as
+    each new one arrives.
+    """
+
+    def __init__(self, bin_size: float, window: int, value_area: Optional[float] = None):
+        super().__init__(bin_size, value_area)
+        self.window = window
+        self._bars: deque = deque()
+
+    def on_bar(self, time: float, high: float, low: float, volume: float):
+        if self._bars and self._bars[-1][0] == time:
+            self.remove(*self._bars.pop()[1:])
+        elif len(self._bars) >= self.window:
+            self.remove(*self._bars.popleft()[1:])
+        self.add(low, high, volume)
+        self._bars.append((time, low, high, volume))
+
+
+class VolumeProfileEngine:
+    """
+    Session profiles per (symbol, UTC date) and rolling profiles per
+    (symbol, window), fed by live bars.
+
+    Session profiles are kept in an LRU of ``VOLUME_PROFILE_SESSIONS``
+    entries and loaded from the database once; a session first seen live
+    (the process started mid-session) gets its earlier bars merged in on
+    first request.
+    """
+
+    def __init__(self, windows: Optional[List[int]] = None, max_sessions: Optional[int] = None):
+        self.windows = list(windows or settings.VOLUME_PROFILE_WINDOWS)
+        self.max_sessions = max_sessions or settings.VOLUME_PROFILE_SESSIONS
+        self.timeframe = settings.VOLUME_PROFILE_TIMEFRAME
+        self.sessions: "OrderedDict[Tuple[str, date], VolumeProfile]" = OrderedDict()
+        self.rolling: Dict[Tuple[str, int], RollingVolumeProfile] = {}
+        self._partial: Dict[Tuple[str, date], float] = {}  # Session -> first live bar time
+        self.session_loads = 0
+
+    def bin_size(self, symbol: str) -> float:
+        tick = settings.MICRO_TICK_SIZES.get(symbol, 0.01)
+        return tick * settings.VOLUME_PROFILE_BIN_TICKS
+
+    def _store(self, key: Tuple[str, date], profile: VolumeProfile):
+        self.sessions[key] = profile
+        self.sessions.move_to_end(key)
+        while len(self.sessions) > self.max_sessions:
+            evicted, _ = self.sessions.popitem(last=False)
+            self._partial.pop(evicted, None)
+
+    def on_bar(self, symbol: str, bar: Dict[str, Any]):
+        """Apply a live bar (new or an update of the newest one)."""
+        opened = to_datetime(bar["time"])
+        t = opened.timestamp()
+        high, low, volume = float(bar["high"]), float(bar["low"]), float(bar.get("volume") or 0)
+
+        key = (symbol, opened.astimezone(timezone.utc).date())
+        profile = self.sessions.get(key)
+        if profile is None:
+            profile = VolumeProfile(self.bin_size(symbol))
+            self._store(key, profile)
+            self._partial[key] = t
+        profile.on_bar(t, high, low, volume)
+
+        for window in self.windows:
+            rolling = self.rolling.get((symbol, window))
+            if rolling is None:
+                rolling = self.rolling[(symbol, window)] = RollingVolumeProfile(
+                    self.bin_size(symbol), window
+                )
+            rolling.on_bar(t, high, low, volume)
+
+    async def consume(self, subscription):
+        """Apply every bar event of an MT5 subscription."""
+        async for event in subscription:
+            if event.kind == "bar" and event.timeframe == self.timeframe:
+                self.on_bar(event.symbol, event.data)
+
+    async def _load(self, symbol: str, start: datetime, end: datetime) -> VolumeProfile:
+        sql = bars_sql(self.timeframe, "time >= $2 AND time < $3", float8=True)
+        async with async_engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            rows = await raw.driver_connection.fetch(sql, symbol, start, end)
+        self.session_loads += 1
+        data = np.array([tuple(r) for r in rows], dtype=np.float64).reshape(-1, 7)
+        return VolumeProfile.from_bars(data[:, 2], data[:, 3], data[:, 5], self.bin_size(symbol))
+
+    async def session(self, symbol: str, day: Optional[date] = None) -> VolumeProfile:
+        """Profile of one UTC session (today by default), loaded once."""
+        day = day or datetime.now(timezone.utc).date()
+        key = (symbol, day)
+        start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        profile = self.sessions.get(key)
+        if profile is not None:
+            self.sessions.move_to_end(key)
+            first_live = self._partial.pop(key, None)
+            if first_live is not None:
+                earlier = await self._load(symbol, start, datetime.fromtimestamp(first_live, timezone.utc))
+                profile.merge(earlier)
+            return profile
+
+        profile = await self._load(symbol, start, start + timedelta(days=1))
+        current = self.sessions.get(key)
+        if current is not None:
+            # Live bars opened the session while the query ran
+            return current
+        self._store(key, profile)
+        return profile
+
+    def window(self, symbol: str, window: int) -> Optional[RollingVolumeProfile]:
+        return self.rolling.get((symbol, window))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "rolling": len(self.rolling),
+            "session_loads": self.session_loads,
+        }
+
+
+# Shared engine
+volume_profiles = VolumeProfileEngine()
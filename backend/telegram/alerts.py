@@ -1 +1,248 @@
+"""
+Telegram alert dispatcher for Revolution X
+Non-blocking alerts with coalescing, digests and per-chat rate limits
 
+``submit()`` only records the alert and returns; each chat has a sender
+task that works through its pending alerts:
+
+- Alerts with the same key (by default the text with numbers masked, so
+  "XAUUSD buy @ 2001.5" and "XAUUSD buy @ 2001.7" match) are coalesced
+  while pending, keeping the latest text and a repeat count. A key already
+  sent within ``TELEGRAM_DEDUPE_WINDOW`` is dropped.
+- Alerts arriving within ``TELEGRAM_DIGEST_WINDOW`` of each other are sent
+  as one digest message (split at Telegram's length limit).
+- Sends draw from a per-chat and a global token bucket; while a chat waits
+  for tokens its new alerts simply merge into the next digest.
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+from app.config import settings
+from telegram.bot import TelegramBot, TelegramError, MAX_MESSAGE_LENGTH
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+LEVEL_ICONS = {"info": "ℹ️", "signal": "📈", "trade": "💰", "warning": "⚠️", "critical": "🚨"}
+
+
+class TokenBucket:
+    """``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+@dataclass
+class Alert:
+    text: str
+    key: str
+    level: str = "info"
+    count: int = 1
+    created: float = field(default_factory=time.monotonic)
+
+    def render(self) -> str:
+        icon = LEVEL_ICONS.get(self.level, "")
+        suffix = f" (×{self.count})" if self.count > 1 else ""
+        return f"{icon} {self.text}{suffix}".strip()
+
+
+class _Chat:
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.pending: "OrderedDict[str, Alert]" = OrderedDict()
+        self.sent_keys: Dict[str, float] = {}  # Key -> monotonic time last sent
+        self.bucket = TokenBucket(settings.TELEGRAM_RATE_PER_CHAT, settings.TELEGRAM_BURST)
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+def alert_key(text: str) -> str:
+    """
+    Default coalescing key: the text with numbers masked and case folded.
+    Alerts that must never merge (one per fill, say) pass their own key.
+    """
+    return _NUMBER.sub("#", text).casefold()
+
+
+class AlertDispatcher:
+    """
+    Accepts alerts from anywhere in the event loop and delivers them to
+    Telegram in coalesced, rate-limited batches.
+    """
+
+    def __init__(self, bot: Optional[TelegramBot] = None, default_chat: Optional[str] = None):
+        self.bot = bot or TelegramBot()
+        # TELEGRAM_CHAT_ID may list several chats; alerts go to the first
+        self.default_chat = default_chat or (settings.TELEGRAM_CHAT_ID or "").split(",")[0].strip()
+        self.chats: Dict[str, _Chat] = {}
+        self.global_bucket = TokenBucket(settings.TELEGRAM_RATE_GLOBAL, settings.TELEGRAM_RATE_GLOBAL)
+        self.running = False
+
+        # Metrics
+        self.submitted: int = 0
+        self.coalesced: int = 0
+        self.suppressed: int = 0
+        self.dropped: int = 0
+        self.messages: int = 0
+        self.failed: int = 0
+
+    async def start(self):
+        await self.bot.start()
+        self.running = True
+        for chat in self.chats.values():
+            self._ensure_task(chat)
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Flush what is pending (best effort) and stop the sender tasks."""
+        self.running = False
+        tasks = [c.task for c in self.chats.values() if c.task]
+        for chat in self.chats.values():
+            chat.wakeup.set()
+        if tasks:
+            await asyncio.wait(tasks, timeout=drain_timeout)
+            for task in tasks:
+                task.cancel()
+        await self.bot.stop()
+
+    def _ensure_task(self, chat: _Chat):
+        if self.running and (chat.task is None or chat.task.done()):
+            chat.task = asyncio.create_task(self._chat_loop(chat))
+
+    def submit(
+        self,
+        text: str,
+        level: str = "info",
+        key: Optional[str] = None,
+        chat_id: Optional[str] = None,
+    ) -> bool:
+        """Queue an alert without waiting. Returns False if it was dropped as a duplicate."""
+        chat_id = chat_id or self.default_chat
+        if not chat_id:
+            return False
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = _Chat(chat_id)
+        self.submitted += 1
+        key = key or alert_key(text)
+
+        sent = chat.sent_keys.get(key)
+        if sent is not None and time.monotonic() - sent < settings.TELEGRAM_DEDUPE_WINDOW:
+            self.suppressed += 1
+            return False
+
+        pending = chat.pending.get(key)
+        if pending is not None:
+            pending.text, pending.level = text, level
+            pending.count += 1
+            self.coalesced += 1
+        else:
+            if len(chat.pending) >= settings.TELEGRAM_MAX_PENDING:
+                chat.pending.popitem(last=False)
+                self.dropped += 1
+            chat.pending[key] = Alert(text, key, level)
+        chat.wakeup.set()
+        self._ensure_task(chat)
+        return True
+
+    async def _chat_loop(self, chat: _Chat):
+        while self.running or chat.pending:
+            if not chat.pending:
+                chat.wakeup.clear()
+                await chat.wakeup.wait()
+                continue
+
+            # Let a burst gather into one digest
+            first = next(iter(chat.pending.values())).created
+            window = settings.TELEGRAM_DIGEST_WINDOW - (time.monotonic() - first)
+            if window > 0 and self.running:
+                await asyncio.sleep(window)
+
+            # Wait for both buckets; alerts keep merging meanwhile
+            wait = max(chat.bucket.delay(), self.global_bucket.delay())
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = max(chat.bucket.delay(), self.global_bucket.delay())
+
+            alerts = list(chat.pending.values())
+            chat.pending.clear()
+            messages = self._compose(alerts)
+            # Send the first message now; the rest go back through the buckets
+            chat.bucket.take()
+            self.global_bucket.take()
+            await self._send(chat, messages[0])
+            now = time.monotonic()
+            for alert in alerts:
+                chat.sent_keys[alert.key] = now
+            for text in messages[1:]:
+                wait = max(chat.bucket.delay(), self.global_bucket.delay())
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                chat.bucket.take()
+                self.global_bucket.take()
+                await self._send(chat, text)
+            self._prune(chat)
+
+    def _compose(self, alerts: List[Alert]) -> List[str]:
+        if len(alerts) == 1:
+            return [alerts[0].render()]
+        header = f"📬 {len(alerts)} alerts"
+        messages, current = [], header
+        for alert in alerts:
+            line = alert.render()
+            if len(current) + 1 + len(line) > MAX_MESSAGE_LENGTH:
+                messages.append(current)
+                current = header + " (cont.)"
+            current += "\n" + line
+        messages.append(current)
+        return messages
+
+    async def _send(self, chat: _Chat, text: str):
+        try:
+            await self.bot.send_message(chat.chat_id, text)
+            self.messages += 1
+        except TelegramError as e:
+            self.failed += 1
+            print(f"⚠️ Telegram alert to {chat.chat_id} failed: {e}")
+
+    def _prune(self, chat: _Chat):
+        cutoff = time.monotonic() - settings.TELEGRAM_DEDUPE_WINDOW
+        for key in [k for k, t in chat.sent_keys.items() if t < cutoff]:
+            del chat.sent_keys[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "suppressed": self.suppressed,
+            "dropped": self.dropped,
+            "messages": self.messages,
+            "failed": self.failed,
+            "pending": sum(len(c.pending) for c in self.chats.values()),
+            "bot": self.bot.stats(),
+        }
+
+
+# Shared dispatcher
+alert_dispatcher = AlertDispatcher()
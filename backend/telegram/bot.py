@@ -1 +1,112 @@
+"""
+Telegram Bot API client for Revolution X
+Pooled HTTP client with retries and backoff
 
+One ``httpx.AsyncClient`` (keep-alive connection pool) is shared by every
+call. Rate-limit replies (429) are retried after the ``retry_after`` the
+API asks for; network errors and 5xx replies are retried with exponential
+backoff and jitter. Other 4xx replies are permanent and raise at once.
+"""
+
+import asyncio
+import random
+from typing import Optional, Dict, Any, List
+
+import httpx
+
+from app.config import settings
+
+# Telegram's limit on message text length
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TelegramError(Exception):
+    """Permanent Bot API failure (bad request, forbidden, bad token...)."""
+
+
+class TelegramBot:
+    """
+    Minimal async Bot API client.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        api_url: Optional[str] = None,
+        retries: Optional[int] = None,
+    ):
+        self.token = token or settings.TELEGRAM_BOT_TOKEN
+        self.api_url = (api_url or settings.TELEGRAM_API_URL).rstrip("/")
+        self.retries = settings.TELEGRAM_RETRIES if retries is None else retries
+        self.client: Optional[httpx.AsyncClient] = None
+
+        # Metrics
+        self.sent: int = 0
+        self.retried: int = 0
+        self.failed: int = 0
+
+    async def start(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=f"{self.api_url}/bot{self.token}/",
+                timeout=httpx.Timeout(settings.TELEGRAM_TIMEOUT, connect=5.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def call(self, method: str, payload: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """Call a Bot API method, retrying transient failures."""
+        await self.start()
+        delay = settings.TELEGRAM_BACKOFF_BASE
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.post(method, json=payload or {}, timeout=timeout or httpx.USE_CLIENT_DEFAULT)
+                body = response.json()
+            except (httpx.TransportError, ValueError) as e:
+                error, wait = str(e), delay
+            else:
+                if body.get("ok"):
+                    return body.get("result")
+                error = body.get("description", f"HTTP {response.status_code}")
+                if response.status_code == 429:
+                    wait = float((body.get("parameters") or {}).get("retry_after", delay))
+                elif response.status_code >= 500:
+                    wait = delay
+                else:
+                    self.failed += 1
+                    raise TelegramError(f"{method}: {error}")
+
+            if attempt == self.retries:
+                break
+            self.retried += 1
+            await asyncio.sleep(wait + random.uniform(0, wait * 0.1))
+            delay = min(delay * 2, settings.TELEGRAM_BACKOFF_MAX)
+
+        self.failed += 1
+        raise TelegramError(f"{method}: {error} (after {self.retries + 1} attempts)")
+
+    async def send_message(self, chat_id: str, text: str, parse_mode: Optional[str] = None) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "chat_id": chat_id,
+            "text": text[:MAX_MESSAGE_LENGTH],
+            "disable_web_page_preview": True,
+        }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        result = await self.call("sendMessage", payload)
+        self.sent += 1
+        return result
+
+    async def get_updates(self, offset: Optional[int] = None, timeout: int = 30) -> List[Dict[str, Any]]:
+        """Long-poll for updates after ``offset``."""
+        payload: Dict[str, Any] = {"timeout": timeout, "allowed_updates": ["message"]}
+        if offset is not None:
+            payload["offset"] = offset
+        return await self.call("getUpdates", payload, timeout=timeout + 10)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed}
@@ -1 +1,134 @@
+"""
+Telegram bot commands for Revolution X
+Read-only commands answered from in-memory state
 
+Commands are polled with ``getUpdates`` and answered only for the chats in
+``TELEGRAM_CHAT_ID`` (comma-separated). Every answer comes from state the
+process already holds (account snapshot, scanner ranking, alert stats), so
+a command never waits on MT5 or the database.
+"""
+
+import asyncio
+import json
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from app.config import settings
+from app.mt5.snapshot import account_snapshot, ACCOUNT, POSITIONS
+from ai.scanner import smart_scanner
+from telegram.alerts import alert_dispatcher
+from telegram.bot import TelegramBot, TelegramError
+
+Handler = Callable[[List[str]], Awaitable[str]]
+
+
+class CommandRouter:
+    """
+    Registry of ``/command`` handlers and the polling loop serving them.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, Handler] = {}
+        self.descriptions: Dict[str, str] = {}
+        self.handled = 0
+
+    def command(self, name: str, description: str = ""):
+        """Decorator registering an async ``handler(args) -> reply``."""
+        def register(func: Handler) -> Handler:
+            self.handlers[name] = func
+            self.descriptions[name] = description or (func.__doc__ or "").strip()
+            return func
+        return register
+
+    async def dispatch(self, text: str) -> Optional[str]:
+        if not text.startswith("/"):
+            return None
+        parts = text.split()
+        name = parts[0][1:].split("@", 1)[0].lower()
+        handler = self.handlers.get(name)
+        if handler is None:
+            return f"Unknown command /{name}. Try /help"
+        self.handled += 1
+        try:
+            return await handler(parts[1:])
+        except Exception as e:
+            return f"⚠️ /{name} failed: {e}"
+
+    async def poll_forever(self, bot: TelegramBot):
+        """Answer commands from the allowed chats until cancelled."""
+        allowed = {c.strip() for c in (settings.TELEGRAM_CHAT_ID or "").split(",") if c.strip()}
+        offset: Optional[int] = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset)
+            except TelegramError as e:
+                print(f"⚠️ Telegram polling failed: {e}")
+                await asyncio.sleep(settings.TELEGRAM_BACKOFF_MAX)
+                continue
+            for update in updates:
+                offset = update["update_id"] + 1
+                message = update.get("message") or {}
+                chat_id = str((message.get("chat") or {}).get("id", ""))
+                if chat_id not in allowed:
+                    continue
+                reply = await self.dispatch(message.get("text") or "")
+                if reply:
+                    try:
+                        await bot.send_message(chat_id, reply)
+                    except TelegramError as e:
+                        print(f"⚠️ Telegram reply failed: {e}")
+
+
+commands = CommandRouter()
+
+
+@commands.command("help", "List commands")
+async def _help(args: List[str]) -> str:
+    return "\n".join(f"/{name} - {desc}" for name, desc in sorted(commands.descriptions.items()))
+
+
+@commands.command("account", "Balance, equity and margin")
+async def _account(args: List[str]) -> str:
+    view = await account_snapshot.get(ACCOUNT)
+    data: Dict[str, Any] = view["data"] or {}
+    if not data:
+        return "Account not available"
+    lines = [f"{k}: {data[k]}" for k in ("balance", "equity", "margin", "free_margin", "profit") if k in data]
+    if view["stale"]:
+        lines.append(f"(stale, {view['age']}s old)")
+    return "💼 Account\n" + "\n".join(lines)
+
+
+@commands.command("positions", "Open positions")
+async def _positions(args: List[str]) -> str:
+    view = await account_snapshot.get(POSITIONS)
+    positions = list((view["data"] or {}).values())
+    if not positions:
+        return "No open positions"
+    lines = [
+        f"#{p.get('ticket')} {p.get('symbol')} {p.get('type', '')} {p.get('volume')} @ {p.get('price_open', p.get('price'))}"
+        f" P/L {p.get('profit')}"
+        for p in positions
+    ]
+    return f"📊 {len(positions)} open\n" + "\n".join(lines)
+
+
+@commands.command("signals", "Top scanner opportunities")
+async def _signals(args: List[str]) -> str:
+    snapshot = json.loads(smart_scanner.snapshot_json)
+    ranking = snapshot.get("ranking") or []
+    count = int(args[0]) if args and args[0].isdigit() else 5
+    if not ranking:
+        return "No scan results yet"
+    lines = [
+        f"{r['symbol']} {r['timeframe']} {'BUY' if r['direction'] > 0 else 'SELL' if r['direction'] < 0 else '-'}"
+        f" score {r['score']:.2f}"
+        for r in ranking[:count]
+    ]
+    return f"🔎 Scan #{snapshot.get('cycle')}\n" + "\n".join(lines)
+
+
+@commands.command("alerts", "Alert delivery statistics")
+async def _alerts(args: List[str]) -> str:
+    stats = alert_dispatcher.stats()
+    stats.pop("bot", None)
+    return "🔔 Alerts\n" + "\n".join(f"{k}: {v}" for k, v in stats.items())
@@ -0,0 +1,127 @@
+"""
+Stub Telegram Bot API for Revolution X
+Local aiohttp server for development and testing
+
+Implements ``sendMessage`` and ``getUpdates`` well enough to exercise the
+alert dispatcher and command polling: sent messages are recorded per chat,
+a per-chat rate limit answers 429 with ``retry_after`` like the real API,
+and ``fail_next`` injects 5xx replies to test retries.
+
+Point the backend at it with ``TELEGRAM_API_URL=http://127.0.0.1:8081``.
+
+Run standalone with:
+    python -m telegram.stub_server
+"""
+
+import asyncio
+import itertools
+import time
+from collections import defaultdict, deque
+from typing import Optional, Dict, Any, List
+
+from aiohttp import web
+
+
+class StubTelegramServer:
+    """
+    In-process Bot API stand-in.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, per_chat_per_second: float = 1.0):
+        self.host = host
+        self.port = port
+        self.min_interval = 1.0 / per_chat_per_second if per_chat_per_second else 0.0
+        self.messages: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.rate_limited: int = 0
+        self.fail_next: int = 0  # Number of upcoming calls answered with 502
+        self._last_sent: Dict[str, float] = {}
+        self._updates: deque = deque()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._has_updates = asyncio.Event()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        if not self.port:
+            self.port = self._runner.addresses[0][1]  # Port 0 picks a free one
+
+    async def stop(self):
+        if self._runner is not None:
+            self._has_updates.set()  # Release pending long polls
+            await asyncio.sleep(0.01)
+            await self._runner.cleanup()
+            self._runner = None
+
+    def push_message(self, chat_id: str, text: str):
+        """Queue an incoming user message for ``getUpdates``."""
+        self._updates.append({
+            "update_id": next(self._update_ids),
+            "message": {"chat": {"id": int(chat_id)}, "text": text, "date": int(time.time())},
+        })
+        self._has_updates.set()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return web.json_response({"ok": False, "description": "Bad Gateway"}, status=502)
+        payload = await request.json() if request.can_read_body else {}
+        method = request.match_info["method"]
+        if method == "sendMessage":
+            return self._send_message(payload)
+        if method == "getUpdates":
+            return await self._get_updates(payload)
+        return web.json_response({"ok": False, "description": "Not Found"}, status=404)
+
+    def _send_message(self, payload: Dict[str, Any]) -> web.Response:
+        chat_id = str(payload.get("chat_id", ""))
+        text = payload.get("text") or ""
+        if not chat_id or not text:
+            return web.json_response({"ok": False, "description": "Bad Request: text is empty"}, status=400)
+        now = time.monotonic()
+        wait = self._last_sent.get(chat_id, 0.0) + self.min_interval - now
+        if wait > 0:
+            self.rate_limited += 1
+            return web.json_response({
+                "ok": False,
+                "description": "Too Many Requests",
+                "parameters": {"retry_after": round(wait, 3)},
+            }, status=429)
+        self._last_sent[chat_id] = now
+        message = {"message_id": next(self._message_ids), "chat": {"id": chat_id}, "text": text}
+        self.messages[chat_id].append(message)
+        return web.json_response({"ok": True, "result": message})
+
+    async def _get_updates(self, payload: Dict[str, Any]) -> web.Response:
+        offset = payload.get("offset")
+        while self._updates and offset is not None and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), timeout=min(payload.get("timeout", 0), 5))
+            except asyncio.TimeoutError:
+                pass
+        return web.json_response({"ok": True, "result": list(self._updates)})
+
+
+async def _main():
+    server = StubTelegramServer()
+    await server.start()
+    print(f"🧪 Stub Telegram API listening on {server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
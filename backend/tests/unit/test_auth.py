@@ -1 +1,90 @@
+"""
+Tests for local JWT verification and session revocation
+"""
 
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from auth.service import AuthService, AuthError, RevocationList, TokenCache, create_token
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def one_or_none(self):
+        return self.row
+
+
+class _Session:
+    """Fake AsyncSession answering the revoke UPDATE ... RETURNING."""
+
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return _Result(self.row)
+
+
+def _service() -> AuthService:
+    return AuthService(cache=TokenCache(100, 60), revocations=RevocationList(engine=object()))
+
+
+def test_valid_access_token_verifies():
+    service = _service()
+    token, _ = create_token("7c9e6679-7425-40de-944b-e07fc1f90ae7", "trader", session_id=uuid.uuid4())
+    assert service.user(token) == {"id": "7c9e6679-7425-40de-944b-e07fc1f90ae7", "role": "trader"}
+
+
+def test_wrong_type_and_bad_signature_are_rejected():
+    service = _service()
+    refresh, _ = create_token("u", "trader", token_type="refresh")
+    with pytest.raises(AuthError):
+        service.verify(refresh)
+    with pytest.raises(AuthError):
+        service.verify(refresh[:-2] + "xx", token_type="refresh")
+
+
+@pytest.mark.asyncio
+async def test_revoking_session_rejects_its_access_token_even_when_cached():
+    service = _service()
+    session_id = uuid.uuid4()
+    access, _ = create_token("u", "trader", session_id=session_id)
+    refresh, expires = create_token("u", "trader", token_type="refresh", session_id=session_id)
+    other, _ = create_token("u", "trader", session_id=uuid.uuid4())
+
+    service.verify(access)  # Now cached
+    revoked = await service.revoke(_Session((session_id, expires)), refresh)
+
+    assert revoked
+    with pytest.raises(AuthError):
+        service.verify(access)
+    with pytest.raises(AuthError):
+        service.verify(refresh, token_type="refresh")
+    assert service.verify(other)["sub"] == "u"
+
+
+@pytest.mark.asyncio
+async def test_revoking_unknown_token_is_a_no_op():
+    service = _service()
+    refresh, _ = create_token("u", "trader", token_type="refresh", session_id=uuid.uuid4())
+    assert not await service.revoke(_Session(None), refresh)
+    assert len(service.revocations) == 0
+
+
+def test_cache_never_outlives_token():
+    cache = TokenCache(10, ttl=3600)
+    cache.put("k", {"exp": time.time() - 1})
+    assert cache.get("k") is None
+
+
+def test_expired_token_is_rejected():
+    service = _service()
+    token, _ = create_token("u", "trader", expires_delta=timedelta(seconds=-5))
+    with pytest.raises(AuthError):
+        service.verify(token)
@@ -0,0 +1,75 @@
+"""
+Tests for the vectorized backtest against a bar-by-bar simulation
+"""
+
+import numpy as np
+import pytest
+
+from core.backtest import (
+    BacktestConfig, Signals, run_backtest, run_sweep, synthetic_bars, ema_crossover,
+    EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_TIMEOUT,
+)
+
+
+def _simulate(bars, signals, cfg):
+    """One position at a time, checking every bar of every trade in turn."""
+    n = len(bars.close)
+    spread = np.full(n, cfg.spread) if cfg.spread is not None else bars.spread
+    sl_dist = np.broadcast_to(signals.stop_loss, (n,))
+    tp_dist = np.broadcast_to(signals.take_profit, (n,))
+    trades, free_from = [], -1
+    for i in range(n - 1):
+        side = int(signals.direction[i])
+        entry = i + 1
+        if not side or entry <= free_from or not np.isfinite(sl_dist[i] + tp_dist[i]):
+            continue
+        price = bars.open[entry] + (spread[entry] if side > 0 else 0.0) + side * cfg.slippage
+        sl, tp = price - side * sl_dist[i], price + side * tp_dist[i]
+        last = min(entry + cfg.max_hold_bars, n) - 1
+        exit_, reason, exit_price = last, EXIT_TIMEOUT, None
+        for j in range(entry, last + 1):
+            shift = spread[j] if side < 0 else 0.0
+            high, low = bars.high[j] + shift, bars.low[j] + shift
+            if (low <= sl) if side > 0 else (high >= sl):
+                exit_, reason, exit_price = j, EXIT_STOP_LOSS, sl - side * cfg.slippage
+                break
+            if (high >= tp) if side > 0 else (low <= tp):
+                exit_, reason, exit_price = j, EXIT_TAKE_PROFIT, tp
+                break
+        if exit_price is None:
+            exit_price = bars.close[last] + (spread[last] if side < 0 else 0.0) - side * cfg.slippage
+        trades.append((entry, exit_, side, reason, exit_price))
+        free_from = exit_
+    return trades
+
+
+@pytest.mark.parametrize("spread,slippage,hold", [(None, 0.0, 500), (0.3, 0.05, 40)])
+def test_matches_bar_by_bar_simulation(spread, slippage, hold):
+    bars = synthetic_bars(5000, "M5", volatility=0.001, seed=3)
+    cfg = BacktestConfig(spread=spread, slippage=slippage, max_hold_bars=hold)
+    rng = np.random.default_rng(5)
+    direction = rng.choice([-1, 0, 0, 0, 1], size=5000).astype(np.int8)
+    signals = Signals(direction, rng.uniform(1, 8, 5000), rng.uniform(1, 8, 5000))
+
+    result = run_backtest(bars, signals, cfg)
+    expected = _simulate(bars, signals, cfg)
+
+    assert len(result) == len(expected) > 50
+    assert result.entry_index.tolist() == [t[0] for t in expected]
+    assert result.exit_index.tolist() == [t[1] for t in expected]
+    assert result.direction.tolist() == [t[2] for t in expected]
+    assert result.exit_reason.tolist() == [t[3] for t in expected]
+    np.testing.assert_allclose(result.exit_price, [t[4] for t in expected], rtol=1e-12)
+    assert {EXIT_STOP_LOSS, EXIT_TAKE_PROFIT} <= set(result.exit_reason.tolist())
+
+
+def test_sweep_matches_single_runs():
+    bars = synthetic_bars(3000, "M15", volatility=0.001, seed=11)
+    grid = {"fast": [10, 20], "slow": [50]}
+    results = run_sweep(ema_crossover, grid, bars, max_workers=2)
+
+    assert len(results) == 2
+    for row in results:
+        single = run_backtest(bars, ema_crossover(bars, **row["params"])).summary()
+        assert row["net_profit"] == single["net_profit"]
+        assert row["trades"] == single["trades"]
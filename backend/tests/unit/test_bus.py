@@ -0,0 +1,98 @@
+"""
+Tests for the event bus between the MT5 owner and API workers
+"""
+
+import asyncio
+
+import pytest
+import zmq
+
+from app.config import settings
+from app.realtime.bus import InMemoryEventBus, ZmqEventBus, create_event_bus
+
+
+async def _next(subscription, timeout: float = 1.0):
+    return await asyncio.wait_for(subscription.__anext__(), timeout)
+
+
+@pytest.mark.asyncio
+async def test_undecodable_message_is_skipped_and_counted():
+    bus = InMemoryEventBus()
+    subscription = bus.subscribe(["tick:"])
+    await bus.publish_raw("tick:XAUUSD", b"\xc1")  # Never valid msgpack
+    await bus.publish("tick:XAUUSD", {"bid": 2000.0})
+
+    assert await _next(subscription) == ("tick:XAUUSD", {"bid": 2000.0})
+    assert subscription.undecodable == 1
+    assert bus.stats()["undecodable"] == 1
+    await bus.stop()
+
+
+def test_memory_bus_is_refused_when_processes_are_split(monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_BUS_BACKEND", "memory")
+    for role in ("api", "owner"):
+        monkeypatch.setattr(settings, "PROCESS_ROLE", role)
+        with pytest.raises(ValueError, match="EVENT_BUS_BACKEND=zmq"):
+            create_event_bus(publisher=role == "owner")
+
+    monkeypatch.setattr(settings, "PROCESS_ROLE", "all")
+    assert isinstance(create_event_bus(publisher=True), InMemoryEventBus)
+    monkeypatch.setattr(settings, "EVENT_BUS_BACKEND", "zmq")
+    monkeypatch.setattr(settings, "PROCESS_ROLE", "api")
+    assert isinstance(create_event_bus(), ZmqEventBus)
+
+
+@pytest.mark.asyncio
+async def test_zmq_worker_skips_bad_frames_and_keeps_receiving():
+    owner = ZmqEventBus(url="tcp://127.0.0.1:*", publisher=True)
+    await owner.start()
+    worker = ZmqEventBus(url=owner.socket.getsockopt(zmq.LAST_ENDPOINT).decode())
+    await worker.start()
+    subscription = worker.subscribe(["tick:"])
+    try:
+        for _ in range(100):  # Until the SUB socket has joined
+            await owner.publish("tick:XAUUSD", {"n": 0})
+            try:
+                await _next(subscription, 0.05)
+                break
+            except asyncio.TimeoutError:
+                continue
+
+        await owner.socket.send_multipart([b"tick:\xff", b"\x80"])  # Topic not UTF-8
+        await owner.socket.send_multipart([b"tick:XAUUSD"])  # No payload frame
+        await owner.publish_raw("tick:XAUUSD", b"\xc1")
+        await owner.publish("tick:XAUUSD", {"n": 1})
+
+        assert await _next(subscription) == ("tick:XAUUSD", {"n": 1})
+        assert worker.stats()["undecodable"] == 3
+    finally:
+        await worker.stop()
+        await owner.stop()
+
+
+@pytest.mark.asyncio
+async def test_relay_survives_bad_events(monkeypatch):
+    import app.main as main
+
+    delivered = []
+
+    class Hub:
+        def publish(self, topic, payload):
+            if payload == "boom":
+                raise TypeError("not a dict")
+            delivered.append((topic, payload))
+
+    monkeypatch.setattr(main, "ws_hub", Hub())
+    bus = InMemoryEventBus()
+    subscription = bus.subscribe()
+    relay = asyncio.create_task(main._relay_bus(subscription))
+
+    await bus.publish_raw("positions", b"\xc1")
+    await bus.publish("positions", "boom")
+    await bus.publish("positions", {"count": 1})
+    await asyncio.sleep(0.01)
+
+    assert delivered == [("positions", {"count": 1})]
+    assert not relay.done()
+    await bus.stop()
+    await asyncio.wait_for(relay, 1.0)
@@ -0,0 +1,77 @@
+"""
+Tests for the MT5 connector against the fake ZeroMQ bridge
+"""
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+import zmq
+
+from app.config import settings
+from app.mt5.connector import MT5ConnectionManager
+from app.mt5.fake_server import FakeMT5Server
+
+
+@pytest_asyncio.fixture
+async def server(monkeypatch):
+    server = FakeMT5Server(address="tcp://127.0.0.1:*", stream_address="tcp://127.0.0.1:*")
+    await server.start()
+    endpoint = server.socket.getsockopt(zmq.LAST_ENDPOINT).decode()
+    monkeypatch.setattr(settings, "MT5_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "MT5_PORT", int(endpoint.rsplit(":", 1)[1]))
+    yield server
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def manager(server):
+    manager = MT5ConnectionManager()
+    assert await manager.connect()
+    yield manager
+    await manager.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_replies_are_matched_out_of_order(server, manager):
+    server.delays["symbol_info"] = 0.2
+    slow = asyncio.create_task(manager.get_symbol_info("XAUUSD"))
+    await asyncio.sleep(0.01)
+    account = await manager.get_account_info()
+
+    assert account is not None and not slow.done()
+    assert (await slow)["symbol"] == "XAUUSD"
+    assert manager.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_malformed_replies_do_not_stop_the_receiver(server, manager):
+    handle = server._handle
+
+    async def junk_first(frames):
+        # A list, a reply without a usable id, then the real reply
+        for body in (b"[1, 2]", json.dumps({"id": [1]}).encode()):
+            await server.socket.send_multipart([*frames[:-1], body])
+        await handle(frames)
+
+    server._handle = junk_first
+    assert await manager.ping(timeout=2) >= 0
+    assert await manager.ping(timeout=2) >= 0
+    assert manager.is_connected
+
+
+@pytest.mark.asyncio
+async def test_socket_failure_marks_down_and_fails_pending(server, manager):
+    server.delays["account_info"] = 5.0
+    pending = asyncio.create_task(manager._send_command({"action": "account_info"}))
+    await asyncio.sleep(0.05)
+    manager.socket.close()  # recv fails with ENOTSOCK
+
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(pending, 1.0)
+    assert not manager.is_connected
+    assert manager.in_flight == 0
+
+    assert await manager.connect()  # Reconnects over the dead socket
+    assert await manager.ping(timeout=2) >= 0
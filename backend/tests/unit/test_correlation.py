@@ -0,0 +1,57 @@
+"""
+Tests for the rolling DXY correlation against SciPy and the batch path
+"""
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from dxy_guardian.correlation import RollingCorrelation, rolling_pearson, rolling_spearman
+
+WINDOW = 30
+
+
+def _returns(n: int = 400, seed: int = 4):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 1e-3, n)
+    y = -0.8 * x + rng.normal(0, 5e-4, n)
+    # Rounded so rank ties occur
+    return np.round(x, 4), np.round(y, 4)
+
+
+def test_batch_matches_scipy():
+    x, y = _returns()
+    corr, beta = rolling_pearson(x, y, WINDOW)
+    spearman = rolling_spearman(x, y, WINDOW)
+    assert np.isnan(corr[:WINDOW - 1]).all() and np.isnan(spearman[:WINDOW - 1]).all()
+    for end in range(WINDOW, len(x) + 1, 37):
+        wx, wy = x[end - WINDOW:end], y[end - WINDOW:end]
+        assert corr[end - 1] == pytest.approx(stats.pearsonr(wx, wy)[0], abs=1e-12)
+        assert beta[end - 1] == pytest.approx(stats.linregress(wx, wy).slope, rel=1e-9)
+        assert spearman[end - 1] == pytest.approx(stats.spearmanr(wx, wy)[0], abs=1e-12)
+
+
+def test_streaming_matches_batch():
+    x, y = _returns()
+    corr, beta = rolling_pearson(x, y, WINDOW)
+    spearman = rolling_spearman(x, y, WINDOW)
+    rolling = RollingCorrelation(WINDOW)
+    for i, (a, b) in enumerate(zip(x.tolist(), y.tolist())):
+        rolling.update(a, b)
+        if i < WINDOW - 1:
+            assert np.isnan(rolling.pearson)
+            continue
+        assert rolling.pearson == pytest.approx(corr[i], abs=1e-9)
+        assert rolling.beta == pytest.approx(beta[i], rel=1e-7)
+        assert rolling.spearman == pytest.approx(spearman[i], abs=1e-12)
+
+
+def test_backfill_then_stream():
+    x, y = _returns()
+    corr, _ = rolling_pearson(x, y, WINDOW)
+    rolling = RollingCorrelation(WINDOW)
+    rolling.extend(x[:200], y[:200])
+    assert rolling.pearson == pytest.approx(corr[199], abs=1e-12)
+    for i in range(200, len(x)):
+        rolling.update(x[i], y[i])
+    assert rolling.pearson == pytest.approx(corr[-1], abs=1e-9)
@@ -0,0 +1,42 @@
+"""
+Tests for LTTB downsampling
+"""
+
+import numpy as np
+
+from core.downsample import lttb_indices
+
+
+def _series(n: int = 1000, seed: int = 4):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.uniform(30, 90, n))
+    y = 2000 + np.cumsum(rng.normal(0, 1, n))
+    return x, y
+
+
+def test_keeps_first_and_last_points_and_threshold_count():
+    x, y = _series()
+    for threshold in (3, 10, 100, 999):
+        kept = lttb_indices(x, y, threshold)
+        assert len(kept) == threshold
+        assert kept[0] == 0 and kept[-1] == len(x) - 1
+
+
+def test_output_times_are_strictly_increasing():
+    x, y = _series()
+    kept = lttb_indices(x, y, 100)
+    assert np.all(np.diff(kept) > 0)
+    assert np.all(np.diff(x[kept]) > 0)
+
+
+def test_short_series_are_returned_whole():
+    x, y = _series(50)
+    np.testing.assert_array_equal(lttb_indices(x, y, 50), np.arange(50))
+    np.testing.assert_array_equal(lttb_indices(x, y, 80), np.arange(50))
+
+
+def test_isolated_spike_survives():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[437] = 50.0
+    assert 437 in lttb_indices(x, y, 20)
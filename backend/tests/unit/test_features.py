@@ -0,0 +1,54 @@
+"""
+Tests for the feature store memo
+"""
+
+import numpy as np
+
+from ai.features import FeatureStore
+from core.market_data import Bars
+
+
+def _bars(n: int = 5) -> Bars:
+    base = np.arange(n, dtype=np.float64)
+    return Bars(
+        time=60.0 * base,
+        open=100 + base,
+        high=101 + base,
+        low=99 + base,
+        close=100.5 + base,
+        volume=np.full(n, 10.0),
+        spread=np.zeros(n),
+    )
+
+
+def _store() -> FeatureStore:
+    store = FeatureStore(max_bytes=1 << 20)
+    store.register("last_close", lambda ctx: float(ctx.bars.close[-1]))
+    return store
+
+
+def test_same_bar_is_served_from_memo():
+    store = _store()
+    bars = _bars()
+    store.vector("XAUUSD", "M1", bars, ["last_close"])
+    store.vector("XAUUSD", "M1", bars, ["last_close"])
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_forming_bar_updated_in_place_is_recomputed():
+    store = _store()
+    bars = _bars()
+    assert store.vector("XAUUSD", "M1", bars, ["last_close"])[0] == 104.5
+
+    # The ring buffer updates the forming bar without changing its time
+    bars.close[-1] = 106.0
+    bars.high[-1] = 106.0
+    assert store.vector("XAUUSD", "M1", bars, ["last_close"])[0] == 106.0
+    assert store.stats()["entries"] == 1
+
+
+def test_new_bar_evicts_previous_entries():
+    store = _store()
+    store.vector("XAUUSD", "M1", _bars(5), ["last_close"])
+    assert store.vector("XAUUSD", "M1", _bars(6), ["last_close"])[0] == 105.5
+    assert store.stats()["entries"] == 1
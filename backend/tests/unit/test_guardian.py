@@ -0,0 +1,180 @@
+"""
+Tests for the guardian latency histograms, anomaly analyzer and log writer
+"""
+
+import numpy as np
+import pytest
+
+import guardian.analyzer as analyzer_module
+from guardian.analyzer import AnomalyAnalyzer, Finding, GuardianLogWriter
+from guardian.monitor import BUCKETS, SUB_COUNT, LatencyHistogram, _bucket, _bucket_upper
+
+RELATIVE_ERROR = 1 / (SUB_COUNT // 2)  # One sub-bucket: ~3.1%
+
+
+def _values():
+    rng = np.random.default_rng(11)
+    return np.concatenate([
+        np.arange(0, 5000),
+        rng.integers(0, 2 ** 36, 20000),
+        [2 ** k + d for k in range(6, 36) for d in (-1, 0, 1)],
+    ]).astype(np.int64)
+
+
+def test_bucket_round_trip_and_error_bound():
+    for value in _values().tolist():
+        index = _bucket(value)
+        upper = _bucket_upper(index)
+        assert 0 <= index < BUCKETS
+        assert upper >= value  # The value lands at or below its bucket's bound
+        assert index == 0 or _bucket_upper(index - 1) < value  # ...and above the previous one
+        assert upper - value <= value * RELATIVE_ERROR
+
+
+def test_buckets_are_contiguous():
+    uppers = [_bucket_upper(i) for i in range(BUCKETS - 1)]
+    for index, upper in enumerate(uppers):
+        assert _bucket(upper) == index
+        assert _bucket(upper + 1) == index + 1
+
+
+def test_percentiles_match_numpy_within_a_bucket():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(mean=8, sigma=1.5, size=50000).astype(np.int64)
+    histogram = LatencyHistogram()
+    for value in values.tolist():
+        histogram.record_us(value)
+
+    for q in (1, 25, 50, 90, 99, 99.9):
+        expected = np.percentile(values, q)
+        assert histogram.percentile(q) == pytest.approx(expected, rel=RELATIVE_ERROR + 0.005)
+    assert histogram.percentile(100) == values.max()
+    assert histogram.max == values.max()
+    assert histogram.total == values.sum()
+
+
+def test_merged_halves_equal_one_histogram():
+    values = _values().tolist()
+    whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i, value in enumerate(values):
+        whole.record_us(value)
+        (first if i % 2 else second).record_us(value)
+    first.merge(second)
+    assert (first.counts, first.count, first.total, first.max) == (
+        whole.counts, whole.count, whole.total, whole.max
+    )
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(analyzer_module.time, "time", clock.time)
+    return clock
+
+
+def _steady(analyzer, series, n, clock):
+    for i in range(n):
+        clock.now += 1
+        assert analyzer.observe(series, 10.0 + (i % 2)) is None
+
+
+def test_no_findings_during_warmup(clock):
+    analyzer = AnomalyAnalyzer(alpha=0.1, threshold=4.0, warmup=10, cooldown=60)
+    _steady(analyzer, "loop_lag", 5, clock)
+    assert analyzer.observe("loop_lag", 1000.0) is None  # 6th value: still warming up
+
+    analyzer = AnomalyAnalyzer(alpha=0.1, threshold=4.0, warmup=10, cooldown=60)
+    _steady(analyzer, "loop_lag", 20, clock)
+    finding = analyzer.observe("loop_lag", 1000.0)
+    assert finding is not None and finding.z > 4.0
+    assert finding.mean == pytest.approx(10.5, abs=0.5)  # Scored before folding in
+
+
+def test_cooldown_suppresses_repeats(clock):
+    analyzer = AnomalyAnalyzer(alpha=0.1, threshold=4.0, warmup=10, cooldown=60)
+    _steady(analyzer, "mt5_rtt", 30, clock)
+
+    assert analyzer.observe("mt5_rtt", 500.0) is not None
+    clock.now += 30
+    assert analyzer.observe("mt5_rtt", 500.0) is None  # Within the cooldown
+    # Another series has its own cooldown
+    _steady(analyzer, "db_pool", 30, clock)
+    assert analyzer.observe("db_pool", 500.0) is not None
+
+    clock.now += 31
+    assert analyzer.observe("mt5_rtt", 5000.0) is not None
+    assert analyzer.findings == 3
+
+
+def test_min_std_floor_uses_the_longest_prefix(clock):
+    analyzer = AnomalyAnalyzer(alpha=0.1, threshold=4.0, warmup=5, cooldown=0)
+    analyzer.min_std = {"endpoint:": 100.0, "endpoint:/api/v1/scanner": 1.0}
+    for series in ("endpoint:/api/v1/market", "endpoint:/api/v1/scanner"):
+        for _ in range(20):
+            analyzer.observe(series, 10.0)  # Flat: no variance of its own
+
+    assert analyzer.observe("endpoint:/api/v1/market", 50.0) is None  # 40 < 4 x 100
+    assert analyzer.observe("endpoint:/api/v1/scanner", 50.0) is not None
+
+
+class _Session:
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, rows):
+        if self.db.fail_after is not None and len(self.db.batches) >= self.db.fail_after:
+            raise ConnectionError("database down")
+        self.db.batches.append([row["description"] for row in rows])
+
+    async def commit(self):
+        pass
+
+
+class _Database:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after  # Batches accepted before failing
+        self.batches = []
+
+    def __call__(self):
+        return _Session(self)
+
+
+def _findings(n):
+    return [Finding(f"series-{i}", float(i), 0.0, 5.0) for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_puts_the_batch_back_in_order(monkeypatch):
+    writer = GuardianLogWriter(batch_size=2, max_queue=10)
+    for finding in _findings(5):
+        writer.record(finding)
+
+    monkeypatch.setattr(analyzer_module, "AsyncSessionLocal", _Database(fail_after=1))
+    with pytest.raises(ConnectionError):
+        await writer.flush()
+    # The first batch was written; the failed one is back at the front
+    assert [f.series for f in writer._queue] == ["series-2", "series-3", "series-4"]
+    assert writer.failed_flushes == 1
+    assert writer.written == 2
+
+    db = _Database()
+    monkeypatch.setattr(analyzer_module, "AsyncSessionLocal", db)
+    assert await writer.flush() == 3
+    assert [len(batch) for batch in db.batches] == [2, 1]
+    assert db.batches[0][0].startswith("series-2 ")
+    assert writer.stats()["queued"] == 0
+    assert writer.written == 5
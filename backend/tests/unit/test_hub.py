@@ -0,0 +1,50 @@
+"""
+Tests for WebSocket hub control messages
+"""
+
+import json
+
+import msgpack
+import pytest
+
+from app.realtime.hub import WebSocketHub, ClientConnection
+
+
+def _client():
+    hub = WebSocketHub()
+    return hub, ClientConnection(hub, websocket=None)
+
+
+def _replies(client):
+    return [json.loads(frame) for topic, frame in client._queue if topic is None]
+
+
+def _send(hub, client, request):
+    hub._handle_control(client, {"type": "websocket.receive", "text": json.dumps(request)})
+
+
+@pytest.mark.parametrize("request_", [["subscribe"], "subscribe", 42, None])
+def test_non_object_messages_get_an_error(request_):
+    hub, client = _client()
+    _send(hub, client, request_)
+    assert _replies(client) == [{"type": "error", "message": "Malformed message"}]
+    assert not client.closed
+
+
+def test_msgpack_non_object_gets_an_error():
+    hub, client = _client()
+    hub._handle_control(client, {"type": "websocket.receive", "bytes": msgpack.packb([1, 2])})
+    assert _replies(client)[0]["type"] == "error"
+
+
+def test_topics_are_coerced_to_names():
+    hub, client = _client()
+    _send(hub, client, {"action": "subscribe", "topics": "ticks:XAUUSD"})
+    _send(hub, client, {"action": "subscribe", "topics": ["positions", 7, {"a": 1}, None]})
+    _send(hub, client, {"action": "subscribe", "topics": {"account": True}})
+
+    assert client.topics == {"ticks:XAUUSD", "positions"}
+    assert [r["topics"] for r in _replies(client)][-1] == ["positions", "ticks:XAUUSD"]
+
+    _send(hub, client, {"action": "unsubscribe", "topics": "positions"})
+    assert client.topics == {"ticks:XAUUSD"}
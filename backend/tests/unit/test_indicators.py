@@ -0,0 +1,99 @@
+"""
+Tests that the vectorized indicator paths match the incremental ones
+"""
+
+import numpy as np
+import pytest
+
+from strategies.indicators import Indicator, EMA, RSI, ATR, RollingMax, RollingMin, VWAP, SwingPivots
+
+
+def _bars(n: int = 600, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    # Rounded to the tick so equal highs and lows occur
+    close = np.round(2000 + np.cumsum(rng.normal(0, 1.5, n)), 1)
+    high = close + np.round(rng.uniform(0, 2, n), 1)
+    low = close - np.round(rng.uniform(0, 2, n), 1)
+    volume = rng.integers(0, 50, n).astype(float)
+    volume[100:110] = 0.0  # A dead stretch
+    time = 1_700_000_000 + np.arange(n) * 900.0
+    return high, low, close, volume, time
+
+
+def _stream(indicator, *columns):
+    return np.array([indicator.update(*row) for row in zip(*(c.tolist() for c in columns))])
+
+
+@pytest.mark.parametrize("cls", [RollingMax, RollingMin])
+def test_rolling_extremes(cls):
+    high, *_ = _bars()
+    indicator = cls(20)
+    np.testing.assert_array_equal(indicator.batch(high), _stream(indicator.fresh(), high))
+
+
+def test_vwap_sessions_and_zero_volume():
+    high, low, close, volume, time = _bars()
+    volume[:3] = 0.0  # Nothing to average yet
+    indicator = VWAP(session_seconds=86400)
+    np.testing.assert_array_equal(
+        indicator.batch(high, low, close, volume, time),
+        _stream(indicator.fresh(), high, low, close, volume, time),
+    )
+
+
+def test_swing_pivots_match_confirmations():
+    high, low, *_ = _bars()
+    pivots = SwingPivots(left=3, right=2)
+    is_high, is_low = pivots.batch(high, low)
+
+    stream = pivots.fresh()
+    highs, lows = [], []
+    for h, lo in zip(high.tolist(), low.tolist()):
+        swing_high, swing_low = stream.update(h, lo)
+        if swing_high:
+            highs.append(swing_high[0])
+        if swing_low:
+            lows.append(swing_low[0])
+    assert highs == np.flatnonzero(is_high).tolist()
+    assert lows == np.flatnonzero(is_low).tolist()
+    assert highs and lows
+
+
+def test_smoothed_indicators_against_textbook_formulas():
+    high, low, close, *_ = _bars()
+    period = 14
+
+    ema = [np.mean(close[:period])]
+    for value in close[period:]:
+        ema.append(ema[-1] + 2 / (period + 1) * (value - ema[-1]))
+    np.testing.assert_allclose(EMA(period).batch(close)[period - 1:], ema, rtol=1e-12)
+
+    tr = np.maximum.reduce([high - low, np.abs(high - np.roll(close, 1)), np.abs(low - np.roll(close, 1))])
+    tr[0] = high[0] - low[0]
+    atr = [np.mean(tr[:period])]
+    for value in tr[period:]:
+        atr.append((atr[-1] * (period - 1) + value) / period)
+    np.testing.assert_allclose(ATR(period).batch(high, low, close)[period - 1:], atr, rtol=1e-12)
+
+    change = np.diff(close)
+    gain, loss = np.clip(change, 0, None), np.clip(-change, 0, None)
+    avg_gain, avg_loss = gain[:period].mean(), loss[:period].mean()
+    rsi = [100 - 100 / (1 + avg_gain / avg_loss)]
+    for g, lo in zip(gain[period:], loss[period:]):
+        avg_gain = (avg_gain * (period - 1) + g) / period
+        avg_loss = (avg_loss * (period - 1) + lo) / period
+        rsi.append(100 - 100 / (1 + avg_gain / avg_loss))
+    values = RSI(period).batch(close)
+    assert np.isnan(values[:period]).all()
+    np.testing.assert_allclose(values[period:], rsi, rtol=1e-10)
+
+
+def test_indicator_base_requires_update():
+    with pytest.raises(TypeError):
+        Indicator()
+
+    class NoUpdate(Indicator):
+        pass
+
+    with pytest.raises(TypeError):
+        NoUpdate()
@@ -0,0 +1,149 @@
+"""
+Tests for market data ingestion: buffer de-duplication and the COPY upsert
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.database.ingestion import (
+    COLUMNS, CREATE_STAGE_SQL, STAGE_TABLE, UPSERT_SQL, MarketDataIngestor,
+)
+
+
+class _Transaction:
+    def __init__(self, pg):
+        self.pg = pg
+
+    async def __aenter__(self):
+        self.pg.calls.append("begin")
+
+    async def __aexit__(self, exc_type, *exc):
+        self.pg.calls.append("rollback" if exc_type else "commit")
+        return False
+
+
+class _Pg:
+    """asyncpg connection stand-in recording what the ingestor runs."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.copied = []
+        self.fail = fail
+        self.release = asyncio.Event()  # A failing copy waits for this
+
+    def transaction(self):
+        return _Transaction(self)
+
+    async def execute(self, sql):
+        self.calls.append(sql)
+
+    async def copy_records_to_table(self, table, records, columns):
+        if self.fail:
+            await self.release.wait()
+            raise ConnectionError("database down")
+        self.calls.append(("copy", table, tuple(columns)))
+        self.copied.extend(records)
+
+
+class _Engine:
+    def __init__(self, pg):
+        self.pg = pg
+
+    def connect(self):
+        engine = self
+
+        class _Conn:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def get_raw_connection(self):
+                return type("Raw", (), {"driver_connection": engine.pg})()
+
+        return _Conn()
+
+
+def _ingestor(pg=None, **kwargs) -> MarketDataIngestor:
+    return MarketDataIngestor(engine=_Engine(pg or _Pg()), batch_size=100, flush_interval=60, **kwargs)
+
+
+def _bar(ingestor, t, close, timeframe="M1"):
+    ingestor.add(t, "XAUUSD", timeframe, close, close, close, close, 1)
+
+
+@pytest.mark.asyncio
+async def test_flush_stages_with_copy_then_upserts_once():
+    pg = _Pg()
+    ingestor = _ingestor(pg)
+    _bar(ingestor, 60, 2000.0)
+    _bar(ingestor, 120, 2001.0)
+
+    assert await ingestor.flush() == 2
+    assert pg.calls == [
+        "begin", CREATE_STAGE_SQL, ("copy", STAGE_TABLE, COLUMNS), UPSERT_SQL, "commit",
+    ]
+    assert "ON CONFLICT (time, symbol, timeframe) DO UPDATE" in UPSERT_SQL
+    assert "ON COMMIT DELETE ROWS" in CREATE_STAGE_SQL
+    assert [row[0] for row in pg.copied] == [
+        datetime.fromtimestamp(60, timezone.utc), datetime.fromtimestamp(120, timezone.utc),
+    ]
+    assert all(len(row) == len(COLUMNS) for row in pg.copied)
+    assert ingestor.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_open_bar_updates_collapse_to_the_latest():
+    pg = _Pg()
+    ingestor = _ingestor(pg)
+    for close in (2000.0, 2000.5, 2001.0):
+        _bar(ingestor, 60, close)
+    _bar(ingestor, 60, 1999.0, timeframe="M5")  # Another key
+
+    assert ingestor.queue_depth == 2
+    await ingestor.flush()
+    assert [(row[2], row[6]) for row in pg.copied] == [("M1", 2001.0), ("M5", 1999.0)]
+
+
+def test_ticks_in_one_second_keep_their_own_rows():
+    ingestor = _ingestor()
+    for msc, bid in ((1_700_000_000_100, 2000.0), (1_700_000_000_600, 2000.2), (1_700_000_000_600, 2000.3)):
+        ingestor.add_tick("XAUUSD", {"time": 1_700_000_000, "time_msc": msc, "bid": bid, "ask": bid + 0.1})
+
+    rows = list(ingestor._buffer.values())
+    assert [row[0].timestamp() for row in rows] == [1_700_000_000.1, 1_700_000_000.6]
+    assert rows[-1][6] == 2000.3  # Same millisecond: the later tick wins
+    assert rows[0][8] == pytest.approx(0.1)
+
+    ingestor.add_tick("XAUUSD", {"time": 1_700_000_001, "bid": 2000.0})  # No time_msc
+    assert ingestor.queue_depth == 3
+
+
+def test_full_buffer_sheds_the_oldest_rows():
+    ingestor = _ingestor(max_buffer=3)
+    for t in range(5):
+        _bar(ingestor, 60 * t, 2000.0 + t)
+    assert [row[0].timestamp() for row in ingestor._buffer.values()] == [120, 180, 240]
+    assert ingestor.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_without_overwriting_newer_updates():
+    pg = _Pg(fail=True)
+    ingestor = _ingestor(pg)
+    _bar(ingestor, 60, 2000.0)
+    _bar(ingestor, 120, 2001.0)
+
+    flush = asyncio.create_task(ingestor.flush())
+    await asyncio.sleep(0)  # The flush has taken the buffer and is copying
+    _bar(ingestor, 60, 2005.0)  # The open bar moves on meanwhile
+    pg.release.set()
+    with pytest.raises(ConnectionError):
+        await flush
+
+    assert pg.calls[-1] == "rollback"
+    assert ingestor.failed_flushes == 1
+    assert [row[6] for row in ingestor._buffer.values()] == [2005.0, 2001.0]
@@ -0,0 +1,112 @@
+"""
+Tests for the write-behind journal (replay, crashes, torn lines, quarantine)
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from app.config import settings
+from app.database.journal import WriteBehindJournal, TRADE
+
+
+class _Recorder:
+    """Stand-in for the database write: records rows or raises."""
+
+    def __init__(self, fail=None):
+        self.rows = []
+        self.fail = fail  # entry -> Exception or None
+
+    async def __call__(self, batch):
+        for entry in batch:
+            error = self.fail(entry) if self.fail else None
+            if error is not None:
+                raise error
+        self.rows.extend(batch)
+
+
+async def _journal(tmp_path, recorder) -> WriteBehindJournal:
+    journal = WriteBehindJournal(directory=str(tmp_path), batch_size=10, flush_interval=60)
+    journal._write = recorder
+    await journal.start()
+    return journal
+
+
+@pytest.mark.asyncio
+async def test_records_survive_a_crash_before_any_flush(tmp_path):
+    journal = await _journal(tmp_path, _Recorder())
+    journal.trade(id="a")
+    journal.audit("login")
+
+    # Crash: the descriptor goes away with whatever Python still buffered
+    journal._task.cancel()
+    await asyncio.gather(journal._task, return_exceptions=True)
+    os.close(journal._file.fileno())
+    journal._file = None
+
+    db = _Recorder()
+    journal = await _journal(tmp_path, db)
+    assert journal.replayed == 2
+    await journal.flush()
+    assert [e["kind"] for e in db.rows] == [TRADE, "audit"]
+    await journal.stop()
+
+
+@pytest.mark.asyncio
+async def test_torn_line_is_truncated_before_appending(tmp_path):
+    path = tmp_path / f"{settings.PROCESS_ROLE}-0.jsonl"
+    path.write_text(
+        json.dumps({"seq": 1, "kind": TRADE, "data": {"id": "a"}}) + "\n"
+        + '{"seq": 2, "kind": "tra'
+    )
+
+    down = _Recorder(fail=lambda entry: OSError("database down"))
+    journal = await _journal(tmp_path, down)
+    assert [e["seq"] for e in journal._queue] == [1]
+    journal.trade(id="b")
+    await journal.stop()
+
+    # Both the replayed record and the one written after restart survive
+    journal = await _journal(tmp_path, down)
+    assert [e["data"]["id"] for e in journal._queue] == ["a", "b"]
+    await journal.stop()
+
+
+@pytest.mark.asyncio
+async def test_bad_record_is_quarantined_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOURNAL_MAX_ATTEMPTS", 3)
+    db = _Recorder(fail=lambda entry: ValueError("bad row") if entry["data"]["id"] == "bad" else None)
+    journal = await _journal(tmp_path, db)
+    for trade_id in ("ok-1", "bad", "ok-2"):
+        journal.trade(id=trade_id)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await journal.flush()
+    assert journal.queue_depth == 3
+
+    await journal.flush()
+    assert journal.queue_depth == 0
+    assert [e["data"]["id"] for e in db.rows] == ["ok-1", "ok-2"]
+    assert journal.quarantined == 1
+    quarantine = os.path.splitext(journal.path)[0] + ".quarantine.jsonl"
+    with open(quarantine) as handle:
+        assert json.loads(handle.readline())["data"]["id"] == "bad"
+    await journal.stop()
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_never_quarantine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOURNAL_MAX_ATTEMPTS", 2)
+    db = _Recorder(fail=lambda entry: ConnectionRefusedError("database down"))
+    journal = await _journal(tmp_path, db)
+    journal.trade(id="a")
+    for _ in range(5):
+        with pytest.raises(OSError):
+            await journal.flush()
+    assert journal.queue_depth == 1
+    assert journal.quarantined == 0
+    journal._write = _Recorder()
+    await journal.stop()
@@ -0,0 +1,57 @@
+"""
+Tests for the precomputed session calendar against direct zoneinfo checks
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from strategies.kill_zones import SessionCalendar, DEFAULT_WINDOWS
+
+
+def _brute_force(ts: float) -> list:
+    """Active windows found by converting ``ts`` into each market's time."""
+    names = []
+    for window in DEFAULT_WINDOWS:
+        local = datetime.fromtimestamp(ts, ZoneInfo(window.tz))
+        for day in (local.date() - timedelta(days=1), local.date()):
+            if day.weekday() not in window.weekdays:
+                continue
+            start = datetime.combine(day, window.start, ZoneInfo(window.tz))
+            end_day = day + timedelta(days=1) if window.end <= window.start else day
+            end = datetime.combine(end_day, window.end, ZoneInfo(window.tz))
+            if start.timestamp() <= ts < end.timestamp():
+                names.append(window.name)
+                break
+    return names
+
+
+def _quarter_hours(first: date, days: int) -> np.ndarray:
+    start = datetime.combine(first, datetime.min.time(), timezone.utc).timestamp()
+    return start + np.arange(days * 96) * 900.0
+
+
+def test_year_end_in_sydney():
+    calendar = SessionCalendar()
+    ts = datetime(2026, 12, 31, 21, tzinfo=timezone.utc).timestamp()  # 08:00 Friday in Sydney
+    assert "sydney" in calendar.active(ts)
+    assert calendar.stats()["years"] == (2026, 2026)
+
+
+@pytest.mark.parametrize("first", [
+    date(2026, 3, 5),    # US, then UK clocks go forward
+    date(2026, 4, 2),    # Sydney clocks go back
+    date(2026, 10, 1),   # Sydney forward, UK and US back
+    date(2026, 12, 28),  # Year end
+])
+def test_matches_zoneinfo_across_transitions(first):
+    times = _quarter_hours(first, 35)
+    calendar = SessionCalendar()
+    labeled = calendar.label(times)
+    lookups = SessionCalendar()
+    for ts, mask in zip(times.tolist(), labeled.tolist()):
+        expected = _brute_force(ts)
+        assert calendar.names(mask) == expected, datetime.fromtimestamp(ts, timezone.utc)
+        assert lookups.active(ts) == expected, datetime.fromtimestamp(ts, timezone.utc)
@@ -0,0 +1,73 @@
+"""
+Tests for keyset paging of the bars endpoint
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.api.v1 import market
+from core.market_data import FIELDS
+
+
+class _FakeBars:
+    """Serves ``_fetch_chunks`` from memory, two rows per chunk like a cursor."""
+
+    def __init__(self, times):
+        self.bars = np.column_stack([times] + [np.asarray(times) * 0 + i for i in range(1, len(FIELDS))])
+        self.queries = []
+
+    async def __call__(self, sql, args):
+        self.queries.append((sql, args))
+        _, lower, upper, limit = args
+        times = self.bars[:, 0]
+        above = times > lower.timestamp() if "time > $2" in sql else times >= lower.timestamp()
+        rows = self.bars[above & (times < upper.timestamp())][:limit]
+        for i in range(0, len(rows), 2):
+            yield rows[i:i + 2]
+
+
+async def _page(**params):
+    response = await market.get_bars(
+        symbol="XAUUSD", timeframe="M1", start=None, end=None, after=params.get("after"),
+        limit=params.get("limit", 5000), max_points=params.get("max_points"), format="json",
+    )
+    body = b"".join([part async for part in response.body_iterator])
+    return json.loads(body), response.headers.get("x-next-cursor")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", [11, 12])
+async def test_pages_cover_every_bar_once_with_one_query_each(monkeypatch, count):
+    fake = _FakeBars(np.arange(count) * 60.0 + 1_700_000_040)
+    monkeypatch.setattr(market, "_fetch_chunks", fake)
+
+    seen, after, pages = [], None, 0
+    while True:
+        page, header = await _page(after=after, limit=4)
+        pages += 1
+        seen += [bar[0] for bar in page["bars"]]
+        after = page["next_cursor"]
+        if after is None:
+            assert header is None
+            break
+        assert page["bars"][-1][0] == after
+        assert float(header) == after
+
+    assert seen == fake.bars[:, 0].tolist()
+    assert pages == 3
+    assert len(fake.queries) == pages
+    assert all(args[-1] == 5 for _, args in fake.queries)  # limit + 1
+
+
+@pytest.mark.asyncio
+async def test_downsampled_page_keeps_the_cursor(monkeypatch):
+    fake = _FakeBars(np.arange(100) * 60.0 + 1_700_000_040)
+    monkeypatch.setattr(market, "_fetch_chunks", fake)
+
+    page, _ = await _page(limit=50, max_points=10)
+    times = [bar[0] for bar in page["bars"]]
+    assert len(times) == 10
+    assert times[0] == fake.bars[0, 0] and times[-1] == fake.bars[49, 0]
+    assert page["next_cursor"] == fake.bars[49, 0]
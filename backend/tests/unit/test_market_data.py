@@ -0,0 +1,84 @@
+"""
+Tests that OHLCV ring buffer views match a plain list of bars
+"""
+
+import numpy as np
+import pytest
+
+from core.market_data import FIELDS, TIME, CLOSE, OHLCVRingBuffer
+
+
+def _row(t: float, close: float):
+    return (t, close - 1, close + 2, close - 2, close, 10.0, 0.3)
+
+
+def _assert_tail(buffer: OHLCVRingBuffer, reference: list, n=None):
+    expected = reference if n is None else reference[-n:] if n else []
+    bars = buffer.last(n)
+    assert len(bars.time) == len(expected)
+    for i in range(len(FIELDS)):
+        np.testing.assert_array_equal(bars[i], [row[i] for row in expected])
+
+
+def test_wraparound_matches_a_list_reference():
+    rng = np.random.default_rng(5)
+    capacity = 7
+    buffer, reference = OHLCVRingBuffer(capacity), []
+    t = 0.0
+    for _ in range(200):
+        if reference and rng.random() < 0.3:
+            row = _row(t, float(rng.normal(2000, 5)))  # Update of the open bar
+            assert buffer.append(*row)
+            reference[-1] = row
+        else:
+            t += 60
+            row = _row(t, float(rng.normal(2000, 5)))
+            assert buffer.append(*row)
+            reference.append(row)
+        reference = reference[-capacity:]
+
+        assert len(buffer) == len(reference)
+        assert buffer.last_time == reference[-1][TIME]
+        for n in (None, 0, 1, 3, capacity, capacity + 5):
+            _assert_tail(buffer, reference, n)
+
+
+def test_out_of_order_bar_is_ignored():
+    buffer = OHLCVRingBuffer(4)
+    buffer.append(*_row(120, 2000.0))
+    assert not buffer.append(*_row(60, 1990.0))
+    assert buffer.last().close.tolist() == [2000.0]
+
+
+def test_extend_wraps_and_keeps_the_newest_bars():
+    buffer = OHLCVRingBuffer(5)
+    buffer.append(*_row(0, 1999.0))
+    reference = [_row(0, 1999.0)]
+    for start in (60, 600):
+        rows = [_row(start + 60 * i, 2000.0 + i) for i in range(8 if start == 600 else 3)]
+        buffer.extend(np.array(rows).T)
+        reference = (reference + rows)[-5:]
+        _assert_tail(buffer, reference)
+    np.testing.assert_array_equal(buffer.to_columns(), np.array(reference).T)
+
+
+def test_views_are_zero_copy_and_contiguous():
+    buffer = OHLCVRingBuffer(4)
+    for i in range(6):  # Wrapped past the end once
+        buffer.append(*_row(60 * i, 2000.0 + i))
+
+    bars = buffer.last(3)
+    close = buffer.column(CLOSE)
+    for view in (*bars, close):
+        assert np.shares_memory(view, buffer._data)
+        assert view.flags.c_contiguous
+    assert close.tolist() == [2002.0, 2003.0, 2004.0, 2005.0]
+
+    # A view sees the in-place update of the forming bar
+    buffer.append(*_row(300, 2010.0))
+    assert bars.close[-1] == 2010.0
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        OHLCVRingBuffer(0)
@@ -0,0 +1,169 @@
+"""
+Tests for the array-backed order book, imbalance and liquidity heatmap
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from microstructure.imbalance import ImbalanceTracker
+from microstructure.liquidity_heatmap import LiquidityHeatmap, FIRST_LEVEL
+from microstructure.order_flow import OrderBook, MicrostructureEngine
+
+TICK = 0.01
+DEPTH = 5
+
+
+def _book(levels: int = 64) -> OrderBook:
+    return OrderBook("XAUUSD", TICK, levels=levels, imbalance=ImbalanceTracker(DEPTH))
+
+
+def _price(ticks: int) -> float:
+    return round(ticks * TICK, 2)
+
+
+class _ReferenceBook:
+    """Dict of ticks -> volume per side; the obvious, slow implementation."""
+
+    def __init__(self):
+        self.bids = {}
+        self.asks = {}
+
+    def set(self, side: dict, ticks: int, volume: float):
+        if volume > 0:
+            side[ticks] = volume
+        else:
+            side.pop(ticks, None)
+
+    def best_bid(self):
+        return max(self.bids) if self.bids else None
+
+    def best_ask(self):
+        return min(self.asks) if self.asks else None
+
+    def imbalance(self) -> float:
+        bid, ask = self.best_bid(), self.best_ask()
+        bid_volume = sum(v for t, v in self.bids.items() if bid - DEPTH < t <= bid) if bid else 0.0
+        ask_volume = sum(v for t, v in self.asks.items() if ask <= t < ask + DEPTH) if ask else 0.0
+        total = bid_volume + ask_volume
+        return (bid_volume - ask_volume) / total if total > 0 else 0.0
+
+
+def _ticks(price):
+    return None if price is None else int(round(price / TICK))
+
+
+def test_book_and_imbalance_match_a_dict_reference_as_the_market_drifts():
+    rng = np.random.default_rng(7)
+    book, ref = _book(levels=32), _ReferenceBook()
+    mid = 200_000
+    book.apply([[_price(mid - 1), 1.0]], [[_price(mid + 1), 1.0]], snapshot=True)
+    ref.set(ref.bids, mid - 1, 1.0)
+    ref.set(ref.asks, mid + 1, 1.0)
+
+    for _ in range(3000):
+        mid += int(rng.integers(-1, 2))
+        bids, asks = [], []
+        # Levels on the wrong side of the new mid, or too far from it, go away
+        for t in [t for t in ref.bids if t >= mid or t < mid - 10]:
+            bids.append([_price(t), 0.0])
+        for t in [t for t in ref.asks if t <= mid or t > mid + 10]:
+            asks.append([_price(t), 0.0])
+        for _ in range(3):
+            bids.append([_price(mid - int(rng.integers(1, 6))), float(rng.integers(0, 5))])
+            asks.append([_price(mid + int(rng.integers(1, 6))), float(rng.integers(0, 5))])
+        book.apply(bids, asks)
+        for price, volume in bids:
+            ref.set(ref.bids, _ticks(price), volume)
+        for price, volume in asks:
+            ref.set(ref.asks, _ticks(price), volume)
+
+        assert book.synced
+        assert _ticks(book.bid_price) == ref.best_bid()
+        assert _ticks(book.ask_price) == ref.best_ask()
+        assert book.imbalance.imbalance == pytest.approx(ref.imbalance())
+
+    assert book.recenters > 0
+    assert book.dropped == 0
+
+
+def test_a_deep_level_inside_the_window_does_not_move_the_touch():
+    book = _book(levels=64)
+    book.apply([[2000.00, 1.0]], [[2000.01, 1.0]], snapshot=True)
+    book.apply([[1999.50, 3.0]])
+
+    assert (book.bid_price, book.ask_price) == (2000.00, 2000.01)
+    assert book.bids[book._index(1999.50, 0)] == 3.0
+
+
+def test_a_level_too_deep_for_the_window_is_dropped():
+    book = _book(levels=64)
+    book.apply([[2000.00, 1.0]], [[2000.01, 1.0]], snapshot=True)
+    book.apply([[1999.00, 3.0]], [[2001.00, 3.0]])
+
+    assert (book.bid_price, book.ask_price) == (2000.00, 2000.01)
+    assert book.dropped == 2
+    assert book.synced
+
+
+def test_a_crossing_level_outside_the_window_waits_for_a_snapshot():
+    book = _book(levels=64)
+    book.apply([[2000.00, 1.0]], [[2000.01, 1.0]], snapshot=True)
+    book.apply(asks=[[1999.00, 3.0]])
+
+    assert not book.synced
+    assert book.desyncs == 1
+    book.apply([[2000.50, 1.0]])
+    assert book.bid_price == 2000.00  # Increments are ignored
+
+    book.apply([[1998.99, 1.0]], [[1999.00, 1.0]], snapshot=True)
+    assert book.synced
+    assert (book.bid_price, book.ask_price) == (1998.99, 1999.00)
+
+
+def test_heatmap_exports_only_the_rows_sampled_since():
+    book = _book(levels=64)
+    book.apply([[2000.00, 1.0], [1999.99, 2.0]], [[2000.01, 4.0]], snapshot=True)
+    heatmap = LiquidityHeatmap(rows=8, columns=4, interval=1.0)
+    for t in range(3):
+        heatmap.sample(book, float(t))
+
+    first = heatmap.export()
+    assert (first["rows"], first["first"], first["written"]) == (3, 0, 3)
+    assert len(first["data"]) == 3 * first["row_width"] * 8
+
+    for t in range(3, 9):
+        heatmap.sample(book, float(t))
+    update = heatmap.export(since=3)
+    # Only 4 rows are retained: rows 3 and 4 are gone, which `first` shows
+    assert (update["rows"], update["first"], update["written"]) == (4, 5, 9)
+    rows = np.frombuffer(update["data"], dtype=update["dtype"]).reshape(update["rows"], update["row_width"])
+    assert rows[:, 0].tolist() == [5.0, 6.0, 7.0, 8.0]
+    assert rows[0, FIRST_LEVEL:].sum() == 7.0
+
+    assert heatmap.export(since=9)["rows"] == 0
+
+
+@pytest.mark.asyncio
+async def test_engine_publishes_heatmap_rows_once():
+    engine = MicrostructureEngine({"XAUUSD": TICK})
+    flow = engine.flow("XAUUSD")
+    flow.book.apply([[2000.00, 1.0]], [[2000.01, 1.0]], snapshot=True)
+    published = []
+
+    async def publish(topic, payload):
+        if topic.startswith("heatmap:"):
+            published.append(payload["rows"])
+
+    task = asyncio.create_task(engine.publish_forever(publish, interval=0.01))
+    for t in range(3):
+        flow.heatmap.sample(flow.book, float(t))
+    await asyncio.sleep(0.05)
+    for t in range(3, 5):
+        flow.heatmap.sample(flow.book, float(t))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert published == [3, 2]
@@ -0,0 +1,143 @@
+"""
+Tests for micro-batched inference: batching, routing, hot-swap and failures
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from ai.predictor import ModelRegistry, InferenceServer
+
+
+class Constant:
+    def __init__(self, value: float):
+        self.value = value
+
+    def predict(self, features):
+        return np.full(len(features), self.value)
+
+
+class Recording(Constant):
+    """Constant model that records the shape of every matrix it is given."""
+
+    def __init__(self, value: float, n_inputs=None):
+        super().__init__(value)
+        self.calls = []
+        if n_inputs is not None:
+            self.n_inputs = n_inputs
+
+    def predict(self, features):
+        self.calls.append(features.shape)
+        return super().predict(features)
+
+
+class Broken:
+    def predict(self, features):
+        raise ValueError("bad input")
+
+
+@pytest.mark.asyncio
+async def test_failing_model_is_left_out_of_the_batch():
+    registry = ModelRegistry()
+    registry.register("a", lambda: Constant(0.2))
+    registry.register("b", lambda: Constant(0.8), weight=3.0)
+    registry.register("broken", Broken)
+    server = InferenceServer(registry, window_ms=1)
+
+    results = await asyncio.gather(*(server.predict(np.ones(3)) for _ in range(4)))
+
+    for result in results:
+        assert set(result) == {"a", "b", "ensemble"}
+        assert result["ensemble"] == pytest.approx(0.65)
+    assert server.model_errors == 1
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_fails_only_when_every_model_does():
+    registry = ModelRegistry()
+    registry.register("broken", Broken)
+    server = InferenceServer(registry, window_ms=1)
+    with pytest.raises(RuntimeError):
+        await server.predict(np.ones(3))
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_retried_after_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_LOAD_BACKOFF", 0.05)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model file busy")
+        return Constant(0.5)
+
+    registry = ModelRegistry()
+    registry.register("flaky", flaky)
+    assert await registry.resident() == {}
+    assert await registry.resident() == {}  # Still backing off
+    assert registry.names() == ["flaky"]
+    assert registry.status()["flaky"]["load_failures"] == 1
+
+    await asyncio.sleep(0.06)
+    assert set(await registry.resident()) == {"flaky"}
+    assert len(attempts) == 2
+    assert registry.status()["flaky"]["load_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_batch():
+    model = Recording(0.5)
+    registry = ModelRegistry()
+    registry.register("a", lambda: model)
+    server = InferenceServer(registry, window_ms=20)
+
+    await asyncio.gather(*(server.predict(np.full(3, i)) for i in range(5)))
+
+    assert model.calls == [(5, 3)]
+    assert (server.batches, server.rows) == (1, 5)
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_models_only_see_rows_of_their_width():
+    trees = Recording(0.2, n_inputs=3)
+    lstm = Recording(0.9, n_inputs=6)
+    registry = ModelRegistry()
+    registry.register("trees", lambda: trees)
+    registry.register("lstm", lambda: lstm)
+    server = InferenceServer(registry, window_ms=20)
+
+    short, long, _ = await asyncio.gather(
+        server.predict(np.ones(3)), server.predict(np.ones(6)), server.predict(np.ones(3))
+    )
+
+    assert short == {"trees": 0.2, "ensemble": 0.2}
+    assert long == {"lstm": 0.9, "ensemble": 0.9}
+    assert trees.calls == [(2, 3)]
+    assert lstm.calls == [(1, 6)]
+    assert server.model_errors == 0
+    with pytest.raises(RuntimeError, match="No model takes 4 features"):
+        await server.predict(np.ones(4))
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_hot_swapped_model_serves_the_next_batch():
+    registry = ModelRegistry()
+    registry.register("a", lambda: Constant(0.2))
+    server = InferenceServer(registry, window_ms=1)
+    assert (await server.predict(np.ones(3)))["a"] == 0.2
+
+    registry.swap("a", Constant(0.7))
+    assert (await server.predict(np.ones(3)))["a"] == 0.7
+    assert registry.status()["a"]["version"] == 2
+
+    await registry.reload("a", lambda: Constant(0.4))
+    assert (await server.predict(np.ones(3)))["a"] == 0.4
+    assert registry.status()["a"]["version"] == 3
+    await server.stop()
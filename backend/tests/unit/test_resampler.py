@@ -0,0 +1,71 @@
+"""
+Tests for the live M1 -> coarse timeframe resampler
+"""
+
+import numpy as np
+
+from core.market_data import Bars
+from core.resampler import Resampler
+
+
+def _m1(n: int, start: float = 0.0) -> Bars:
+    rng = np.random.default_rng(7)
+    close = 2000 + np.cumsum(rng.normal(0, 0.5, n))
+    return Bars(
+        time=start + 60.0 * np.arange(n),
+        open=close - 0.2,
+        high=close + 1.0 + rng.random(n),
+        low=close - 1.0 - rng.random(n),
+        close=close,
+        volume=rng.integers(1, 100, n).astype(np.float64),
+        spread=np.full(n, 0.3),
+    )
+
+
+def _bar(bars: Bars, i: int) -> dict:
+    return {k: float(getattr(bars, k)[i]) for k in Bars._fields}
+
+
+def _expected(bars: Bars, start: float, end: float) -> dict:
+    m = (bars.time >= start) & (bars.time < end)
+    return {
+        "time": start,
+        "open": bars.open[m][0],
+        "high": bars.high[m].max(),
+        "low": bars.low[m].min(),
+        "close": bars.close[m][-1],
+        "volume": bars.volume[m].sum(),
+    }
+
+
+def _check(bar: dict, expected: dict):
+    for key, value in expected.items():
+        assert np.isclose(bar[key], value), key
+
+
+def test_first_bucket_is_seeded_from_history():
+    bars = _m1(180)
+    started = 100  # Process starts at minute 100 of the H1 bucket 60..120
+    history = Bars(*(col[:started] for col in bars))
+    resampler = Resampler(["H1", "H4"])
+
+    out = dict(resampler.on_bar("XAUUSD", _bar(bars, started), history))
+    _check(out["H1"], _expected(bars, 3600, 60 * (started + 1)))
+    _check(out["H4"], _expected(bars, 0, 60 * (started + 1)))
+
+    for i in range(started + 1, 180):
+        out = dict(resampler.on_bar("XAUUSD", _bar(bars, i)))
+    _check(out["H1"], _expected(bars, 7200, 10800))
+    _check(out["H4"], _expected(bars, 0, 10800))
+
+
+def test_forming_m1_update_is_not_double_counted():
+    bars = _m1(30)
+    history = Bars(*(col[:10] for col in bars))
+    resampler = Resampler(["M15"])
+    first = _bar(bars, 10)
+    resampler.on_bar("XAUUSD", first, history)
+    updated = {**first, "close": first["close"] + 1, "volume": first["volume"] + 5}
+    out = dict(resampler.on_bar("XAUUSD", updated))
+    assert np.isclose(out["M15"]["volume"], bars.volume[:11].sum() + 5)
+    assert not resampler.needs_history("XAUUSD")
@@ -0,0 +1,63 @@
+"""
+Tests for the scanner's cycle deadline
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from ai.scanner import SmartScanner
+from core.market_data import Bars
+
+
+class _Cache:
+    """Serves random bars; ``slow`` symbols never answer within a cycle."""
+
+    def __init__(self, slow=()):
+        self.slow = set(slow)
+        self.slow_tasks = []
+
+    async def last(self, symbol, timeframe, n):
+        if symbol in self.slow:
+            self.slow_tasks.append(asyncio.current_task())
+            await asyncio.sleep(10)
+        rng = np.random.default_rng(len(symbol))
+        close = 2000 + np.cumsum(rng.normal(0, 1, n))
+        return Bars(
+            np.arange(n) * 60.0, close, close + 1, close - 1, close,
+            rng.integers(1, 50, n).astype(float), np.zeros(n),
+        )
+
+
+def _scanner(cache) -> SmartScanner:
+    scanner = SmartScanner(
+        cache=cache, symbols=["XAUUSD", "EURUSD", "SLOW"], timeframes=["M5"],
+        deadline=0.2, lookback=120,
+    )
+    scanner.start = lambda: None  # Score in the default thread pool
+    return scanner
+
+
+@pytest.mark.asyncio
+async def test_slow_symbol_is_skipped_at_the_deadline():
+    cache = _Cache(slow=["SLOW"])
+    scanner = _scanner(cache)
+
+    cycle = await scanner.run_cycle()
+
+    assert cycle.skipped == ["SLOW:M5"]
+    assert sorted(r.symbol for r in cycle.results) == ["EURUSD", "XAUUSD"]
+    assert cycle.duration_ms < 1000
+    # The skipped scan was cancelled and awaited, not left running
+    assert [task.cancelled() for task in cache.slow_tasks] == [True]
+    assert b'"status": "degraded"' in scanner.snapshot_json
+
+
+@pytest.mark.asyncio
+async def test_cycle_without_stragglers_is_ok():
+    scanner = _scanner(_Cache())
+    cycle = await scanner.run_cycle()
+    assert cycle.skipped == [] and cycle.errors == {}
+    assert len(cycle.results) == 3
+    assert b'"status": "ok"' in scanner.snapshot_json
@@ -0,0 +1,145 @@
+"""
+Tests for scheduler triggers and job runs (firing, overlap, run_now)
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from services.scheduler import Scheduler, IntervalTrigger, BarCloseTrigger, CronTrigger
+
+
+def _utc(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_interval_fires_on_epoch_aligned_boundaries():
+    trigger = IntervalTrigger(60, offset=5)
+    assert trigger.next_fire(_utc(2026, 1, 5, 10, 0, 30)) == _utc(2026, 1, 5, 10, 1, 5)
+    # Exactly on a fire time: the next one, never the same instant again
+    assert trigger.next_fire(_utc(2026, 1, 5, 10, 1, 5)) == _utc(2026, 1, 5, 10, 2, 5)
+    with pytest.raises(ValueError):
+        IntervalTrigger(0)
+
+
+def test_bar_close_fires_just_after_each_bar():
+    trigger = BarCloseTrigger("M5", offset=0.2)
+    assert trigger.next_fire(_utc(2026, 1, 5, 10, 3)) == _utc(2026, 1, 5, 10, 5) + 0.2
+    assert trigger.next_fire(_utc(2026, 1, 5, 10, 5) + 0.2) == _utc(2026, 1, 5, 10, 10) + 0.2
+    assert BarCloseTrigger("H4").next_fire(_utc(2026, 1, 5, 5)) == _utc(2026, 1, 5, 8) + 0.2
+    with pytest.raises(ValueError):
+        BarCloseTrigger("M7")
+
+
+def test_cron_fires_in_its_time_zone_across_dst():
+    trigger = CronTrigger("30 9 * * 1-5", tz="America/New_York")
+    new_york = ZoneInfo("America/New_York")
+    # Saturday 7 March 2026 -> Monday 9 March, the first weekday after DST starts
+    fire = trigger.next_fire(datetime(2026, 3, 7, 12, 0, tzinfo=new_york).timestamp())
+    assert datetime.fromtimestamp(fire, new_york) == datetime(2026, 3, 9, 9, 30, tzinfo=new_york)
+    assert fire == _utc(2026, 3, 9, 13, 30)  # EDT, UTC-4
+
+
+def test_cron_steps_and_day_or_weekday():
+    every_15 = CronTrigger("*/15 * * * *")
+    assert every_15.next_fire(_utc(2026, 1, 5, 10, 7)) == _utc(2026, 1, 5, 10, 15)
+    assert every_15.next_fire(_utc(2026, 1, 5, 10, 45)) == _utc(2026, 1, 5, 11, 0)
+
+    # Restricted day and weekday match if either does: the 1st or any Sunday
+    trigger = CronTrigger("0 0 1 * 0")
+    assert trigger.next_fire(_utc(2026, 1, 1, 12)) == _utc(2026, 1, 4)  # Sunday
+    assert trigger.next_fire(_utc(2026, 1, 25, 12)) == _utc(2026, 2, 1)  # The 1st (a Sunday too)
+    assert trigger.next_fire(_utc(2026, 5, 25, 12)) == _utc(2026, 5, 31)
+
+    for bad in ("* * * *", "60 * * * *", "*/0 * * * *"):
+        with pytest.raises(ValueError):
+            CronTrigger(bad)
+
+
+@pytest.mark.asyncio
+async def test_interval_job_fires_repeatedly():
+    scheduler = Scheduler(max_workers=1)
+    fired = []
+
+    async def job():
+        fired.append(time.time())
+
+    scheduler.add("tick", job, IntervalTrigger(0.05))
+    scheduler.start()
+    await asyncio.sleep(0.28)
+    await scheduler.stop()
+
+    assert 4 <= len(fired) <= 6
+    assert scheduler.jobs["tick"].runs == len(fired)
+
+
+@pytest.mark.asyncio
+async def test_overlapping_runs_are_skipped():
+    scheduler = Scheduler(max_workers=1)
+    active, peak = [], []
+
+    async def slow():
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.12)
+        active.pop()
+
+    scheduler.add("slow", slow, IntervalTrigger(0.03))
+    scheduler.start()
+    await asyncio.sleep(0.3)
+    job = scheduler.jobs["slow"]
+    runs, skipped = job.runs, job.skipped
+    await scheduler.stop()
+
+    assert max(peak) == 1
+    assert runs >= 1
+    assert skipped >= 3
+
+
+@pytest.mark.asyncio
+async def test_run_now_while_running_queues_one_follow_up():
+    scheduler = Scheduler(max_workers=1)
+    started = asyncio.Event()
+    calls = []
+
+    async def job():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0.05)
+
+    scheduler.add("job", job, IntervalTrigger(3600))
+    scheduler.start()
+    await asyncio.sleep(0)
+    scheduler.run_now("job")
+    await started.wait()
+    for _ in range(3):
+        scheduler.run_now("job")  # Collapse into a single follow-up run
+    await asyncio.sleep(0.2)
+    await scheduler.stop()
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_plain_functions_run_in_a_thread_and_failures_are_counted():
+    scheduler = Scheduler(max_workers=1)
+    threads = []
+
+    def blocking():
+        threads.append(threading.current_thread())
+        raise RuntimeError("boom")
+
+    scheduler.add("blocking", blocking, IntervalTrigger(3600))
+    scheduler.start()
+    await asyncio.sleep(0)
+    scheduler.run_now("blocking")
+    await asyncio.sleep(0.1)
+    job = scheduler.jobs["blocking"]
+    await scheduler.stop()
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert (job.runs, job.failed, job.last_error) == (1, 1, "boom")
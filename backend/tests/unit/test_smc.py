@@ -0,0 +1,62 @@
+"""
+Tests that the SMC batch mode reproduces the incremental detector
+"""
+
+import numpy as np
+import pytest
+
+from strategies.smc import SMCDetector, BULLISH
+
+
+class RecordingDetector(SMCDetector):
+    """Keeps every zone it creates, mitigated ones included."""
+
+    def reset(self, max_events=None):
+        super().reset(max_events)
+        self.created = []
+
+    def _add_zone(self, *args):
+        zone = super()._add_zone(*args)
+        self.created.append(zone)
+        return zone
+
+
+def _bars(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    # Trending stretches, gaps and prices on a coarse tick (equal highs/lows)
+    drift = np.repeat(rng.normal(0, 0.6, n // 50 + 1), 50)[:n]
+    close = np.round(2000 + np.cumsum(drift + rng.normal(0, 2, n)), 0)
+    open_ = np.concatenate(([2000.0], close[:-1])) + np.round(rng.normal(0, 1, n), 0)
+    high = np.maximum(open_, close) + np.round(rng.uniform(0, 3, n), 0)
+    low = np.minimum(open_, close) - np.round(rng.uniform(0, 3, n), 0)
+    time = 1_700_000_000 + np.arange(n) * 300.0
+    return time, open_, high, low, close
+
+
+@pytest.mark.parametrize("seed,left,right", [(1, 2, 2), (2, 3, 1), (3, 1, 3)])
+def test_batch_matches_update(seed, left, right):
+    bars = _bars(3000, seed)
+    detector = RecordingDetector(left, right, max_events=100_000)
+    for row in zip(*(column.tolist() for column in bars)):
+        detector.update(*row)
+
+    result = SMCDetector(left, right).batch(*bars)
+    assert [e.to_dict() for e in result.events] == [e.to_dict() for e in detector.events]
+    assert [z.to_dict() for z in result.zones] == [z.to_dict() for z in detector.created]
+    kinds = {e.kind for e in result.events}
+    assert kinds == {"bos", "choch", "sweep"}
+
+
+def test_zone_index_matches_open_zones():
+    bars = _bars(2000, 5)
+    detector = RecordingDetector(bucket_size=2.0)
+    for row in zip(*(column.tolist() for column in bars)):
+        detector.update(*row)
+    open_zones = [z for z in detector.created if z.mitigated is None]
+    assert open_zones
+
+    for price in np.arange(bars[3].min(), bars[2].max(), 0.25).tolist():
+        expected = {z.id for z in open_zones if z.bottom <= price <= z.top}
+        assert {z.id for z in detector.in_zone(price)} == expected
+        bullish = {z.id for z in open_zones if z.bottom <= price <= z.top and z.direction == BULLISH}
+        assert {z.id for z in detector.in_zone(price, BULLISH)} == bullish
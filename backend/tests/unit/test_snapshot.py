@@ -0,0 +1,65 @@
+"""
+Tests for the account snapshot shared between the MT5 owner and API workers
+"""
+
+import pytest
+
+from app.mt5.snapshot import AccountSnapshotService, ACCOUNT, POSITIONS, SNAPSHOT
+
+
+class FakeConnector:
+    is_connected = True
+
+    def __init__(self):
+        self.account = {"balance": 1000.0, "equity": 1000.0}
+        self.positions = [{"ticket": 1, "profit": 5.0}]
+
+    async def get_state(self):
+        return dict(self.account), list(self.positions)
+
+
+def _wire():
+    owner = AccountSnapshotService(FakeConnector(), stale_after=10.0)
+    published = []
+    owner.listeners.append(lambda topic, payload: published.append((topic, payload)))
+    return owner, published
+
+
+@pytest.mark.asyncio
+async def test_every_refresh_publishes_state_with_owner_times():
+    owner, published = _wire()
+    await owner.refresh()
+    await owner.refresh()  # Nothing changed
+
+    topics = [topic for topic, _ in published]
+    assert topics == [ACCOUNT, POSITIONS, SNAPSHOT, SNAPSHOT]
+    assert published[-1][1]["account_at"] == owner.account.updated_at
+
+
+@pytest.mark.asyncio
+async def test_late_worker_adopts_state_and_owner_age():
+    owner, published = _wire()
+    await owner.refresh()
+    owner.account.updated_at -= 30  # As if the owner refreshed 30 s ago
+    owner.positions.updated_at -= 30
+
+    worker = AccountSnapshotService(stale_after=10.0)
+    assert (await worker.get(ACCOUNT))["data"] is None
+    worker.apply(SNAPSHOT, owner.export())
+
+    account = await worker.get(ACCOUNT)
+    positions = await worker.get(POSITIONS)
+    assert account["data"] == {"balance": 1000.0, "equity": 1000.0}
+    assert positions["data"] == [{"ticket": 1, "profit": 5.0}]
+    assert account["stale"] and positions["stale"]
+    assert positions["age"] >= 30
+
+    await owner.refresh()
+    worker.apply(SNAPSHOT, published[-1][1])
+    assert not (await worker.get(POSITIONS))["stale"]
+
+
+def test_change_topics_are_not_adopted():
+    worker = AccountSnapshotService()
+    worker.apply(POSITIONS, {"1": {"ticket": 1}})
+    assert worker.positions.data is None
@@ -0,0 +1,94 @@
+"""
+Tests for the MT5 market data stream against the fake ZeroMQ bridge
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+import zmq
+import zmq.asyncio
+
+from app.mt5.fake_server import FakeMT5Server
+from app.mt5.stream import MarketDataStream, tick_topic, COALESCE
+
+SYMBOL = "XAUUSD"
+
+
+@pytest_asyncio.fixture
+async def server():
+    server = FakeMT5Server(address="tcp://127.0.0.1:*", stream_address="tcp://127.0.0.1:*")
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def stream(server):
+    context = zmq.asyncio.Context()
+    stream = MarketDataStream(context, server.pub_socket.getsockopt(zmq.LAST_ENDPOINT).decode())
+    yield stream
+    await stream.stop()
+    context.term()
+
+
+async def _first_event(server, subscription):
+    """Publish ticks until the SUB socket has joined and one arrives."""
+    for _ in range(100):
+        await server.publish_tick(SYMBOL, 2000.0, 2000.1)
+        try:
+            return await asyncio.wait_for(subscription.__anext__(), 0.05)
+        except asyncio.TimeoutError:
+            continue
+    raise AssertionError("stream never delivered an event")
+
+
+@pytest.mark.asyncio
+async def test_malformed_messages_are_skipped_and_counted(server, stream):
+    subscription = stream.subscribe([tick_topic(SYMBOL)])
+    stream.start()
+    await _first_event(server, subscription)
+
+    topic = tick_topic(SYMBOL).encode()
+    for frames in (
+        [topic, b"[1, 2]"],  # Not an object
+        [topic, b"{not json"],
+        [topic, b'{"seq": "x"}'],
+        [topic + b"\xff", b"{}"],  # Topic is not UTF-8
+        [topic],  # Missing body frame
+    ):
+        await server.pub_socket.send_multipart(frames)
+    await server.publish_tick(SYMBOL, 2001.0, 2001.1)
+
+    event = await asyncio.wait_for(subscription.__anext__(), 1.0)
+    assert event.data["bid"] == 2001.0
+    assert stream.malformed == 5
+    assert not stream._task.done()
+
+
+@pytest.mark.asyncio
+async def test_gaps_are_reported_per_subscription(server, stream):
+    subscription = stream.subscribe([tick_topic(SYMBOL)])
+    stream.start()
+    first = await _first_event(server, subscription)
+
+    await server.publish(tick_topic(SYMBOL), {"bid": 1.0}, seq=first.seq + 4)
+    event = await asyncio.wait_for(subscription.__anext__(), 1.0)
+    assert event.gap == 3
+    assert stream.gaps == 3
+
+
+@pytest.mark.asyncio
+async def test_coalesce_keeps_only_the_newest_event_per_topic(server, stream):
+    subscription = stream.subscribe([tick_topic(SYMBOL)], policy=COALESCE)
+    stream.start()
+    await _first_event(server, subscription)
+
+    for bid in (1.0, 2.0, 3.0):
+        await server.publish_tick(SYMBOL, bid, bid + 0.1)
+    await asyncio.sleep(0.1)  # Let all three arrive before consuming
+
+    event = await asyncio.wait_for(subscription.__anext__(), 1.0)
+    assert event.data["bid"] == 3.0
+    assert event.gap == 2
+    assert subscription.dropped == 2
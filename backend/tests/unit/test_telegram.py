@@ -0,0 +1,131 @@
+"""
+Tests for the Telegram alert dispatcher against the stub Bot API
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.config import settings
+from telegram.alerts import AlertDispatcher, alert_key
+from telegram.bot import TelegramBot, TelegramError
+from telegram.commands import CommandRouter
+from telegram.stub_server import StubTelegramServer
+
+CHAT = "42"
+
+
+@pytest_asyncio.fixture
+async def stub():
+    server = StubTelegramServer(port=0, per_chat_per_second=50.0)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_DIGEST_WINDOW", 0.05)
+    monkeypatch.setattr(settings, "TELEGRAM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(settings, "TELEGRAM_RATE_PER_CHAT", 50.0)
+
+
+async def _dispatcher(stub) -> AlertDispatcher:
+    dispatcher = AlertDispatcher(TelegramBot(token="T", api_url=stub.url), default_chat=CHAT)
+    await dispatcher.start()
+    return dispatcher
+
+
+async def _settle(dispatcher: AlertDispatcher, seconds: float = 0.3):
+    await asyncio.sleep(seconds)
+    assert dispatcher.stats()["pending"] == 0
+
+
+def _texts(stub):
+    return [m["text"] for m in stub.messages[CHAT]]
+
+
+def test_alert_key_masks_numbers():
+    assert alert_key("XAUUSD buy @ 2001.5") == alert_key("xauusd BUY @ 2001.7")
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_into_one_digest(stub, fast):
+    dispatcher = await _dispatcher(stub)
+    for i in range(50):
+        for symbol in ("XAUUSD", "XAGUSD"):
+            assert dispatcher.submit(f"{symbol} buy @ {2000 + i}", level="signal")
+    await _settle(dispatcher)
+
+    texts = _texts(stub)
+    assert len(texts) == 1
+    assert "XAUUSD buy @ 2049 (×50)" in texts[0]
+    assert "XAGUSD buy @ 2049 (×50)" in texts[0]
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_fills_with_distinct_keys_are_all_delivered(stub, fast):
+    dispatcher = await _dispatcher(stub)
+    dispatcher.submit("XAUUSD BUY 0.1 @ 2001.5 (#1001)", level="trade", key="fill:1001")
+    await _settle(dispatcher)
+    dispatcher.submit("XAUUSD BUY 0.1 @ 2001.5 (#1002)", level="trade", key="fill:1002")
+    await _settle(dispatcher)
+
+    texts = _texts(stub)
+    assert len(texts) == 2 and "#1002" in texts[1]
+    assert dispatcher.suppressed == 0
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_repeat_of_sent_alert_is_suppressed(stub, fast):
+    dispatcher = await _dispatcher(stub)
+    dispatcher.submit("Spread widened to 45")
+    await _settle(dispatcher)
+    assert not dispatcher.submit("Spread widened to 50")
+    assert dispatcher.suppressed == 1
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_and_rate_limits_are_retried(stub, fast):
+    bot = TelegramBot(token="T", api_url=stub.url, retries=3)
+    stub.fail_next = 2
+    await bot.send_message(CHAT, "one")
+    await bot.send_message(CHAT, "two")  # Inside the stub's per-chat interval: 429
+    assert _texts(stub) == ["one", "two"]
+    assert bot.retried >= 2
+    await bot.stop()
+
+
+@pytest.mark.asyncio
+async def test_bad_request_raises_without_retry(stub, fast):
+    bot = TelegramBot(token="T", api_url=stub.url)
+    with pytest.raises(TelegramError):
+        await bot.send_message(CHAT, "")
+    assert bot.retried == 0
+    await bot.stop()
+
+
+@pytest.mark.asyncio
+async def test_commands_answer_only_allowed_chats(stub, fast, monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", CHAT)
+    router = CommandRouter()
+
+    @router.command("ping", "Liveness")
+    async def ping(args):
+        return "pong " + " ".join(args)
+
+    bot = TelegramBot(token="T", api_url=stub.url)
+    stub.push_message("7", "/ping intruder")
+    stub.push_message(CHAT, "/ping a b")
+    task = asyncio.create_task(router.poll_forever(bot))
+    await asyncio.sleep(0.3)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert _texts(stub) == ["pong a b"]
+    assert "7" not in stub.messages
+    await bot.stop()
@@ -0,0 +1,122 @@
+"""
+Tests for the trading engine's journaling of opens and closes
+"""
+
+import pytest
+
+from core.position_sizer import SymbolSpec
+import time
+
+from core.trading_engine import TradingEngine, TradeSignal, FILLED, FAILED, UNKNOWN
+
+
+class _Journal:
+    def __init__(self):
+        self.trades = []
+
+    def trade(self, **data):
+        self.trades.append(data)
+
+    def audit(self, *args, **kwargs):
+        pass
+
+
+def test_close_without_journaled_open_is_not_journaled():
+    journal = _Journal()
+    engine = TradingEngine(connector=None, journal=journal)
+    engine.risk.sync([(1001, 10.0), (1002, 10.0)])
+    engine.journaled.add(1002)
+
+    engine.on_position_closed(1001, 2001.5, 3.0)
+    engine.on_position_closed(1002, 2002.5, 4.0)
+
+    assert [t["status"] for t in journal.trades] == ["closed"]
+    assert journal.trades[0]["exit_price"] == 2002.5
+    assert 1002 not in engine.journaled
+
+
+class _Connector:
+    is_connected = True
+
+    def __init__(self, reply=None, error=None):
+        self.reply, self.error = reply, error
+
+    async def place_order(self, **order):
+        if self.error:
+            raise self.error
+        return self.reply
+
+
+def _signal():
+    return TradeSignal("XAUUSD", "buy", entry=2000.0, stop_loss=1990.0)
+
+
+def _engine(connector) -> TradingEngine:
+    engine = TradingEngine(connector)
+    engine.equity = 10_000.0
+    engine.sizer.set_spec(SymbolSpec("XAUUSD"))
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_fill_is_stamped_acked():
+    report = await _engine(_Connector({"status": "ok", "ticket": 7})).execute(_signal())
+    assert report.status == FILLED
+    assert "acked" in report.stamps and "failed" not in report.stamps
+    assert set(report.latency_us()) >= {"sent_to_acked", "total"}
+
+
+def _timeout() -> _Connector:
+    return _Connector(error=TimeoutError("MT5 request 'place_order' timed out"))
+
+
+@pytest.mark.asyncio
+async def test_unanswered_order_keeps_its_reservation():
+    engine = _engine(_timeout())
+    report = await engine.execute(_signal())
+    assert report.status == UNKNOWN
+    assert "acked" not in report.stamps
+    assert "sent_to_failed" in report.latency_us()
+    stats = engine.risk.stats()
+    assert stats["unknown"] == 1 and stats["open_trades"] == 1
+    assert stats["open_risk"] == pytest.approx(report.risk_amount)
+
+
+@pytest.mark.asyncio
+async def test_late_fill_takes_over_the_reservation():
+    engine = _engine(_timeout())
+    seen = []
+    engine.listeners.append(seen.append)
+    report = await engine.execute(_signal())
+    position = {"ticket": 55, "symbol": "XAUUSD", "price_open": 2000.0, "sl": 1990.0, "volume": report.volume}
+
+    engine.on_positions([position], time.time())
+    assert report.status == FILLED and report.ticket == 55
+    assert seen[-1] is report
+    stats = engine.risk.stats()
+    assert (stats["unknown"], stats["in_flight"], stats["open_trades"], stats["daily_trades"]) == (0, 0, 1, 1)
+    assert stats["open_risk"] == pytest.approx(report.risk_amount)
+
+    engine.on_positions([position], time.time())  # Already tracked
+    assert engine.risk.stats()["open_trades"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_order_is_released_only_by_a_later_refresh():
+    engine = _engine(_timeout())
+    before = time.time()
+    report = await engine.execute(_signal())
+
+    engine.on_positions([], before)  # Read before the timeout: cannot settle it
+    assert engine.risk.stats()["unknown"] == 1
+    engine.on_positions([], time.time() + 1)
+    assert report.status == FAILED
+    stats = engine.risk.stats()
+    assert (stats["open_trades"], stats["daily_trades"], stats["open_risk"]) == (0, 0, 0)
+
+
+def test_positions_opened_elsewhere_count_against_the_limits():
+    engine = _engine(_Connector())
+    engine.on_positions([{"ticket": 9, "symbol": "XAUUSD", "price_open": 2000.0, "sl": 1995.0, "volume": 0.1}], 0.0)
+    assert engine.risk.stats()["open_trades"] == 1
+    assert engine.risk.stats()["open_risk"] == pytest.approx(50.0)
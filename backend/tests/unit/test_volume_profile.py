@@ -0,0 +1,60 @@
+"""
+Tests that incremental volume profiles match profiles built from arrays
+"""
+
+import numpy as np
+
+from strategies.volume_profile import VolumeProfile, RollingVolumeProfile
+
+BIN = 0.5
+
+
+def _bars(n: int = 400, seed: int = 2):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1.0, n))
+    high = close + rng.uniform(0, 3, n)
+    low = close - rng.uniform(0, 3, n)
+    volume = rng.integers(0, 100, n).astype(float)
+    time = np.arange(n) * 60.0
+    return time, high, low, volume
+
+
+def _assert_same(profile: VolumeProfile, reference: VolumeProfile):
+    prices, volumes = profile.histogram()
+    ref_prices, ref_volumes = reference.histogram()
+    np.testing.assert_allclose(prices, ref_prices)
+    np.testing.assert_allclose(volumes, ref_volumes, atol=1e-6)
+    assert profile.levels().poc == reference.levels().poc
+    assert (profile.levels().val, profile.levels().vah) == (reference.levels().val, reference.levels().vah)
+    assert profile.total == reference.total
+
+
+def test_session_profile_matches_from_bars():
+    time, high, low, volume = _bars()
+    profile = VolumeProfile(BIN)
+    for row in zip(time.tolist(), high.tolist(), low.tolist(), volume.tolist()):
+        profile.on_bar(*row)
+    _assert_same(profile, VolumeProfile.from_bars(high, low, volume, BIN))
+
+
+def test_forming_bar_updates_replace_their_contribution():
+    time, high, low, volume = _bars()
+    profile = VolumeProfile(BIN)
+    for t, h, lo, v in zip(time.tolist(), high.tolist(), low.tolist(), volume.tolist()):
+        # The forming bar widens and fills up before it closes
+        profile.on_bar(t, (h + lo) / 2, (h + lo) / 2, v / 3)
+        profile.on_bar(t, h, lo, v)
+    _assert_same(profile, VolumeProfile.from_bars(high, low, volume, BIN))
+
+
+def test_rolling_profile_matches_last_window():
+    time, high, low, volume = _bars()
+    window = 50
+    rolling = RollingVolumeProfile(BIN, window)
+    for i, (t, h, lo, v) in enumerate(zip(time.tolist(), high.tolist(), low.tolist(), volume.tolist())):
+        rolling.on_bar(t, h + 1, lo, v + 5)
+        rolling.on_bar(t, h, lo, v)  # Final update of the same bar
+        if i % 97 == 0 or i == len(time) - 1:
+            start = max(0, i + 1 - window)
+            reference = VolumeProfile.from_bars(high[start:i + 1], low[start:i + 1], volume[start:i + 1], BIN)
+            _assert_same(rolling, reference)
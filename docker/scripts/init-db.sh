@@ -26,8 +26,9 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
     -- Optimize for time-series data
     ALTER SYSTEM SET shared_preload_libraries = 'timescaledb';
     
-    -- Create hypertable for market data (will be done by app)
-    -- This is just initialization
+    -- Hypertable, compression/retention policies and the M5..D1
+    -- continuous aggregates are created by the backend on startup
+    -- (app/database/timescale.py) once the market_data table exists
     
     echo "Database initialization complete!";
 EOSQL